@@ -0,0 +1,44 @@
+"""widen admins id
+
+Revision ID: e70cdd0f5d58
+Revises: ed73f01c664d
+Create Date: 2026-10-18 20:22:12.683129
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e70cdd0f5d58"
+down_revision: str | None = "ed73f01c664d"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a smallint id caps the table at 32767 admin rows across all channels
+    op.alter_column(
+        "admins",
+        "id",
+        existing_type=sa.SmallInteger(),
+        type_=sa.Integer(),
+        existing_nullable=False,
+    )
+    op.execute("ALTER SEQUENCE admins_id_seq AS integer")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER SEQUENCE admins_id_seq AS smallint")
+    op.alter_column(
+        "admins",
+        "id",
+        existing_type=sa.Integer(),
+        type_=sa.SmallInteger(),
+        existing_nullable=False,
+    )
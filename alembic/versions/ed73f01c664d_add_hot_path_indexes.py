@@ -0,0 +1,70 @@
+"""add hot path indexes
+
+Revision ID: ed73f01c664d
+Revises: abfc10c38601
+Create Date: 2026-10-18 21:04:37.512113
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "ed73f01c664d"
+down_revision: str | None = "abfc10c38601"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # built concurrently so a live bot keeps writing while they are created
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_quizzes_channel_id_id",
+            "quizzes",
+            ["channel_id", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_channels_active",
+            "channels",
+            ["id"],
+            postgresql_where=sa.text("active"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_admins_channel_id",
+            "admins",
+            ["channel_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_admins_channel_id",
+            table_name="admins",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_channels_active",
+            table_name="channels",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_quizzes_channel_id_id",
+            table_name="quizzes",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,175 @@
+"""Measure the background admin reconciler.
+
+Seeds throwaway channels in POSTGRES_URL with admins, then lets a fake bot
+report slightly different admin lists (some promoted, some demoted while the
+bot was down). Walks every channel once with the per-channel sync
+handle_bot_join uses and once with the reconciler's bulk page, and prints
+channels per second and SQL statements per page with no rate budget. It
+then checks that a pass interrupted half way resumes from the cursor in
+redis and leaves the admins table matching the bot's view. The users it
+creates are deleted again, so it only runs against a database named as a
+scratch one or named in BENCH_DATABASE.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/admin_reconcile.py
+"""
+
+import asyncio
+import time
+
+import reconciler
+from admins import reconcile_admins, sync_channel_admins
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import GetChatAdministrators
+from aiogram.types import ChatMemberOwner
+from aiogram.types import User as TUser
+from cache import user_channels
+from common import (
+    BENCH_CHANNEL_BASE,
+    drop_channels,
+    require_scratch_database,
+    seed_channel,
+)
+from constants import RECONCILE_CURSOR_KEY
+from db import AsyncSessionLocal, engine
+from fakeredis import FakeAsyncRedis
+from models import Admin, Channel, User
+from sqlalchemy import delete, event, func, insert, select
+
+CHANNELS = 2_000
+PAGE = 100
+USER_BASE = 1_900_000_000
+# blocks of 100 shared admin ids, then one promoted admin per channel
+DRIFT_OFFSET = 99_000
+USER_SPAN = DRIFT_OFFSET + CHANNELS
+
+
+def admins_of(index: int, drifted: bool) -> list[TUser]:
+    ids = [USER_BASE + index // 10 * 100 + i for i in range(3)]
+    if drifted and index % 7 == 0:
+        ids.append(USER_BASE + DRIFT_OFFSET + index)
+    if drifted and index % 11 == 0:
+        ids.pop(0)
+    return [TUser(id=uid, is_bot=False, first_name=f"u{uid}") for uid in ids]
+
+
+class FakeBot:
+    def __init__(self, channel_ids: list[int]) -> None:
+        self.index = {channel_id: i for i, channel_id in enumerate(channel_ids)}
+
+    async def get_chat_administrators(self, chat_id: int) -> list[ChatMemberOwner]:
+        if chat_id not in self.index:
+            method = GetChatAdministrators(chat_id=chat_id)
+            raise TelegramForbiddenError(method, "bot is not a member")
+        return [
+            ChatMemberOwner(user=user, is_anonymous=False)
+            for user in admins_of(self.index[chat_id], drifted=True)
+        ]
+
+
+async def reset(channel_ids: list[int]) -> None:
+    async with AsyncSessionLocal() as session:
+        await drop_channels(session, channel_ids)
+        await session.execute(
+            delete(User).where(User.id.between(USER_BASE, USER_BASE + USER_SPAN))
+        )
+        await session.commit()
+        if not channel_ids:
+            return
+        await seed_channel(session, channel_ids[0], 0)
+        await session.execute(
+            insert(Channel),
+            [
+                {"id": channel_id, "title": "bench", "active": True}
+                for channel_id in channel_ids[1:]
+            ],
+        )
+        admins = {
+            channel_id: admins_of(i, drifted=False)
+            for i, channel_id in enumerate(channel_ids)
+        }
+        await reconcile_admins(session, admins)
+        await session.commit()
+    await reconciler.redis.delete(RECONCILE_CURSOR_KEY)
+
+
+async def per_channel(channel_ids: list[int], bot: FakeBot) -> None:
+    for channel_id in channel_ids:
+        members = await bot.get_chat_administrators(channel_id)
+        async with AsyncSessionLocal() as session:
+            await sync_channel_admins(
+                session, channel_id, [member.user for member in members]
+            )
+            await session.commit()
+
+
+async def full_pass() -> None:
+    while not await reconciler.reconcile_page(PAGE, rate=1_000_000):
+        pass
+
+
+async def admins_match(channel_ids: list[int]) -> bool:
+    stmt = select(Admin.channel_id, func.array_agg(Admin.user_id)).group_by(
+        Admin.channel_id
+    )
+    async with AsyncSessionLocal() as session:
+        rows = dict((await session.execute(stmt)).tuples().all())
+    return all(
+        sorted(rows.get(channel_id, []))
+        == sorted(user.id for user in admins_of(i, drifted=True))
+        for i, channel_id in enumerate(channel_ids)
+    )
+
+
+async def main() -> None:
+    require_scratch_database(engine)
+    statements = 0
+
+    def count(*args: object) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    channel_ids = sorted(BENCH_CHANNEL_BASE - i for i in range(CHANNELS))
+    bot = FakeBot(channel_ids)
+    reconciler.bot = bot
+    reconciler.redis = FakeAsyncRedis(decode_responses=True)
+    user_channels.redis = FakeAsyncRedis(decode_responses=True)
+
+    async def per_channel_pass() -> None:
+        await per_channel(channel_ids, bot)
+
+    print(f"{CHANNELS} channels, pages of {PAGE}")
+    print(f"{'method':>12} {'channels/s':>10} {'stmts/page':>10} {'in sync':>8}")
+    try:
+        for name, run in (
+            ("per channel", per_channel_pass),
+            ("bulk page", full_pass),
+        ):
+            await reset(channel_ids)
+            statements = 0
+            started = time.perf_counter()
+            await run()
+            elapsed = time.perf_counter() - started
+            print(
+                f"{name:>12} {CHANNELS / elapsed:>10.0f} "
+                f"{statements / (CHANNELS / PAGE):>10.1f} "
+                f"{await admins_match(channel_ids)!s:>8}"
+            )
+
+        await reset(channel_ids)
+        reconciler.stats = reconciler.ReconcileStats()
+        for _ in range(CHANNELS // PAGE // 2):
+            await reconciler.reconcile_page(PAGE, rate=1_000_000)
+        cursor = await reconciler.redis.get(RECONCILE_CURSOR_KEY)
+        print(f"interrupted at {cursor}, {reconciler.stats.channels} channels seen")
+        await full_pass()
+        print(f"resumed pass in sync: {await admins_match(channel_ids)}")
+        print(f"totals: {reconciler.stats}")
+    finally:
+        await reset([])
+        async with AsyncSessionLocal() as session:
+            await drop_channels(session, channel_ids)
+        await engine.dispose()
+
+
+asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Measure the cost of syncing a channel's admins when the bot joins.
+
+Joins throwaway channels in POSTGRES_URL with a growing number of admins,
+once with the old loop (a session.get and an ORM insert per admin) and once
+with the set-based sync handle_bot_join uses, then joins them all again to
+show what a rejoin does. Prints joins per second and SQL statements per
+join; the old loop fails a rejoin on the unique (user_id, channel_id)
+constraint. The users it creates are deleted again, so it only runs
+against a database named as a scratch one or named in BENCH_DATABASE.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/admin_sync.py
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from admins import sync_channel_admins
+from aiogram.types import User as TUser
+from common import (
+    BENCH_CHANNEL_BASE,
+    drop_channels,
+    require_scratch_database,
+    seed_channel,
+)
+from db import AsyncSessionLocal, engine
+from models import Admin, User
+from sqlalchemy import delete, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+ADMIN_COUNTS = [3, 10, 50]
+CHANNELS = 100
+USER_BASE = 1_900_000_000
+# every ten channels share a block of 100 admin ids
+USER_SPAN = CHANNELS // 10 * 100
+
+Sync = Callable[[AsyncSession, int, list[TUser]], Awaitable[object]]
+
+
+async def per_user(session: AsyncSession, channel_id: int, users: list[TUser]) -> None:
+    for admin_user in users:
+        user = await session.get(User, admin_user.id)
+        if user:
+            user.first_name = admin_user.first_name
+        else:
+            session.add(User(id=admin_user.id, first_name=admin_user.first_name))
+        session.add(Admin(user_id=admin_user.id, channel_id=channel_id))
+
+
+def admins_of(index: int, count: int) -> list[TUser]:
+    # neighbouring channels share most of their admins, like a network of
+    # channels run by the same team
+    return [
+        TUser(id=USER_BASE + index // 10 * 100 + i, is_bot=False, first_name=f"a{i}")
+        for i in range(count)
+    ]
+
+
+async def join_all(sync: Sync, channel_ids: list[int], count: int) -> tuple[int, int]:
+    failed = 0
+    for index, channel_id in enumerate(channel_ids):
+        async with AsyncSessionLocal() as session:
+            try:
+                await sync(session, channel_id, admins_of(index, count))
+                await session.commit()
+            except IntegrityError:
+                failed += 1
+    return len(channel_ids), failed
+
+
+async def reset(channel_ids: list[int]) -> None:
+    async with AsyncSessionLocal() as session:
+        await drop_channels(session, channel_ids)
+        await session.execute(
+            delete(User).where(User.id.between(USER_BASE, USER_BASE + USER_SPAN))
+        )
+        await session.commit()
+        for channel_id in channel_ids:
+            await seed_channel(session, channel_id, 0)
+
+
+async def main() -> None:
+    require_scratch_database(engine)
+    statements = 0
+
+    def count(*args: object) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    channel_ids = [BENCH_CHANNEL_BASE - i for i in range(CHANNELS)]
+    methods: list[tuple[str, Sync]] = [
+        ("per user", per_user),
+        ("set based", sync_channel_admins),
+    ]
+
+    print(f"{CHANNELS} channels")
+    print(
+        f"{'method':>10} {'admins':>6} {'run':>6} {'joins/s':>9} "
+        f"{'stmts/join':>10} {'failed':>6}"
+    )
+    try:
+        for admins in ADMIN_COUNTS:
+            for name, sync in methods:
+                await reset(channel_ids)
+                for run in ("join", "rejoin"):
+                    statements = 0
+                    started = time.perf_counter()
+                    joins, failed = await join_all(sync, channel_ids, admins)
+                    elapsed = time.perf_counter() - started
+                    print(
+                        f"{name:>10} {admins:>6} {run:>6} {joins / elapsed:>9.0f} "
+                        f"{statements / joins:>10.1f} {failed:>6}"
+                    )
+    finally:
+        await reset([])
+        async with AsyncSessionLocal() as session:
+            await drop_channels(session, channel_ids)
+        await engine.dispose()
+
+
+asyncio.run(main())
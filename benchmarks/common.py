@@ -0,0 +1,104 @@
+import asyncio
+import os
+import statistics
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from fakeredis import FakeAsyncRedis, FakeServer
+from fakeredis.aioredis import FakeAsyncRedisConnection
+from models import Channel, Option, Quiz, User
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+BENCH_USER_ID = 1
+BENCH_CHANNEL_BASE = -1_999_000_000_000
+# names that mark a database as safe to fill and wipe
+SCRATCH_DATABASE_MARKS = ("bench", "test", "scratch")
+
+
+def require_scratch_database(engine: AsyncEngine) -> None:
+    # the user benchmarks delete users by id range, and real Telegram ids
+    # can fall in it; BENCH_DATABASE names a database to allow anyway
+    name = engine.url.database or ""
+    marked = any(mark in name.lower() for mark in SCRATCH_DATABASE_MARKS)
+    if not marked and os.getenv("BENCH_DATABASE") != name:
+        raise SystemExit(
+            f"refusing to delete users in {name!r}: use a database whose name "
+            f"has one of {', '.join(SCRATCH_DATABASE_MARKS)} or set "
+            f"BENCH_DATABASE={name}"
+        )
+
+
+async def seed_channel(session: AsyncSession, channel_id: int, quizzes: int) -> None:
+    if not await session.get(User, BENCH_USER_ID):
+        session.add(User(id=BENCH_USER_ID, first_name="bench"))
+    session.add(Channel(id=channel_id, title=f"bench {channel_id}", active=True))
+    await session.flush()
+
+    batch = 1000
+    for start in range(0, quizzes, batch):
+        size = min(batch, quizzes - start)
+        quiz_ids = (
+            await session.scalars(
+                insert(Quiz).returning(Quiz.id),
+                [
+                    {
+                        "question": f"Question {start + i} " + "x" * 200,
+                        "correct_order": 0,
+                        "explanation": "y" * 150,
+                        "user_id": BENCH_USER_ID,
+                        "channel_id": channel_id,
+                    }
+                    for i in range(size)
+                ],
+            )
+        ).all()
+        await session.execute(
+            insert(Option),
+            [
+                {
+                    "option": f"Option {order} " + "z" * 80,
+                    "order": order,
+                    "quiz_id": qid,
+                }
+                for qid in quiz_ids
+                for order in range(4)
+            ],
+        )
+    await session.commit()
+
+
+async def drop_channels(session: AsyncSession, channel_ids: list[int]) -> None:
+    await session.execute(delete(Quiz).where(Quiz.channel_id.in_(channel_ids)))
+    await session.execute(delete(Channel).where(Channel.id.in_(channel_ids)))
+    await session.commit()
+
+
+async def measure(
+    fn: Callable[..., Awaitable[object]], *args: object, repeat: int = 5
+) -> tuple[float, float]:
+    timings = []
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        await fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(timings), peak / 1024
+
+
+def latency_redis(rtt: float, server: FakeServer | None = None) -> FakeAsyncRedis:
+    class SlowConnection(FakeAsyncRedisConnection):
+        async def send_packed_command(
+            self, command: Any, check_health: bool = True
+        ) -> None:
+            await asyncio.sleep(rtt)
+            await super().send_packed_command(command, check_health)
+
+    return FakeAsyncRedis(
+        server=server, decode_responses=True, connection_class=SlowConnection
+    )
@@ -0,0 +1,101 @@
+"""Size the Postgres connection pool for the 09:00 peak.
+
+Seeds throwaway channels in POSTGRES_URL, then runs a burst of concurrent
+channel jobs (load a page of quizzes with their options, as a post does)
+against engines built by db.make_engine with different pool sizes and with
+the asyncpg statement caches on and off. Prints jobs per second, pool
+checkout wait and query latency from db.db_stats, and the peak number of
+connections in use.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/db_pool.py
+"""
+
+import asyncio
+import os
+import time
+
+import db
+from common import BENCH_CHANNEL_BASE, drop_channels, seed_channel
+from db import AsyncSessionLocal, DbStats, Histogram, make_engine, pool_status
+from models import Quiz
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import selectinload
+
+CHANNELS = 50
+QUIZZES = 200
+JOBS = 2_000
+CONCURRENCY = 100
+POOL_SIZES = [5, 10, 20, 40]
+CACHE_SIZES = [100, 0]
+
+
+async def main() -> None:
+    channel_ids = [BENCH_CHANNEL_BASE - i for i in range(CHANNELS)]
+    async with AsyncSessionLocal() as session:
+        await drop_channels(session, channel_ids)
+        for channel_id in channel_ids:
+            await seed_channel(session, channel_id, QUIZZES)
+
+    print(f"{JOBS} jobs, {CONCURRENCY} at once")
+    print(
+        f"{'pool':>4} {'cache':>5} {'jobs/s':>7} {'wait p50':>9} {'wait p99':>9} "
+        f"{'query p99':>9} {'in use':>6}"
+    )
+    try:
+        for cache_size in CACHE_SIZES:
+            db.DB_STATEMENT_CACHE_SIZE = cache_size
+            for pool_size in POOL_SIZES:
+                await run(channel_ids, pool_size, cache_size)
+    finally:
+        async with AsyncSessionLocal() as session:
+            await drop_channels(session, channel_ids)
+        await db.engine.dispose()
+
+
+async def run(channel_ids: list[int], pool_size: int, cache_size: int) -> None:
+    engine = make_engine(
+        os.getenv("POSTGRES_URL", ""), pool_size=pool_size, max_overflow=0
+    )
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    db.db_stats = stats = DbStats()
+    in_use = 0
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(JOBS):
+        queue.put_nowait(channel_ids[i % len(channel_ids)])
+
+    async def worker() -> None:
+        nonlocal in_use
+        while not queue.empty():
+            channel_id = queue.get_nowait()
+            async with sessions() as session:
+                stmt = (
+                    select(Quiz)
+                    .where(Quiz.channel_id == channel_id)
+                    .options(selectinload(Quiz.options))
+                    .order_by(Quiz.id)
+                    .limit(10)
+                )
+                await session.scalars(stmt)
+                in_use = max(in_use, pool_status(engine)["checked_out"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    queries = Histogram()
+    for histogram in stats.queries.values():
+        queries.count += histogram.count
+        queries.counts = [
+            a + b for a, b in zip(queries.counts, histogram.counts, strict=True)
+        ]
+    wait = stats.checkout_wait
+    print(
+        f"{pool_size:>4} {cache_size:>5} {JOBS / elapsed:>7.0f} "
+        f"{wait.quantile(0.5) * 1000:>7g}ms {wait.quantile(0.99) * 1000:>7g}ms "
+        f"{queries.quantile(0.99) * 1000:>7g}ms {in_use:>6}"
+    )
+
+
+asyncio.run(main())
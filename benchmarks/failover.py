@@ -0,0 +1,117 @@
+"""Run several bot replicas locally and measure leader failover.
+
+Starts a fakeredis TCP server and the fake Bot API in this process, launches
+REPLICAS copies of quizbot/run.py against them (POSTGRES_URL must point at a
+migrated database), then repeatedly kills the current leader and reports how
+long it takes for another replica to take over polling and the scheduler.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/failover.py
+"""
+
+import asyncio
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+
+from constants import LEADER_KEY
+from fake_telegram import FakeTelegram, start_fake_telegram
+from fakeredis import TcpFakeServer
+from redis.asyncio import Redis
+
+REPLICAS = 3
+REDIS_PORT = 6390
+API_PORT = 8083
+RUN = Path(__file__).resolve().parents[1] / "quizbot" / "run.py"
+ELECTED = re.compile(r"replica (\w+) became the leader")
+
+
+class Replica:
+    def __init__(self, process: asyncio.subprocess.Process) -> None:
+        self.process = process
+        self.token: str | None = None
+        self.elected_at: float | None = None
+
+    async def watch(self) -> None:
+        assert self.process.stderr
+        async for line in self.process.stderr:
+            match = ELECTED.search(line.decode())
+            if match:
+                self.token = match.group(1)
+                self.elected_at = time.monotonic()
+
+
+async def spawn() -> Replica:
+    env = os.environ | {
+        "REDIS_URL": f"redis://127.0.0.1:{REDIS_PORT}/0",
+        "TELEGRAM_API_URL": f"http://127.0.0.1:{API_PORT}",
+        "BOT_TOKEN": "42:fake",
+        # the replicas share a host, so each lets the OS pick a metrics port
+        "METRICS_PORT": "0",
+    }
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        str(RUN),
+        env=env,
+        cwd=RUN.parent,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    replica = Replica(process)
+    asyncio.create_task(replica.watch())
+    return replica
+
+
+async def wait_for_leader(redis: Redis, replicas: list[Replica]) -> Replica:
+    while True:
+        if all(r.process.returncode is not None for r in replicas):
+            raise RuntimeError("all replicas exited")
+        token = await redis.get(LEADER_KEY)
+        for replica in replicas:
+            if token and replica.token == token and replica.process.returncode is None:
+                return replica
+        await asyncio.sleep(0.05)
+
+
+async def main() -> None:
+    server = TcpFakeServer(("127.0.0.1", REDIS_PORT))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    redis = Redis.from_url(f"redis://127.0.0.1:{REDIS_PORT}/0", decode_responses=True)
+    telegram = FakeTelegram()
+    runner = await start_fake_telegram(telegram, port=API_PORT)
+
+    replicas = [await spawn() for _ in range(REPLICAS)]
+    try:
+        leader = await wait_for_leader(redis, replicas)
+        for _ in range(REPLICAS - 1):
+            polls = telegram.calls["getupdates"]
+            leaders = sum(r.token == leader.token for r in replicas)
+            print(f"leader pid {leader.process.pid}, getUpdates so far {polls}")
+            assert leaders == 1
+
+            killed_at = time.monotonic()
+            leader.process.send_signal(signal.SIGKILL)
+            await leader.process.wait()
+            leader = await wait_for_leader(redis, replicas)
+            elected = (leader.elected_at or killed_at) - killed_at
+
+            polls = telegram.calls["getupdates"]
+            while telegram.calls["getupdates"] == polls:
+                await asyncio.sleep(0.05)
+            polling = time.monotonic() - killed_at
+            print(
+                f"failover: elected after {elected:.2f}s, polling after {polling:.2f}s"
+            )
+    finally:
+        for replica in replicas:
+            if replica.process.returncode is None:
+                replica.process.terminate()
+                await replica.process.wait()
+        await runner.cleanup()
+        server.shutdown()
+
+
+asyncio.run(main())
@@ -0,0 +1,163 @@
+"""Minimal local stand-in for the Telegram Bot API.
+
+Answers every method with a plausible result after a configurable latency and
+enforces Telegram-like flood limits, replying 429 with retry_after when a
+global or per-chat budget is exceeded. Point the bot at it with
+TELEGRAM_API_URL=http://127.0.0.1:8081.
+
+    python benchmarks/fake_telegram.py --port 8081
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any
+
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "quizbot", "username": "quizbot"}
+ADMIN_RIGHTS = {
+    "can_be_edited": False,
+    "is_anonymous": False,
+    "can_manage_chat": True,
+    "can_delete_messages": True,
+    "can_manage_video_chats": True,
+    "can_restrict_members": True,
+    "can_promote_members": False,
+    "can_change_info": True,
+    "can_invite_users": True,
+    "can_post_stories": True,
+    "can_edit_stories": True,
+    "can_delete_stories": True,
+    "can_post_messages": True,
+    "can_edit_messages": True,
+}
+
+
+class FakeTelegram:
+    def __init__(
+        self, latency: float = 0.02, rate: int = 30, chat_rate: int = 20
+    ) -> None:
+        self.latency = latency
+        self.rate = rate
+        self.chat_rate = chat_rate
+        self.sent: deque[float] = deque()
+        self.chat_sent: defaultdict[str, deque[float]] = defaultdict(deque)
+        self.calls: Counter[str] = Counter()
+        self.flood_errors = 0
+        self.ids = itertools.count(1)
+
+    def retry_after(self, chat_id: str) -> int | None:
+        now = time.monotonic()
+        for window, limit, period in (
+            (self.sent, self.rate, 1),
+            (self.chat_sent[chat_id], self.chat_rate, 60),
+        ):
+            while window and now - window[0] >= period:
+                window.popleft()
+            if len(window) >= limit:
+                return max(1, int(period - (now - window[0])) + 1)
+
+        self.sent.append(now)
+        self.chat_sent[chat_id].append(now)
+        return None
+
+    def result(self, method: str, params: dict[str, Any]) -> Any:
+        chat_id = int(params.get("chat_id", 0))
+        chat = {"id": chat_id, "type": "channel", "title": "c"}
+        message = {"message_id": next(self.ids), "date": int(time.time()), "chat": chat}
+        if method == "getme":
+            return BOT_USER
+        if method == "getupdates":
+            return []
+        if method == "getchatadministrators":
+            return [
+                {"status": "administrator", "user": BOT_USER, **ADMIN_RIGHTS},
+                {
+                    "status": "creator",
+                    "is_anonymous": False,
+                    "user": {
+                        "id": abs(chat_id) % 10**9,
+                        "is_bot": False,
+                        "first_name": "admin",
+                    },
+                },
+            ]
+        if method == "sendpoll":
+            options = json.loads(params.get("options", "[]"))
+            message["poll"] = {
+                "id": str(message["message_id"]),
+                "question": params.get("question", ""),
+                "options": [
+                    {"text": opt["text"] if isinstance(opt, dict) else opt}
+                    | {"voter_count": 0}
+                    for opt in options
+                ],
+                "total_voter_count": 0,
+                "is_closed": False,
+                "is_anonymous": True,
+                "type": "quiz",
+                "allows_multiple_answers": False,
+            }
+            return message
+        if method.startswith("send"):
+            return message
+        return True
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        params = dict(await request.post())
+        self.calls[method] += 1
+        await asyncio.sleep(self.latency)
+        if method == "getupdates":
+            # hold long-polling requests open for a while like the real API
+            await asyncio.sleep(min(float(str(params.get("timeout", 0))), 1))
+
+        if method.startswith("send"):
+            retry_after = self.retry_after(str(params.get("chat_id")))
+            if retry_after is not None:
+                self.flood_errors += 1
+                return web.json_response(
+                    {
+                        "ok": False,
+                        "error_code": 429,
+                        "description": f"Too Many Requests: retry after {retry_after}",
+                        "parameters": {"retry_after": retry_after},
+                    },
+                    status=429,
+                )
+
+        return web.json_response({"ok": True, "result": self.result(method, params)})
+
+
+async def start_fake_telegram(
+    telegram: FakeTelegram, host: str = "127.0.0.1", port: int = 8081
+) -> web.AppRunner:
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", telegram.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--rate", type=int, default=30)
+    parser.add_argument("--chat-rate", type=int, default=20)
+    args = parser.parse_args()
+
+    telegram = FakeTelegram(args.latency, args.rate, args.chat_rate)
+    await start_fake_telegram(telegram, args.host, args.port)
+    print(f"fake telegram listening on http://{args.host}:{args.port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""Compare FSM storage backends per get_data() and update_data() call.
+
+The legacy layout keeps Channel ORM instances in QuizData and only works with
+MemoryStorage; the compact layout keeps channel ids and titles and is what
+the bot stores in Redis. Redis is fakeredis with a simulated round-trip time.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/fsm_storage.py
+"""
+
+import asyncio
+import json
+import time
+import tracemalloc
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
+from common import latency_redis
+from models import Channel
+from type import ChannelRef, QuizData
+
+USERS = 2_000
+CHANNELS = 5
+RTT = 0.0005
+
+
+def legacy_data(user_id: int) -> dict[str, Any]:
+    channels = [
+        Channel(id=-(10**12) - i, title=f"Channel number {i}", active=True)
+        for i in range(CHANNELS)
+    ]
+    return dict(
+        channels=channels,
+        user_id=user_id,
+        channel=channels[0],
+        question="What is the capital of Uzbekistan?",
+        options=["Tashkent", "Samarkand", "Bukhara", "Khiva"],
+        correct_order=0,
+        explanation=None,
+    )
+
+
+def compact_data(user_id: int) -> QuizData:
+    channels = [
+        ChannelRef(id=-(10**12) - i, title=f"Channel number {i}")
+        for i in range(CHANNELS)
+    ]
+    return QuizData(
+        channels=channels,
+        user_id=user_id,
+        channel=channels[0],
+        question="What is the capital of Uzbekistan?",
+        options=["Tashkent", "Samarkand", "Bukhara", "Khiva"],
+        correct_order=0,
+        explanation=None,
+    )
+
+
+async def run(name: str, storage: BaseStorage, make_data: Callable[[int], Any]) -> None:
+    contexts = [
+        FSMContext(storage, StorageKey(bot_id=1, chat_id=uid, user_id=uid))
+        for uid in range(USERS)
+    ]
+
+    tracemalloc.start()
+    for uid, context in enumerate(contexts):
+        await context.set_data(make_data(uid))
+    held = tracemalloc.get_traced_memory()[0] / USERS
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for context in contexts:
+        await context.get_data()
+    get_us = (time.perf_counter() - started) / USERS * 10**6
+
+    started = time.perf_counter()
+    for context in contexts:
+        await context.update_data(explanation="Tashkent is the capital.")
+    update_us = (time.perf_counter() - started) / USERS * 10**6
+
+    payload = 0
+    if isinstance(storage, RedisStorage):
+        key = storage.key_builder.build(contexts[0].key, "data")
+        payload = await storage.redis.strlen(key)
+
+    print(f"{name:>16} {held:>9.0f} {payload:>9} {get_us:>9.1f} {update_us:>10.1f}")
+
+
+async def main() -> None:
+    print(f"{USERS} users, {CHANNELS} channels each, redis rtt {RTT * 1000:.1f} ms")
+    header = ("storage", "heap B", "redis B", "get us", "update us")
+    print("{:>16} {:>9} {:>9} {:>9} {:>10}".format(*header))
+    await run("memory, orm", MemoryStorage(), legacy_data)
+    await run("memory, compact", MemoryStorage(), compact_data)
+    storage = RedisStorage(
+        latency_redis(RTT),
+        json_dumps=partial(json.dumps, separators=(",", ":"), ensure_ascii=False),
+    )
+    await run("redis, compact", storage, compact_data)
+
+
+asyncio.run(main())
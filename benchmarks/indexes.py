@@ -0,0 +1,188 @@
+"""Compare hot-path query plans with and without the secondary indexes.
+
+Seeds throwaway users, channels, admins and quizzes into POSTGRES_URL, drops
+the indexes added by the ed73f01c664d revision, runs EXPLAIN ANALYZE on the
+queries behind posting, deck building, startup and the admin lookups, then
+recreates the indexes from the models and runs them again.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/indexes.py
+"""
+
+import asyncio
+import json
+import statistics
+from typing import Any
+
+from common import BENCH_CHANNEL_BASE
+from db import engine
+from models import Admin, Base, Channel, Quiz
+from sqlalchemy import Select, delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+CHANNELS = 2_000
+INACTIVE_EVERY = 5
+QUIZZES_PER_CHANNEL = 200
+ADMINS_PER_CHANNEL = 3
+USERS = 2_000
+USER_BASE = 1_700_000_000
+REPEAT = 5
+
+CHANNEL_ID = BENCH_CHANNEL_BASE - CHANNELS // 2
+USER_ID = USER_BASE + USERS // 2
+
+QUERIES: list[tuple[str, Select[Any]]] = [
+    (
+        "sample quizzes",
+        select(Quiz.id)
+        .where(Quiz.channel_id == CHANNEL_ID)
+        .order_by(func.random())
+        .limit(10),
+    ),
+    ("deck ids", select(Quiz.id).where(Quiz.channel_id == CHANNEL_ID)),
+    ("active channels", select(Channel.id).where(Channel.active)),
+    (
+        "user channels",
+        select(Channel.id, Channel.title)
+        .join(Admin, Admin.channel_id == Channel.id)
+        .where(Admin.user_id == USER_ID),
+    ),
+    ("channel admins", select(Admin.user_id).where(Admin.channel_id == CHANNEL_ID)),
+]
+INDEXES = [
+    index
+    for table in Base.metadata.sorted_tables
+    for index in table.indexes
+    if index.name
+    in ("ix_quizzes_channel_id_id", "ix_channels_active", "ix_admins_channel_id")
+]
+
+
+async def seed(conn: AsyncConnection) -> None:
+    params = {
+        "users": USERS,
+        "user_base": USER_BASE,
+        "channels": CHANNELS,
+        "channel_base": BENCH_CHANNEL_BASE,
+        "inactive": INACTIVE_EVERY,
+        "quizzes": QUIZZES_PER_CHANNEL,
+        "admins": ADMINS_PER_CHANNEL,
+    }
+    statements = [
+        """
+        INSERT INTO users (id, first_name)
+        SELECT CAST(:user_base AS bigint) + u, 'bench'
+        FROM generate_series(0, :users - 1) u
+        """,
+        """
+        INSERT INTO channels (id, title, active)
+        SELECT CAST(:channel_base AS bigint) - c, 'bench ' || c, c % :inactive <> 0
+        FROM generate_series(0, :channels - 1) c
+        """,
+        """
+        INSERT INTO admins (user_id, channel_id)
+        SELECT DISTINCT
+            CAST(:user_base AS bigint) + (c * :admins + a) % :users,
+            CAST(:channel_base AS bigint) - c
+        FROM generate_series(0, :channels - 1) c, generate_series(0, :admins - 1) a
+        """,
+        """
+        INSERT INTO quizzes (question, correct_order, user_id, channel_id)
+        SELECT
+            'Question ' || q,
+            0,
+            CAST(:user_base AS bigint),
+            CAST(:channel_base AS bigint) - c
+        FROM generate_series(0, :quizzes - 1) q, generate_series(0, :channels - 1) c
+        """,
+    ]
+    for statement in statements:
+        await conn.execute(text(statement), params)
+    await conn.commit()
+
+
+async def cleanup(conn: AsyncConnection) -> None:
+    await conn.execute(delete(Quiz).where(Quiz.channel_id <= BENCH_CHANNEL_BASE))
+    await conn.execute(delete(Channel).where(Channel.id <= BENCH_CHANNEL_BASE))
+    await conn.execute(
+        text("DELETE FROM users WHERE id BETWEEN :lo AND :hi"),
+        {"lo": USER_BASE, "hi": USER_BASE + USERS},
+    )
+    await conn.commit()
+
+
+async def vacuum() -> None:
+    # index-only scans depend on an up to date visibility map
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ("users", "channels", "admins", "quizzes"):
+            await conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+
+def scan_nodes(plan: dict[str, Any]) -> list[str]:
+    nodes = []
+    if "Scan" in plan["Node Type"]:
+        target = plan.get("Index Name") or plan["Relation Name"]
+        nodes.append(f"{plan['Node Type']} on {target}")
+    for child in plan.get("Plans", []):
+        nodes.extend(scan_nodes(child))
+    return nodes
+
+
+async def explain(conn: AsyncConnection) -> dict[str, tuple[float, str]]:
+    results = {}
+    for name, stmt in QUERIES:
+        sql = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+        timings = []
+        for _ in range(REPEAT):
+            result = await conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}"))
+            output = result.scalar_one()
+            output = json.loads(output) if isinstance(output, str) else output
+            timings.append(output[0]["Execution Time"])
+        results[name] = (
+            statistics.median(timings),
+            ", ".join(scan_nodes(output[0]["Plan"])),
+        )
+    return results
+
+
+async def main() -> None:
+    async with engine.connect() as conn:
+        await cleanup(conn)
+        await seed(conn)
+    try:
+        async with engine.connect() as conn:
+            for index in INDEXES:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            await conn.commit()
+        await vacuum()
+        async with engine.connect() as conn:
+            before = await explain(conn)
+
+        async with engine.connect() as conn:
+            for index in INDEXES:
+                await conn.run_sync(index.create, checkfirst=True)
+            await conn.commit()
+        await vacuum()
+        async with engine.connect() as conn:
+            after = await explain(conn)
+
+        print(
+            f"{CHANNELS} channels, {CHANNELS * QUIZZES_PER_CHANNEL} quizzes, "
+            f"{USERS} users, median of {REPEAT} runs"
+        )
+        print(f"{'query':>16} {'before ms':>10} {'after ms':>9}  plan after")
+        for name, _ in QUERIES:
+            print(
+                f"{name:>16} {before[name][0]:>10.2f} {after[name][0]:>9.2f}  "
+                f"{after[name][1]}"
+            )
+        print("plans before:")
+        for name, _ in QUERIES:
+            print(f"{name:>16}  {before[name][1]}")
+    finally:
+        async with engine.connect() as conn:
+            await cleanup(conn)
+        await engine.dispose()
+
+
+asyncio.run(main())
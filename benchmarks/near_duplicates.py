@@ -0,0 +1,162 @@
+"""Measure near-duplicate question checks as a channel's bank grows.
+
+Generates banks of random questions, then times building the in-process
+LSH index, a check of a lookalike (one word changed, case and punctuation
+altered) and of a new question against a linear scan that scores every
+question in the bank. Also prints how many lookalikes each method catches,
+the index memory, and the full find_duplicate call with the incremental
+refresh query against POSTGRES_URL.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/near_duplicates.py
+"""
+
+import asyncio
+import random
+import string
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from common import BENCH_CHANNEL_BASE, BENCH_USER_ID, drop_channels, seed_channel
+from constants import DUPLICATE_SIMILARITY
+from db import AsyncSessionLocal, engine
+from duplicates import (
+    QuestionIndex,
+    find_duplicate,
+    normalize_question,
+    question_indexes,
+    question_key,
+    similarity,
+    trigrams,
+)
+from models import Quiz
+from sqlalchemy import insert
+
+SIZES = [1_000, 10_000, 100_000]
+WORDS = 5_000
+CHECKS = 500
+DB_QUIZZES = 20_000
+
+
+def vocabulary(rng: random.Random) -> list[str]:
+    return [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+        for _ in range(WORDS)
+    ]
+
+
+def bank(rng: random.Random, words: list[str], size: int) -> list[str]:
+    return [
+        " ".join(rng.choices(words, k=rng.randint(8, 16))).capitalize() + "?"
+        for _ in range(size)
+    ]
+
+
+def lookalike(rng: random.Random, words: list[str], question: str) -> str:
+    parts = question.rstrip("?").lower().split()
+    parts[rng.randrange(len(parts))] = rng.choice(words)
+    return " ".join(parts).upper() + " ?!"
+
+
+def scan(questions: list[str]) -> Callable[[str], bool]:
+    grams = [trigrams(normalize_question(q)) for q in questions]
+
+    def check(question: str) -> bool:
+        key = trigrams(normalize_question(question))
+        similar: bool = max(similarity(key, g) for g in grams) >= DUPLICATE_SIMILARITY
+        return similar
+
+    return check
+
+
+def lookup(index: QuestionIndex) -> Callable[[str], object]:
+    return lambda question: index.find(question_key(question))
+
+
+def per_check(fn: Callable[[str], object], items: list[str]) -> tuple[float, int]:
+    started = time.perf_counter()
+    found = sum(bool(fn(item)) for item in items)
+    return (time.perf_counter() - started) / len(items) * 1e6, found
+
+
+async def database_check(rng: random.Random, words: list[str]) -> None:
+    channel_id = BENCH_CHANNEL_BASE
+    questions = bank(rng, words, DB_QUIZZES)
+    async with AsyncSessionLocal() as session:
+        await drop_channels(session, [channel_id])
+        await seed_channel(session, channel_id, 0)
+        await session.execute(
+            insert(Quiz),
+            [
+                {
+                    "question": q,
+                    "correct_order": 0,
+                    "user_id": BENCH_USER_ID,
+                    "channel_id": channel_id,
+                }
+                for q in questions
+            ],
+        )
+        await session.commit()
+
+    try:
+        async with AsyncSessionLocal() as session:
+            started = time.perf_counter()
+            await find_duplicate(session, channel_id, questions[0])
+            cold = (time.perf_counter() - started) * 1000
+            checks = [lookalike(rng, words, q) for q in questions[:CHECKS]]
+            started = time.perf_counter()
+            for question in checks:
+                await find_duplicate(session, channel_id, question)
+            warm = (time.perf_counter() - started) / CHECKS * 1000
+        print(
+            f"find_duplicate over {DB_QUIZZES} quizzes in Postgres: "
+            f"first {cold:.0f} ms (loads the bank), then {warm:.2f} ms per check"
+        )
+    finally:
+        question_indexes.indexes.clear()
+        async with AsyncSessionLocal() as session:
+            await drop_channels(session, [channel_id])
+        await engine.dispose()
+
+
+async def main() -> None:
+    rng = random.Random(1)
+    words = vocabulary(rng)
+    print(f"similarity >= {DUPLICATE_SIMILARITY}, {CHECKS} checks per method")
+    print(
+        f"{'bank':>7} {'build s':>8} {'index MB':>8} {'lsh us':>8} "
+        f"{'scan us':>9} {'lsh found':>9} {'scan found':>10} {'new lsh us':>10}"
+    )
+    for size in SIZES:
+        questions = bank(rng, words, size)
+        started = time.perf_counter()
+        index = QuestionIndex()
+        for quiz_id, question in enumerate(questions):
+            index.add(quiz_id, question)
+        build = time.perf_counter() - started
+        tracemalloc.start()
+        copy = QuestionIndex()
+        for quiz_id, question in enumerate(questions):
+            copy.add(quiz_id, question)
+        memory = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        tracemalloc.stop()
+        del copy
+
+        checks = [lookalike(rng, words, q) for q in rng.sample(questions, CHECKS)]
+        fresh = bank(rng, words, CHECKS)
+        lsh, lsh_found = per_check(lookup(index), checks)
+        # the scan gets slow, so it checks fewer questions on big banks
+        scanned = checks[: max(CHECKS * 1_000 // size, 5)]
+        linear, scan_found = per_check(scan(questions), scanned)
+        scan_found = round(scan_found * len(checks) / len(scanned))
+        new, _ = per_check(lookup(index), fresh)
+        print(
+            f"{size:>7} {build:>8.2f} {memory:>8.1f} {lsh:>8.1f} {linear:>9.0f} "
+            f"{lsh_found:>9} {scan_found:>10} {new:>10.1f}"
+        )
+
+    await database_check(rng, words)
+
+
+asyncio.run(main())
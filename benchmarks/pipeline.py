@@ -0,0 +1,226 @@
+"""Drive the whole dispatcher through the bot's main flows.
+
+Feeds synthetic updates to dispatcher.dp.feed_update for each user: the bot
+being promoted in the user's channel and the user being promoted there,
+/start, the full /addquiz flow, /settings for the post time and the quiz
+count, then the user's demotion and the bot leaving. Bot API calls go to an
+in-process fake server, FSM state, caches, decks and scheduler jobs to
+fakeredis with a simulated round-trip time, and SQL to POSTGRES_URL, which
+must point at a migrated throwaway database (the upserts use Postgres
+dialect statements, so SQLite cannot stand in).
+
+A sequential pass under tracemalloc reports the peak memory each handler
+allocates, then concurrent passes for --users users report updates per
+second and p50/p99 latency per handler.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/pipeline.py --users 10 100
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Iterator
+from typing import Any
+
+import db
+import scheduler
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import TelegramObject, Update
+from bot import bot
+from cache import user_channels
+from common import BENCH_CHANNEL_BASE, drop_channels, latency_redis
+from db import AsyncSessionLocal, engine
+from dispatcher import dp, storage
+from fake_telegram import ADMIN_RIGHTS, BOT_USER, FakeTelegram, start_fake_telegram
+from fakeredis import FakeRedis, FakeServer
+from messages import Btn
+from models import User
+from sqlalchemy import delete
+
+API_PORT = 8086
+USER_BASE = 1_950_000_000
+RTT = 0.0005
+
+
+class HandlerStats:
+    def __init__(self) -> None:
+        self.timings: defaultdict[str, list[float]] = defaultdict(list)
+        self.allocated: defaultdict[str, list[int]] = defaultdict(list)
+
+    async def middleware(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        name = data["handler"].callback.__name__
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.timings[name].append((time.perf_counter() - started) * 1000)
+            if tracing:
+                self.allocated[name].append(tracemalloc.get_traced_memory()[1] - base)
+
+    def clear(self) -> None:
+        self.timings.clear()
+        self.allocated.clear()
+
+
+def message(user: dict[str, Any], text: str) -> dict[str, Any]:
+    return {
+        "message": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": user["id"], "type": "private"},
+            "from": user,
+            "text": text,
+        }
+    }
+
+
+def member_update(
+    kind: str, chat: dict[str, Any], user: dict[str, Any], promoted: bool
+) -> dict[str, Any]:
+    member = {"status": "member", "user": user}
+    admin = {"status": "administrator", "user": user, **ADMIN_RIGHTS}
+    return {
+        kind: {
+            "chat": chat,
+            "from": user,
+            "date": int(time.time()),
+            "old_chat_member": member if promoted else admin,
+            "new_chat_member": admin if promoted else member,
+        }
+    }
+
+
+def user_flow(i: int) -> list[dict[str, Any]]:
+    user = {"id": USER_BASE + i, "is_bot": False, "first_name": "bench"}
+    title = f"bench {i}"
+    chat = {"id": BENCH_CHANNEL_BASE - i, "type": "channel", "title": title}
+    texts = [
+        "/start",
+        "/addquiz",
+        title,
+        f"Question {i}?",
+        "A",
+        "B",
+        "C",
+        Btn.FINISH,
+        "B",
+        "Because",
+        Btn.APPROVE,
+        "/settings",
+        title,
+        Btn.TIME,
+        "09:30",
+        Btn.APPROVE,
+        "/settings",
+        title,
+        Btn.QUIZZES,
+        "5",
+        Btn.APPROVE,
+    ]
+    return [
+        member_update("my_chat_member", chat, BOT_USER, True),
+        member_update("chat_member", chat, user, True),
+        *(message(user, text) for text in texts),
+        member_update("chat_member", chat, user, False),
+        member_update("my_chat_member", chat, BOT_USER, False),
+    ]
+
+
+async def run(users: int, ids: Iterator[int]) -> float:
+    flows = [user_flow(i) for i in range(users)]
+
+    async def feed(flow: list[dict[str, Any]]) -> None:
+        for raw in flow:
+            update = Update.model_validate(raw | {"update_id": next(ids)})
+            await dp.feed_update(bot, update)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(feed(flow) for flow in flows))
+    return sum(map(len, flows)) / (time.perf_counter() - started)
+
+
+def use_fake_redis(server: FakeServer) -> None:
+    real, fake = db.redis, latency_redis(RTT, server)
+    for module in list(sys.modules.values()):
+        if getattr(module, "redis", None) is real:
+            vars(module)["redis"] = fake
+    user_channels.redis = fake
+    storage.redis = fake
+    scheduler.jobstore.redis = FakeRedis(server=server)
+
+
+async def reset(users: int) -> None:
+    async with AsyncSessionLocal() as session:
+        await drop_channels(session, [BENCH_CHANNEL_BASE - i for i in range(users)])
+        await session.execute(
+            delete(User).where(User.id.between(USER_BASE, USER_BASE + users))
+        )
+        await session.commit()
+    await user_channels.invalidate([USER_BASE + i for i in range(users)])
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    server = FakeServer()
+    use_fake_redis(server)
+    telegram = FakeTelegram(args.latency, rate=10**9, chat_rate=10**9)
+    api = await start_fake_telegram(telegram, port=API_PORT)
+    bot.session.api = TelegramAPIServer.from_base(f"http://127.0.0.1:{API_PORT}")
+    scheduler.scheduler.start(paused=True)
+
+    stats = HandlerStats()
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(stats.middleware)
+
+    ids = itertools.count(1)
+    updates = len(user_flow(0))
+    print(f"{updates} updates per user, api latency {args.latency * 1000:.0f} ms")
+    try:
+        await reset(1)
+        tracemalloc.start()
+        await run(1, ids)
+        tracemalloc.stop()
+        allocated = {name: max(sizes) for name, sizes in stats.allocated.items()}
+
+        for users in args.users:
+            await reset(users)
+            stats.clear()
+            rate = await run(users, ids)
+            print(f"\n{users} users: {rate:.0f} updates/s")
+            print(
+                f"{'handler':>24} {'calls':>6} {'p50 ms':>7} {'p99 ms':>7} {'KiB':>6}"
+            )
+            for name, timings in sorted(stats.timings.items()):
+                p99 = statistics.quantiles(timings, n=100)[98] if users > 1 else 0
+                print(
+                    f"{name:>24} {len(timings):>6} {statistics.median(timings):>7.1f} "
+                    f"{p99:>7.1f} {allocated.get(name, 0) / 1024:>6.0f}"
+                )
+    finally:
+        scheduler.scheduler.shutdown(wait=False)
+        await reset(max(args.users))
+        await api.cleanup()
+        await bot.session.close()
+        await engine.dispose()
+
+
+asyncio.run(main())
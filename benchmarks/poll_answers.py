@@ -0,0 +1,152 @@
+"""Measure poll answer ingestion on a popular channel.
+
+Seeds throwaway quizzes and poll_posts rows in POSTGRES_URL, then replays a
+stream of poll updates with growing running totals (a few polls get most of
+the votes, as after a morning post) through the poll handler, once writing
+each update straight to Postgres and once through the AnswerBuffer. Prints
+updates per second, SQL statements per update and checks both end with the
+final counts.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/poll_answers.py
+"""
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+
+from aiogram.types import Poll, PollOption
+from common import BENCH_CHANNEL_BASE, drop_channels, seed_channel
+from db import AsyncSessionLocal, engine
+from models import PollPost, Quiz
+from polls import AnswerBuffer, write_poll_tallies
+from sqlalchemy import event, insert, select
+
+POLLS = 200
+UPDATES = 20_000
+CONCURRENCY = 100
+FLUSH_INTERVAL = 0.5
+
+
+def poll_updates() -> list[Poll]:
+    rng = random.Random(1)
+    votes = [[0, 0, 0, 0] for _ in range(POLLS)]
+    updates = []
+    for _ in range(UPDATES):
+        i = min(int(rng.expovariate(10 / POLLS)), POLLS - 1)
+        votes[i][rng.choice([0, 0, 1, 2, 3])] += 1
+        updates.append(
+            Poll(
+                id=f"bench{i}",
+                question="q",
+                options=[
+                    PollOption(text=str(n), voter_count=v)
+                    for n, v in enumerate(votes[i])
+                ],
+                total_voter_count=sum(votes[i]),
+                is_closed=False,
+                is_anonymous=True,
+                type="quiz",
+                allows_multiple_answers=False,
+                correct_option_id=0,
+            )
+        )
+    return updates
+
+
+async def write_each(poll: Poll) -> None:
+    counts = (poll.total_voter_count, poll.options[0].voter_count)
+    async with AsyncSessionLocal() as session:
+        await write_poll_tallies(session, {poll.id: counts})
+        await session.commit()
+
+
+async def seed(channel_id: int) -> None:
+    async with AsyncSessionLocal() as session:
+        await drop_channels(session, [channel_id])
+        await seed_channel(session, channel_id, POLLS)
+        quiz_ids = (
+            await session.scalars(select(Quiz.id).where(Quiz.channel_id == channel_id))
+        ).all()
+        await session.execute(
+            insert(PollPost),
+            [
+                {
+                    "poll_id": f"bench{i}",
+                    "message_id": i,
+                    "channel_id": channel_id,
+                    "quiz_id": quiz_id,
+                }
+                for i, quiz_id in enumerate(quiz_ids)
+            ],
+        )
+        await session.commit()
+
+
+async def final_counts(channel_id: int) -> dict[str, tuple[int, int]]:
+    async with AsyncSessionLocal() as session:
+        rows = await session.execute(
+            select(
+                PollPost.poll_id, PollPost.total_voters, PollPost.correct_voters
+            ).where(PollPost.channel_id == channel_id)
+        )
+        return {poll_id: (total, correct) for poll_id, total, correct in rows}
+
+
+async def run(updates: list[Poll], handle: Callable[[Poll], Awaitable[None]]) -> None:
+    queue: asyncio.Queue[Poll] = asyncio.Queue()
+    for poll in updates:
+        queue.put_nowait(poll)
+
+    async def worker() -> None:
+        while not queue.empty():
+            await handle(queue.get_nowait())
+
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+
+
+async def main() -> None:
+    statements = 0
+
+    def count(*args: object) -> None:
+        nonlocal statements
+        statements += 1
+
+    channel_id = BENCH_CHANNEL_BASE
+    updates = poll_updates()
+    expected = {
+        poll.id: (poll.total_voter_count, poll.options[0].voter_count)
+        for poll in updates
+    }
+    buffer = AnswerBuffer(FLUSH_INTERVAL)
+
+    async def buffered(poll: Poll) -> None:
+        buffer.add(poll)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    print(f"{UPDATES} poll updates for {POLLS} polls, {CONCURRENCY} at once")
+    print(f"{'method':>10} {'updates/s':>10} {'stmts/update':>12} {'correct':>7}")
+    try:
+        for name, handle in (("per update", write_each), ("buffered", buffered)):
+            await seed(channel_id)
+            statements = 0
+            started = time.perf_counter()
+            await run(updates, handle)
+            # buffered counts are only durable once the last flush is done
+            await buffer.stop()
+            elapsed = time.perf_counter() - started
+            per_update = statements / UPDATES
+            counts = await final_counts(channel_id)
+            correct = all(counts[poll_id] == c for poll_id, c in expected.items())
+            print(
+                f"{name:>10} {UPDATES / elapsed:>10.0f} "
+                f"{per_update:>12.4f} {str(correct):>7}"
+            )
+        print(f"buffer: {buffer.stats}")
+    finally:
+        async with AsyncSessionLocal() as session:
+            await drop_channels(session, [channel_id])
+        await engine.dispose()
+
+
+asyncio.run(main())
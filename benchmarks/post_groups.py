@@ -0,0 +1,112 @@
+"""Measure grouped post jobs for channels spread across timezones.
+
+Gives throwaway channels in fakeredis a timezone and either the spread
+default time, a custom daily time or a two-slot weekday schedule, then
+schedules them all. Prints the jobs, job store size and scheduler wakeups a
+day against one job per channel and slot, the time to schedule every
+channel, and the time the busiest group takes to fan out to its members
+with posting stubbed out.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/post_groups.py
+"""
+
+import asyncio
+import random
+import time
+from collections import Counter
+
+import scheduler
+from common import BENCH_CHANNEL_BASE
+from fakeredis import FakeAsyncRedis, FakeRedis, FakeServer
+from schedules import dump_schedule, parse_schedule_input
+
+CHANNELS = 20_000
+# zones with a fixed offset share UTC groups, Tashkent and Karachi both +05
+ZONES = {
+    "Asia/Tashkent": 50,
+    "Asia/Karachi": 10,
+    "Asia/Almaty": 10,
+    "Europe/Moscow": 10,
+    "Europe/Berlin": 10,
+    "America/New_York": 5,
+    "UTC": 5,
+}
+TIMES = ["08:00", "09:00", "12:00", "18:00", "20:00", "21:30"]
+SCHEDULE = "09:00 3 weekdays\n19:00 3 weekdays"
+
+
+async def seed(rng: random.Random) -> int:
+    slots = 0
+    schedule = dump_schedule(parse_schedule_input(SCHEDULE, 10))
+    async with scheduler.redis.pipeline(transaction=False) as pipe:
+        for i in range(CHANNELS):
+            zone = rng.choices(list(ZONES), weights=list(ZONES.values()))[0]
+            settings = {"timezone": zone}
+            kind = rng.random()
+            if kind < 0.3:
+                settings["time"] = rng.choice(TIMES)
+            elif kind < 0.4:
+                settings["schedule"] = schedule
+            slots += 2 if "schedule" in settings else 1
+            pipe.hset(BENCH_CHANNEL_BASE - i, mapping=settings)
+        await pipe.execute()
+    return slots
+
+
+async def wakeups() -> float:
+    # a job wakes the scheduler and is rewritten in the store on each run
+    days = await scheduler.group_days(
+        [job.args[0] for job in scheduler.scheduler.get_jobs()]
+    )
+    return sum(bin(mask).count("1") for mask in days.values()) / 7
+
+
+async def fan_out() -> tuple[str, int, float]:
+    sizes: Counter[str] = Counter()
+    for groups in (await scheduler.redis.hgetall(scheduler.GROUPS_KEY)).values():
+        sizes.update(groups.split(","))
+    [(busiest, members)] = sizes.most_common(1)
+
+    async def send(channel_id: int, quiz_count: int) -> None:
+        pass
+
+    scheduler.send_channel_quizzes = send
+    started = time.perf_counter()
+    await scheduler.run_post_group(busiest)
+    return busiest, members, time.perf_counter() - started
+
+
+async def main() -> None:
+    server = FakeServer()
+    scheduler.redis = FakeAsyncRedis(server=server, decode_responses=True)
+    scheduler.jobstore.redis = FakeRedis(server=server)
+    scheduler.scheduler.start(paused=True)
+    try:
+        slots = await seed(random.Random(1))
+        started = time.perf_counter()
+        for i in range(CHANNELS):
+            await scheduler.schedule_channel(BENCH_CHANNEL_BASE - i)
+        elapsed = time.perf_counter() - started
+
+        jobs = await scheduler.redis.hlen(scheduler.JOBS_KEY)
+        stored = sum(
+            len(value) for value in scheduler.jobstore.redis.hvals(scheduler.JOBS_KEY)
+        )
+        print(f"{CHANNELS} channels in {len(ZONES)} zones, {slots} slots")
+        print(f"{'':>12} {'jobs':>6} {'store KB':>8} {'wakeups/day':>11}")
+        print(f"{'per slot':>12} {slots:>6} {'':>8} {slots:>11}")
+        print(
+            f"{'grouped':>12} {jobs:>6} {stored / 1024:>8.0f} {await wakeups():>11.0f}"
+        )
+        print(f"scheduling every channel: {elapsed / CHANNELS * 1000:.2f} ms each")
+
+        key, members, seconds = await fan_out()
+        print(
+            f"busiest group {key}: {members} channels fanned out "
+            f"in {seconds * 1000:.0f} ms"
+        )
+    finally:
+        scheduler.scheduler.shutdown(wait=False)
+
+
+asyncio.run(main())
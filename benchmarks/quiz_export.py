@@ -0,0 +1,102 @@
+"""Measure channel quiz export time and memory against bank size.
+
+Seeds channels of growing size in POSTGRES_URL and exports each one to a
+spooled temporary file, once by loading every quiz with its options through
+the ORM and serialising the list, and once with the streaming exporter
+/export uses. The naive peak grows with the bank, the streaming peak stays
+flat.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/quiz_export.py
+"""
+
+import asyncio
+import io
+import json
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+
+from common import BENCH_CHANNEL_BASE, drop_channels, seed_channel
+from constants import EXPORT_SPOOL_SIZE
+from db import AsyncSessionLocal, engine
+from exporter import export_quizzes
+from models import Quiz
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+SIZES = [1_000, 10_000, 50_000]
+
+
+async def load_all(channel_id: int, out: io.TextIOWrapper) -> int:
+    async with AsyncSessionLocal() as session:
+        quizzes = (
+            await session.scalars(
+                select(Quiz)
+                .where(Quiz.channel_id == channel_id)
+                .options(selectinload(Quiz.options))
+                .order_by(Quiz.id)
+            )
+        ).all()
+    records = [
+        {
+            "question": quiz.question,
+            "options": [opt.option for opt in quiz.options],
+            "correct": quiz.correct_order + 1,
+            "explanation": quiz.explanation,
+        }
+        for quiz in quizzes
+    ]
+    out.write("\n".join(json.dumps(record) for record in records))
+    return len(records)
+
+
+async def streaming(channel_id: int, out: io.TextIOWrapper) -> int:
+    async with AsyncSessionLocal() as session:
+        exported: int = await export_quizzes(session, channel_id, "jsonl", out)
+    return exported
+
+
+async def measure(
+    name: str, size: int, channel_id: int, export: Callable[..., Awaitable[int]]
+) -> None:
+    async def run() -> int:
+        with tempfile.SpooledTemporaryFile(EXPORT_SPOOL_SIZE) as file:
+            out = io.TextIOWrapper(file, encoding="utf-8", newline="")
+            count = await export(channel_id, out)
+            out.flush()
+            out.detach()
+        return count
+
+    started = time.perf_counter()
+    count = await run()
+    elapsed = time.perf_counter() - started
+    assert count == size, count
+
+    # tracing slows Python down a lot, so memory is measured on a second run
+    tracemalloc.start()
+    await run()
+    peak = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    print(f"{name:>10} {size:>7} {size / elapsed:>9.0f} {peak:>11.0f}")
+
+
+async def main() -> None:
+    channel_ids = [BENCH_CHANNEL_BASE - i for i in range(len(SIZES))]
+    async with AsyncSessionLocal() as session:
+        await drop_channels(session, channel_ids)
+        for channel_id, size in zip(channel_ids, SIZES, strict=True):
+            await seed_channel(session, channel_id, size)
+
+    print(f"{'method':>10} {'quizzes':>7} {'quizzes/s':>9} {'peak KiB':>11}")
+    try:
+        for channel_id, size in zip(channel_ids, SIZES, strict=True):
+            await measure("load all", size, channel_id, load_all)
+            await measure("streaming", size, channel_id, streaming)
+    finally:
+        async with AsyncSessionLocal() as session:
+            await drop_channels(session, channel_ids)
+        await engine.dispose()
+
+
+asyncio.run(main())
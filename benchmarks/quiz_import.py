@@ -0,0 +1,175 @@
+"""Measure quiz import throughput.
+
+Writes a generated bank (with a few invalid rows) as CSV, JSON lines and a
+JSON array, then imports it into a throwaway channel in POSTGRES_URL with
+the per-quiz path /addquiz uses, batched multi-row INSERT ... RETURNING and
+COPY. Prints rows per second and peak Python allocations, which should not
+grow with the bank size for the streaming paths.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/quiz_import.py
+"""
+
+import asyncio
+import csv
+import json
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+import deck
+import importer
+from common import BENCH_CHANNEL_BASE, BENCH_USER_ID, drop_channels, seed_channel
+from db import AsyncSessionLocal, engine
+from fakeredis import FakeAsyncRedis
+from handlers.quizzes_fsm import save_quiz_to_db
+from sqlalchemy import text
+from type import ChannelRef, QuizData
+
+ROWS = 20_000
+SLOW_ROWS = 2_000
+INVALID_EVERY = 100
+CHANNEL_ID = BENCH_CHANNEL_BASE
+
+
+def bank(rows: int) -> list[dict[str, Any]]:
+    quizzes = []
+    for i in range(rows):
+        options = [f"Option {j} for {i} " + "z" * 60 for j in range(4)]
+        question = f"Question {i} " + "x" * 200
+        if i % INVALID_EVERY == 0:
+            question = "x" * 301
+        quizzes.append(
+            {
+                "question": question,
+                "options": options,
+                "correct": i % 4 + 1,
+                "explanation": "y" * 150,
+            }
+        )
+    return quizzes
+
+
+def write_files(directory: Path, quizzes: list[dict[str, Any]]) -> dict[str, Path]:
+    paths = {
+        "csv": directory / "bank.csv",
+        "jsonl": directory / "bank.jsonl",
+        "json array": directory / "bank.json",
+    }
+    with open(paths["csv"], "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["question", *[f"option{i}" for i in range(1, 5)], "correct", "explanation"]
+        )
+        for quiz in quizzes:
+            writer.writerow(
+                [
+                    quiz["question"],
+                    *quiz["options"],
+                    quiz["correct"],
+                    quiz["explanation"],
+                ]
+            )
+    with open(paths["jsonl"], "w", encoding="utf-8") as f:
+        for quiz in quizzes:
+            f.write(json.dumps(quiz) + "\n")
+    with open(paths["json array"], "w", encoding="utf-8") as f:
+        json.dump(quizzes, f, indent=1)
+    return paths
+
+
+async def per_quiz(path: Path) -> int:
+    with open(path, encoding="utf-8", newline="") as stream:
+        rows = []
+        for _, record in importer.iter_records(stream, "json"):
+            try:
+                rows.append(importer.parse_quiz(record))
+            except ValueError:
+                continue
+            if len(rows) == SLOW_ROWS:
+                break
+
+    channel = ChannelRef(id=CHANNEL_ID, title="bench")
+    async with AsyncSessionLocal() as session:
+        for row in rows:
+            data = QuizData(
+                channels=[channel],
+                user_id=BENCH_USER_ID,
+                channel=channel,
+                question=row.question,
+                options=row.options,
+                correct_order=row.correct_order,
+                explanation=row.explanation,
+            )
+            await save_quiz_to_db(session, data)
+        await session.commit()
+    return len(rows)
+
+
+def batched(path: Path, fmt: str) -> Callable[[], Awaitable[int]]:
+    async def run() -> int:
+        with open(path, encoding="utf-8", newline="") as stream:
+            async with AsyncSessionLocal() as session:
+                result = await importer.import_quizzes(
+                    session, stream, fmt, CHANNEL_ID, BENCH_USER_ID
+                )
+                await session.commit()
+        assert result.failed == ROWS // INVALID_EVERY, result.failed
+        imported: int = result.imported
+        return imported
+
+    return run
+
+
+async def reset_channel() -> None:
+    async with AsyncSessionLocal() as session:
+        await drop_channels(session, [CHANNEL_ID])
+        await seed_channel(session, CHANNEL_ID, 0)
+
+    # stale statistics on the emptied tables make the foreign key checks on
+    # options pick sequential scans, which would dominate every run
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ("quizzes", "options"):
+            await conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+
+async def measure(name: str, run: Callable[[], Awaitable[int]]) -> None:
+    await reset_channel()
+    started = time.perf_counter()
+    rows = await run()
+    elapsed = time.perf_counter() - started
+
+    # tracing slows Python down a lot, so memory is measured on a second run
+    await reset_channel()
+    tracemalloc.start()
+    await run()
+    peak = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    print(f"{name:>24} {rows:>7} {rows / elapsed:>9.0f} {peak:>11.0f}")
+
+
+async def main() -> None:
+    deck.redis = FakeAsyncRedis(decode_responses=True)
+    write_batch = importer.write_batch
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_files(Path(directory), bank(ROWS))
+        print(f"{ROWS} rows, 1 in {INVALID_EVERY} invalid")
+        print(f"{'method':>24} {'rows':>7} {'rows/s':>9} {'peak KiB':>11}")
+        try:
+            await measure("per quiz (/addquiz)", lambda: per_quiz(paths["jsonl"]))
+            importer.write_batch = importer.insert_batch
+            await measure("multi-row insert, csv", batched(paths["csv"], "csv"))
+            importer.write_batch = write_batch
+            for name, path in paths.items():
+                fmt = "csv" if name == "csv" else "json"
+                await measure(f"copy, {name}", batched(path, fmt))
+        finally:
+            async with AsyncSessionLocal() as session:
+                await drop_channels(session, [CHANNEL_ID])
+            await engine.dispose()
+
+
+asyncio.run(main())
@@ -0,0 +1,69 @@
+"""Compare the legacy in-Python quiz sampling with database-side sampling.
+
+Seeds throwaway channels of increasing size into POSTGRES_URL, prints median
+latency and peak Python allocations for both strategies, then removes them.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/sampling.py
+"""
+
+import asyncio
+import random
+
+from bot import get_quizzes_by_ids
+from common import BENCH_CHANNEL_BASE, drop_channels, measure, seed_channel
+from db import AsyncSessionLocal, engine
+from models import Quiz
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+
+SIZES = [100, 1_000, 10_000, 50_000]
+QUIZ_COUNT = 10
+
+
+async def legacy_sample(channel_id: int, n: int) -> list[Quiz]:
+    stmt = (
+        select(Quiz)
+        .where(Quiz.channel_id == channel_id)
+        .options(joinedload(Quiz.options))
+    )
+    async with AsyncSessionLocal() as session:
+        quizzes = (await session.scalars(stmt)).unique().all()
+    return random.sample(quizzes, min(n, len(quizzes)))
+
+
+async def db_sample(channel_id: int, n: int) -> list[Quiz]:
+    stmt = (
+        select(Quiz.id)
+        .where(Quiz.channel_id == channel_id)
+        .order_by(func.random())
+        .limit(n)
+    )
+    async with AsyncSessionLocal() as session:
+        ids = list(await session.scalars(stmt))
+        quizzes: list[Quiz] = await get_quizzes_by_ids(session, ids)
+    return quizzes
+
+
+async def main() -> None:
+    channel_ids = [BENCH_CHANNEL_BASE - i for i in range(len(SIZES))]
+    async with AsyncSessionLocal() as session:
+        await drop_channels(session, channel_ids)
+        for channel_id, size in zip(channel_ids, SIZES, strict=True):
+            await seed_channel(session, channel_id, size)
+
+    print(f"{'quizzes':>8} {'strategy':>8} {'median ms':>10} {'peak KiB':>10}")
+    try:
+        for channel_id, size in zip(channel_ids, SIZES, strict=True):
+            for name, strategy in (
+                ("legacy", legacy_sample),
+                ("db", db_sample),
+            ):
+                ms, kib = await measure(strategy, channel_id, QUIZ_COUNT)
+                print(f"{size:>8} {name:>8} {ms:>10.2f} {kib:>10.0f}")
+    finally:
+        async with AsyncSessionLocal() as session:
+            await drop_channels(session, channel_ids)
+        await engine.dispose()
+
+
+asyncio.run(main())
@@ -0,0 +1,95 @@
+"""Measure multi-slot schedules in the APScheduler job store.
+
+Gives throwaway channels in fakeredis a weekday schedule of three posts plus
+a weekend one, schedules them, then moves one weekday slot on every channel.
+Prints the jobs stored against one job per slot, and the job store writes
+and time of the settings change done incrementally against taking the
+channel out of all its groups and adding it back.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/schedule_updates.py
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import scheduler
+from common import BENCH_CHANNEL_BASE
+from fakeredis import FakeAsyncRedis, FakeRedis, FakeServer
+from schedules import dump_schedule, parse_schedule_input
+
+CHANNELS = 2_000
+BEFORE = "09:00 3 weekdays\n13:00 3 weekdays\n20:00 3 weekdays\n11:00 5 weekends"
+AFTER = "09:00 3 weekdays\n13:00 3 weekdays\n21:00 3 weekdays\n11:00 5 weekends"
+
+
+class Writes:
+    def __init__(self) -> None:
+        self.count = 0
+        add_job, remove_job = (
+            scheduler.scheduler.add_job,
+            scheduler.scheduler.remove_job,
+        )
+
+        def counted(fn: Callable[..., Any]) -> Callable[..., Any]:
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                self.count += 1
+                return fn(*args, **kwargs)
+
+            return wrapper
+
+        scheduler.scheduler.add_job = counted(add_job)
+        scheduler.scheduler.remove_job = counted(remove_job)
+
+
+async def store_schedule(text: str) -> None:
+    schedule = dump_schedule(parse_schedule_input(text, 10))
+    async with scheduler.redis.pipeline(transaction=False) as pipe:
+        for i in range(CHANNELS):
+            pipe.hset(BENCH_CHANNEL_BASE - i, "schedule", schedule)
+        await pipe.execute()
+
+
+async def replace_all(channel_id: int) -> None:
+    await scheduler.unschedule_channel(channel_id)
+    await scheduler.schedule_channel(channel_id)
+
+
+async def timed(update: Callable[[int], Awaitable[None]], writes: Writes) -> str:
+    await store_schedule(AFTER)
+    writes.count = 0
+    started = time.perf_counter()
+    for i in range(CHANNELS):
+        await update(BENCH_CHANNEL_BASE - i)
+    elapsed = time.perf_counter() - started
+    return f"{writes.count / CHANNELS:>13.1f} {elapsed:>6.2f}"
+
+
+async def main() -> None:
+    server = FakeServer()
+    scheduler.redis = FakeAsyncRedis(server=server, decode_responses=True)
+    scheduler.jobstore.redis = FakeRedis(server=server)
+    scheduler.scheduler.start(paused=True)
+    writes = Writes()
+
+    slots = len(parse_schedule_input(BEFORE, 10))
+    print(f"{CHANNELS} channels, {slots} slots each")
+    print(f"{'method':>12} {'jobs':>7} {'writes/change':>13} {'time s':>6}")
+    try:
+        for name, update in (
+            ("replace all", replace_all),
+            ("incremental", scheduler.schedule_channel),
+        ):
+            await scheduler.redis.flushall()
+            await store_schedule(BEFORE)
+            for i in range(CHANNELS):
+                await scheduler.schedule_channel(BENCH_CHANNEL_BASE - i)
+            jobs = await scheduler.redis.hlen(scheduler.JOBS_KEY)
+            print(f"{name:>12} {jobs:>7} {await timed(update, writes)}")
+        print(f"{'per slot':>12} {CHANNELS * slots:>7}")
+    finally:
+        scheduler.scheduler.shutdown(wait=False)
+
+
+asyncio.run(main())
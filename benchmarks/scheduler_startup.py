@@ -0,0 +1,90 @@
+"""Measure scheduler startup against channel count.
+
+Seeds throwaway active channels into POSTGRES_URL, stores custom settings for
+a fraction of them in fakeredis with a simulated round-trip time, then times
+the legacy one-HGETALL-per-channel loop against a cold setup_scheduler and a
+restart where the jobs are already persisted and one channel was added.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/scheduler_startup.py
+"""
+
+import asyncio
+import time
+
+import scheduler
+from common import BENCH_CHANNEL_BASE, latency_redis
+from db import AsyncSessionLocal, engine
+from fakeredis import FakeRedis, FakeServer
+from models import Channel
+from sqlalchemy import delete, insert, select
+
+SIZES = [1_000, 10_000, 20_000]
+RTT = 0.0005
+
+
+async def legacy_setup() -> None:
+    async with AsyncSessionLocal() as session:
+        stmt = select(Channel).where(Channel.active)
+        channels = (await session.scalars(stmt)).all()
+    for channel in channels:
+        await scheduler.schedule_channel(channel.id)
+    scheduler.scheduler.start(paused=True)
+
+
+async def seed(size: int) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(Channel).where(Channel.id <= BENCH_CHANNEL_BASE))
+        await session.execute(
+            insert(Channel),
+            [
+                {"id": BENCH_CHANNEL_BASE - i, "title": f"bench {i}", "active": True}
+                for i in range(size)
+            ],
+        )
+        await session.commit()
+
+    await scheduler.redis.flushall()
+    async with scheduler.redis.pipeline(transaction=False) as pipe:
+        for i in range(0, size, 10):
+            pipe.hset(BENCH_CHANNEL_BASE - i, mapping={"time": "10:00"})
+        await pipe.execute()
+
+
+async def main() -> None:
+    server = FakeServer()
+    scheduler.redis = latency_redis(RTT, server)
+    scheduler.jobstore.redis = FakeRedis(server=server)
+
+    print(f"redis rtt {RTT * 1000:.1f} ms")
+    print(f"{'channels':>8} {'legacy s':>9} {'cold s':>7} {'restart s':>10}")
+    try:
+        for size in SIZES:
+            timings = []
+            for setup in (legacy_setup, scheduler.setup_scheduler):
+                await seed(size)
+                started = time.perf_counter()
+                await setup()
+                timings.append(time.perf_counter() - started)
+                scheduler.scheduler.shutdown(wait=False)
+
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    insert(Channel),
+                    {"id": BENCH_CHANNEL_BASE - size, "title": "new", "active": True},
+                )
+                await session.commit()
+            started = time.perf_counter()
+            await scheduler.setup_scheduler()
+            timings.append(time.perf_counter() - started)
+            scheduler.scheduler.shutdown(wait=False)
+            print("{:>8} {:>9.2f} {:>7.2f} {:>10.2f}".format(size, *timings))
+    finally:
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                delete(Channel).where(Channel.id <= BENCH_CHANNEL_BASE)
+            )
+            await session.commit()
+        await engine.dispose()
+
+
+asyncio.run(main())
@@ -0,0 +1,105 @@
+"""Load-test PollSender against the fake Bot API.
+
+Fires every channel's batch at once, the way APScheduler does at a shared
+post time, and compares unthrottled per-channel loops with PollSender.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/send_throughput.py
+"""
+
+import asyncio
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.enums import PollType
+from aiogram.exceptions import TelegramAPIError
+from fake_telegram import FakeTelegram, start_fake_telegram
+from models import Option, Quiz
+from sender import PollSender
+
+PORT = 8082
+TOKEN = "42:fake"
+CHANNELS = 200
+POLLS = 10
+RATE = 300
+CHAT_RATE = 20
+WORKERS = 16
+
+
+def make_quizzes(channel_id: int) -> list[Quiz]:
+    return [
+        Quiz(
+            id=i,
+            question=f"Question {i}?",
+            correct_order=0,
+            explanation=None,
+            channel_id=channel_id,
+            options=[Option(option=f"Option {j}", order=j) for j in range(4)],
+        )
+        for i in range(POLLS)
+    ]
+
+
+async def unthrottled(bot: Bot, channel_id: int, quizzes: list[Quiz]) -> int:
+    failed = 0
+    for quiz in quizzes:
+        try:
+            await bot.send_poll(
+                channel_id,
+                quiz.question,
+                [opt.option for opt in quiz.options],
+                correct_option_id=quiz.correct_order,
+                type=PollType.QUIZ,
+            )
+        except TelegramAPIError:
+            failed += 1
+    return failed
+
+
+async def run(name: str, bot: Bot, telegram: FakeTelegram) -> None:
+    telegram.flood_errors = 0
+    telegram.chat_sent.clear()
+    batches = {-(10**12) - i: make_quizzes(-(10**12) - i) for i in range(CHANNELS)}
+    sender = PollSender(bot, RATE, CHAT_RATE, WORKERS)
+
+    started = time.perf_counter()
+    if name == "sender":
+        await asyncio.gather(*(sender.send(cid, q) for cid, q in batches.items()))
+        failed = sender.stats.failed
+        await sender.stop()
+    else:
+        results = await asyncio.gather(
+            *(unthrottled(bot, cid, q) for cid, q in batches.items())
+        )
+        failed = sum(results)
+    elapsed = time.perf_counter() - started
+
+    total = CHANNELS * POLLS
+    print(
+        f"{name:>11} {elapsed:>8.2f}s {(total - failed) / elapsed:>8.1f}/s "
+        f"{failed:>7} {telegram.flood_errors:>6} {sender.stats.retried:>8}"
+    )
+
+
+async def main() -> None:
+    telegram = FakeTelegram(latency=0.02, rate=RATE, chat_rate=CHAT_RATE)
+    runner = await start_fake_telegram(telegram, port=PORT)
+    session = AiohttpSession(
+        api=TelegramAPIServer.from_base(f"http://127.0.0.1:{PORT}")
+    )
+    bot = Bot(TOKEN, session=session)
+
+    print(f"{CHANNELS} channels x {POLLS} polls, api limit {RATE}/s")
+    header = ("mode", "wall", "sent", "failed", "429s", "retried")
+    print("{:>11} {:>9} {:>10} {:>7} {:>6} {:>8}".format(*header))
+    try:
+        for name in ("unthrottled", "sender"):
+            await run(name, bot, telegram)
+            await asyncio.sleep(1)
+    finally:
+        await session.close()
+        await runner.cleanup()
+
+
+asyncio.run(main())
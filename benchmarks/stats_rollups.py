@@ -0,0 +1,143 @@
+"""Compare /stats over raw poll posts with reads from the rollups.
+
+Seeds a throwaway channel in POSTGRES_URL with quizzes and poll_posts rows
+spread over the past months, then for growing post counts times the
+"hardest quizzes" and "posting history" reports computed on demand from
+poll_posts against the rollup reads /stats uses, the first full rollup and
+an incremental one after a share of the posts got new answers.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/stats_rollups.py
+"""
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+
+from common import BENCH_CHANNEL_BASE, drop_channels, seed_channel
+from constants import STATS_MIN_VOTERS, TIMEZONE
+from db import AsyncSessionLocal, engine
+from models import PollPost, Quiz
+from rollups import aggregate_stats, hardest_quizzes, posting_history
+from sqlalchemy import Float, cast, func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+QUIZZES = 2_000
+SIZES = [10_000, 100_000, 500_000]
+DAYS = 180
+TOUCHED = 0.01
+REPEAT = 20
+
+
+async def seed(channel_id: int, posts: int) -> None:
+    rng = random.Random(1)
+    now = datetime.now(UTC)
+    async with AsyncSessionLocal() as session:
+        await drop_channels(session, [channel_id])
+        await seed_channel(session, channel_id, QUIZZES)
+        quiz_ids = (
+            await session.scalars(select(Quiz.id).where(Quiz.channel_id == channel_id))
+        ).all()
+        for start in range(0, posts, 10_000):
+            rows = []
+            for i in range(start, min(start + 10_000, posts)):
+                voters = rng.randrange(100)
+                rows.append(
+                    {
+                        "poll_id": f"bench{i}",
+                        "message_id": i,
+                        "channel_id": channel_id,
+                        "quiz_id": rng.choice(quiz_ids),
+                        "total_voters": voters,
+                        "correct_voters": rng.randint(0, voters),
+                        "created_at": now - timedelta(days=rng.random() * DAYS),
+                    }
+                )
+            await session.execute(insert(PollPost), rows)
+        await session.commit()
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE poll_posts"))
+
+
+async def on_demand(session: AsyncSession, channel_id: int) -> None:
+    voters = func.sum(PollPost.total_voters)
+    rate = cast(func.sum(PollPost.correct_voters), Float) / voters
+    hardest = (
+        select(Quiz.question, rate, voters)
+        .join(Quiz, Quiz.id == PollPost.quiz_id)
+        .where(PollPost.channel_id == channel_id)
+        .group_by(Quiz.id)
+        .having(voters >= STATS_MIN_VOTERS)
+        .order_by(rate)
+        .limit(5)
+    )
+    day = func.date(func.timezone(TIMEZONE, PollPost.created_at))
+    history = (
+        select(day, func.count(), voters, func.sum(PollPost.correct_voters))
+        .where(PollPost.channel_id == channel_id)
+        .group_by(day)
+        .order_by(day.desc())
+        .limit(7)
+    )
+    await session.execute(hardest)
+    await session.execute(history)
+
+
+async def from_rollups(session: AsyncSession, channel_id: int) -> None:
+    await hardest_quizzes(session, channel_id)
+    await posting_history(session, channel_id)
+
+
+async def timed(
+    report: Callable[[AsyncSession, int], Awaitable[None]], channel_id: int
+) -> float:
+    async with AsyncSessionLocal() as session:
+        await report(session, channel_id)
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            await report(session, channel_id)
+        return (time.perf_counter() - started) / REPEAT * 1000
+
+
+async def main() -> None:
+    channel_id = BENCH_CHANNEL_BASE
+    print(f"{QUIZZES} quizzes, posts over {DAYS} days")
+    print(
+        f"{'posts':>7} {'raw ms':>8} {'rollup ms':>9} {'full rollup s':>13} "
+        f"{'incremental s':>13}"
+    )
+    try:
+        for size in SIZES:
+            await seed(channel_id, size)
+            raw = await timed(on_demand, channel_id)
+
+            started = time.perf_counter()
+            await aggregate_stats()
+            full = time.perf_counter() - started
+            rollup = await timed(from_rollups, channel_id)
+
+            touched = [f"bench{i}" for i in range(0, size, int(1 / TOUCHED))]
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    update(PollPost)
+                    .where(PollPost.poll_id.in_(touched))
+                    .values(total_voters=PollPost.total_voters + 1)
+                )
+                await session.commit()
+            started = time.perf_counter()
+            await aggregate_stats()
+            incremental = time.perf_counter() - started
+
+            print(
+                f"{size:>7} {raw:>8.2f} {rollup:>9.2f} {full:>13.2f} "
+                f"{incremental:>13.3f}"
+            )
+    finally:
+        async with AsyncSessionLocal() as session:
+            await drop_channels(session, [channel_id])
+        await engine.dispose()
+
+
+asyncio.run(main())
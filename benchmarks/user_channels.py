@@ -0,0 +1,116 @@
+"""Measure the user->channels lookup behind /addquiz and /settings.
+
+Seeds throwaway channels with admins into POSTGRES_URL and compares the
+plain Admin join Channel query with the cache, first cold, then served from
+Redis (fakeredis with a simulated round-trip time) and from process memory.
+Finally one admin is demoted to check the invalidation path.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/user_channels.py
+"""
+
+import asyncio
+import time
+from functools import partial
+
+from cache import UserChannelsCache
+from common import BENCH_CHANNEL_BASE, latency_redis
+from constants import USER_CHANNELS_LOCAL_TTL, USER_CHANNELS_TTL
+from db import AsyncSessionLocal, engine
+from helpers import load_user_channels
+from models import Admin, Channel, User
+from sqlalchemy import delete, insert
+
+USERS = 2_000
+CHANNELS = 5
+USER_BASE = 1_800_000_000
+RTT = 0.0005
+
+
+async def seed() -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            insert(User),
+            [{"id": USER_BASE + i, "first_name": "bench"} for i in range(USERS)],
+        )
+        await session.execute(
+            insert(Channel),
+            [
+                {"id": BENCH_CHANNEL_BASE - i, "title": f"bench {i}", "active": True}
+                for i in range(USERS * CHANNELS)
+            ],
+        )
+        await session.execute(
+            insert(Admin),
+            [
+                {
+                    "user_id": USER_BASE + i,
+                    "channel_id": BENCH_CHANNEL_BASE - i * CHANNELS - j,
+                }
+                for i in range(USERS)
+                for j in range(CHANNELS)
+            ],
+        )
+        await session.commit()
+
+
+async def cleanup() -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(Channel).where(Channel.id <= BENCH_CHANNEL_BASE))
+        await session.execute(
+            delete(User).where(User.id.between(USER_BASE, USER_BASE + USERS))
+        )
+        await session.commit()
+
+
+async def lookup_all(users_cache: UserChannelsCache | None, name: str) -> None:
+    started = time.perf_counter()
+    for user_id in range(USER_BASE, USER_BASE + USERS):
+        async with AsyncSessionLocal() as session:
+            load = partial(load_user_channels, session, user_id)
+            await (users_cache.get(user_id, load) if users_cache else load())
+    per_lookup = (time.perf_counter() - started) / USERS * 10**6
+    print(f"{name:>12} {per_lookup:>10.0f}")
+
+
+async def main() -> None:
+    users_cache = UserChannelsCache(
+        latency_redis(RTT), USERS, USER_CHANNELS_LOCAL_TTL, USER_CHANNELS_TTL
+    )
+
+    await cleanup()
+    await seed()
+    print(f"{USERS} users, {CHANNELS} channels each, redis rtt {RTT * 1000:.1f} ms")
+    print(f"{'lookup':>12} {'us/lookup':>10}")
+    try:
+        await lookup_all(None, "postgres")
+        await lookup_all(users_cache, "cache, cold")
+        users_cache.local.clear()
+        await lookup_all(users_cache, "cache, redis")
+        await lookup_all(users_cache, "cache, local")
+
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                delete(Admin)
+                .where(Admin.user_id == USER_BASE)
+                # keep the last channel so the change is visible
+                .where(Admin.channel_id != BENCH_CHANNEL_BASE - CHANNELS + 1)
+            )
+            await session.commit()
+        await users_cache.invalidate([USER_BASE])
+        async with AsyncSessionLocal() as session:
+            channels = await users_cache.get(
+                USER_BASE, lambda: load_user_channels(session, USER_BASE)
+            )
+        assert len(channels) == 1, channels
+
+        stats = users_cache.stats
+        print(
+            f"local hits {stats.local_hits}, redis hits {stats.redis_hits}, "
+            f"misses {stats.misses}, hit rate {stats.hit_rate:.0%}"
+        )
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+
+asyncio.run(main())
@@ -0,0 +1,131 @@
+"""Measure user upserts under a /start flood.
+
+Fires concurrent /start writes for a pool of users (most new, some seen
+again with a changed name) against POSTGRES_URL, with the old get-then-add
+upsert, a single ON CONFLICT statement per user and the coalescing
+UserWriter /start uses. Prints writes per second, SQL statements per write
+and primary key violations, which the old upsert hits when two updates for
+a new user race. The users it creates are deleted again, so it only runs
+against a database named as a scratch one or named in BENCH_DATABASE.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/user_upsert.py
+"""
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+
+from aiogram.types import User as TUser
+from common import require_scratch_database
+from db import AsyncSessionLocal, engine
+from models import User
+from sqlalchemy import delete, event
+from sqlalchemy.exc import IntegrityError
+from users import UserWriter, upsert_users
+
+WRITES = 5_000
+USERS = 3_000
+CONCURRENCY = 200
+USER_BASE = 1_900_000_000
+
+
+async def get_then_add(user: TUser) -> None:
+    async with AsyncSessionLocal() as session:
+        old_user = await session.get(User, user.id)
+        if old_user:
+            old_user.first_name = user.first_name
+            old_user.last_name = user.last_name
+            old_user.username = user.username
+        else:
+            session.add(
+                User(
+                    id=user.id,
+                    first_name=user.first_name,
+                    last_name=user.last_name,
+                    username=user.username,
+                )
+            )
+        await session.commit()
+
+
+async def single_statement(user: TUser) -> None:
+    async with AsyncSessionLocal() as session:
+        await upsert_users(session, [user])
+        await session.commit()
+
+
+def flood() -> list[TUser]:
+    rng = random.Random(1)
+    return [
+        TUser(
+            id=USER_BASE + rng.randrange(USERS),
+            is_bot=False,
+            first_name=rng.choice(["Ali", "Vali", "Gani"]),
+        )
+        for _ in range(WRITES)
+    ]
+
+
+async def run(write: Callable[[TUser], Awaitable[None]]) -> tuple[float, int]:
+    users = flood()
+    queue: asyncio.Queue[TUser] = asyncio.Queue()
+    for user in users:
+        queue.put_nowait(user)
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            try:
+                await write(queue.get_nowait())
+            except IntegrityError:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return time.perf_counter() - started, errors
+
+
+async def reset() -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            delete(User).where(User.id.between(USER_BASE, USER_BASE + USERS))
+        )
+        await session.commit()
+
+
+async def main() -> None:
+    require_scratch_database(engine)
+    statements = 0
+
+    def count(*args: object) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    writer = UserWriter()
+    methods: list[tuple[str, Callable[[TUser], Awaitable[None]]]] = [
+        ("get then add", get_then_add),
+        ("on conflict", single_statement),
+        ("coalesced", writer.write),
+    ]
+
+    print(f"{WRITES} writes for {USERS} users, {CONCURRENCY} at once")
+    print(f"{'method':>14} {'writes/s':>9} {'stmts/write':>11} {'pk errors':>9}")
+    try:
+        for name, write in methods:
+            await reset()
+            statements = 0
+            elapsed, errors = await run(write)
+            print(
+                f"{name:>14} {WRITES / elapsed:>9.0f} "
+                f"{statements / WRITES:>11.2f} {errors:>9}"
+            )
+        print(f"writer: {writer.stats}")
+    finally:
+        await reset()
+        await engine.dispose()
+
+
+asyncio.run(main())
@@ -0,0 +1,182 @@
+"""Replay updates against the webhook server and report handler latency.
+
+Serves the bot's webhook app in this process with the Bot API pointed at the
+fake server and FSM storage on fakeredis, then POSTs updates at each target
+rate through at most --connections concurrent requests, like Telegram's
+max_connections. Updates the server answers with 503 are redelivered after
+Retry-After. Latency is measured from the first delivery attempt until the
+dispatcher has finished the update, so it includes queueing and redelivery.
+The load generator, the fake API and the bot share one event loop, so the
+absolute ceiling is lower than a dedicated replica's.
+
+Updates come from a JSONL file of recorded updates (one Update object per
+line) or, without --updates, from synthetic /start messages, which touch
+Postgres and answer through the fake API. POSTGRES_URL must point at a
+migrated database.
+
+    PYTHONPATH=quizbot poetry run python benchmarks/webhook_load.py \\
+        --rates 100 300 1000 --duration 5
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import ClientSession, web
+from common import latency_redis
+from constants import UPDATE_QUEUE_SIZE, UPDATE_WORKERS, WEBHOOK_PATH
+from db import AsyncSessionLocal, engine
+from dispatcher import dp, storage
+from fake_telegram import FakeTelegram, start_fake_telegram
+from models import User
+from sqlalchemy import delete
+from webhook import POOL_KEY, WEBHOOK_SECRET, create_app
+
+API_PORT = 8084
+WEBHOOK_PORT = 8085
+USER_BASE = 1_900_000_000
+USERS = 500
+RTT = 0.0005
+
+
+def synthetic_updates() -> Iterator[dict[str, Any]]:
+    for i in itertools.count():
+        user = {"id": USER_BASE + i % USERS, "is_bot": False, "first_name": "load"}
+        yield {
+            "message": {
+                "message_id": i + 1,
+                "date": int(time.time()),
+                "chat": {"id": user["id"], "type": "private"},
+                "from": user,
+                "text": "/start",
+                "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            }
+        }
+
+
+def recorded_updates(path: Path) -> Iterator[dict[str, Any]]:
+    updates = [json.loads(line) for line in path.read_text().splitlines() if line]
+    return itertools.cycle(updates)
+
+
+class Load:
+    def __init__(self, connections: int) -> None:
+        self.slots = asyncio.Semaphore(connections)
+        self.sent: dict[int, float] = {}
+        self.done: dict[int, float] = {}
+        self.redelivered = 0
+
+    async def middleware(self, handler: Any, update: Any, data: dict[str, Any]) -> Any:
+        try:
+            return await handler(update, data)
+        finally:
+            self.done[update.update_id] = time.perf_counter()
+
+    async def deliver(self, http: ClientSession, update: dict[str, Any]) -> None:
+        self.sent[update["update_id"]] = time.perf_counter()
+        headers = {"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET}
+        url = f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}"
+        while True:
+            async with self.slots, http.post(url, json=update, headers=headers) as r:
+                if r.status != 503:
+                    r.raise_for_status()
+                    return
+                retry_after = float(r.headers.get("Retry-After", 1))
+            self.redelivered += 1
+            await asyncio.sleep(retry_after)
+
+
+async def run(
+    http: ClientSession,
+    load: Load,
+    updates: Iterator[dict[str, Any]],
+    ids: Iterator[int],
+    rate: int,
+    duration: float,
+) -> None:
+    load.sent.clear()
+    load.done.clear()
+    load.redelivered = 0
+
+    deliveries = []
+    started = time.perf_counter()
+    for i in range(int(rate * duration)):
+        delay = started + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        update = next(updates) | {"update_id": next(ids)}
+        deliveries.append(asyncio.create_task(load.deliver(http, update)))
+    await asyncio.gather(*deliveries)
+    while len(load.done) < len(load.sent):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+
+    latencies = [(load.done[uid] - sent) * 1000 for uid, sent in load.sent.items()]
+    p50 = statistics.median(latencies)
+    p99 = statistics.quantiles(latencies, n=100)[98]
+    achieved = len(latencies) / elapsed
+    print(f"{rate:>6} {achieved:>9.0f} {p50:>8.1f} {p99:>8.1f} {load.redelivered:>11}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--connections", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=UPDATE_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=UPDATE_QUEUE_SIZE)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--updates", type=Path)
+    args = parser.parse_args()
+
+    storage.redis = latency_redis(RTT)
+    telegram = FakeTelegram(args.latency, rate=10**9, chat_rate=10**9)
+    api = await start_fake_telegram(telegram, port=API_PORT)
+    session = AiohttpSession(
+        api=TelegramAPIServer.from_base(f"http://127.0.0.1:{API_PORT}")
+    )
+    bot = Bot("42:fake", session=session)
+
+    load = Load(args.connections)
+    dp.update.outer_middleware(load.middleware)
+    app = create_app(dp, bot, args.workers, args.queue_size)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", WEBHOOK_PORT).start()
+
+    updates = recorded_updates(args.updates) if args.updates else synthetic_updates()
+    ids = itertools.count(1)
+    print(
+        f"{args.workers} workers, queue {args.queue_size}, "
+        f"{args.connections} connections, api latency {args.latency * 1000:.0f} ms"
+    )
+    print(
+        f"{'rate':>6} {'handled/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'redelivered':>11}"
+    )
+    try:
+        async with ClientSession() as http:
+            for rate in args.rates:
+                await run(http, load, updates, ids, rate, args.duration)
+        stats = app[POOL_KEY].stats
+        print(f"pool: {stats.handled} handled, {stats.failed} failed")
+    finally:
+        await runner.cleanup()
+        await api.cleanup()
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(User).where(User.id.between(USER_BASE, USER_BASE + USERS))
+            )
+            await db.commit()
+        await engine.dispose()
+
+
+asyncio.run(main())
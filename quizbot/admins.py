@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import random
+from collections.abc import Mapping, Sequence
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.types import User as TUser
+from constants import ADMINS_FETCH_DELAY, ADMINS_FETCH_RETRIES
+from models import Admin, User
+from sqlalchemy import (
+    BigInteger,
+    column,
+    delete,
+    exists,
+    literal,
+    select,
+    tuple_,
+    union_all,
+    values,
+)
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from users import upsert_users, user_upsert
+
+logger = logging.getLogger(__name__)
+
+
+async def fetch_chat_admins(
+    bot: Bot,
+    chat_id: int,
+    retries: int = ADMINS_FETCH_RETRIES,
+    delay: float = ADMINS_FETCH_DELAY,
+) -> list[TUser] | None:
+    # right after the bot is promoted Telegram may still refuse to list the
+    # admins, so back off and ask again instead of giving up on the channel
+    for attempt in range(retries + 1):
+        try:
+            admins = await bot.get_chat_administrators(chat_id)
+        except TelegramRetryAfter as e:
+            wait = float(e.retry_after)
+        except TelegramForbiddenError:
+            return None
+        except (TelegramBadRequest, TelegramNetworkError, TelegramServerError) as e:
+            if attempt == retries:
+                logger.warning("failed to fetch admins of %s: %s", chat_id, e)
+                return None
+            wait = delay * 2**attempt * random.uniform(0.5, 1.5)
+        else:
+            return [admin.user for admin in admins if not admin.user.is_bot]
+
+        if attempt == retries:
+            break
+        await asyncio.sleep(wait)
+    logger.warning("gave up fetching admins of %s", chat_id)
+    return None
+
+
+def admin_insert(channel_id: int, user_ids: Sequence[int]) -> Insert | None:
+    if not user_ids:
+        return None
+
+    # every row that reaches ON CONFLICT burns an id from the sequence, so
+    # only the missing admins are offered to the insert
+    missing = select(User.id, literal(channel_id, BigInteger)).where(
+        User.id.in_(user_ids),
+        ~exists().where(Admin.user_id == User.id, Admin.channel_id == channel_id),
+    )
+    return (
+        insert(Admin)
+        .from_select([Admin.user_id, Admin.channel_id], missing)
+        .on_conflict_do_nothing(index_elements=[Admin.user_id, Admin.channel_id])
+    )
+
+
+async def sync_channel_admins(
+    session: AsyncSession, channel_id: int, users: Sequence[TUser]
+) -> tuple[list[int], list[int]]:
+    # one statement: the users upsert, the insert of missing admins and the
+    # delete of stale ones run as CTEs on the same snapshot, and the foreign
+    # key to users is only checked once the whole statement is done
+    user_ids = [user.id for user in users]
+    removed = (
+        delete(Admin)
+        .where(Admin.channel_id == channel_id, Admin.user_id.not_in(user_ids))
+        .returning(Admin.user_id)
+        .cte("removed")
+    )
+    parts = [select(literal(False).label("added"), removed.c.user_id)]
+    if user_ids:
+        # the upserted users aren't visible to the other CTEs, so the ids to
+        # add come from the admin list rather than from the users table
+        wanted = (
+            values(column("user_id", BigInteger), name="wanted")
+            .data([(user_id,) for user_id in dict.fromkeys(user_ids)])
+            .alias("wanted")
+        )
+        missing = select(wanted.c.user_id, literal(channel_id, BigInteger)).where(
+            ~exists().where(
+                Admin.user_id == wanted.c.user_id, Admin.channel_id == channel_id
+            )
+        )
+        added = (
+            insert(Admin)
+            .from_select([Admin.user_id, Admin.channel_id], missing)
+            .on_conflict_do_nothing(index_elements=[Admin.user_id, Admin.channel_id])
+            .returning(Admin.user_id)
+            .cte("added")
+        )
+        parts.append(select(literal(True), added.c.user_id))
+    stmt = union_all(*parts)
+    upsert = user_upsert(users)
+    if upsert is not None:
+        # DML in WITH runs even when nothing selects from it
+        stmt = stmt.add_cte(upsert.returning(User.id).cte("upserted"))
+
+    rows = (await session.execute(stmt)).all()
+    added_ids = [user_id for is_added, user_id in rows if is_added]
+    removed_ids = [user_id for is_added, user_id in rows if not is_added]
+    return added_ids, removed_ids
+
+
+async def reconcile_admins(
+    session: AsyncSession, admins: Mapping[int, Sequence[TUser]]
+) -> tuple[list[int], list[int]]:
+    if not admins:
+        return [], []
+
+    stmt = select(Admin.channel_id, Admin.user_id).where(Admin.channel_id.in_(admins))
+    current = {(row.channel_id, row.user_id) for row in await session.execute(stmt)}
+    wanted = {
+        (channel_id, user.id) for channel_id, users in admins.items() for user in users
+    }
+    to_add = wanted - current
+    to_remove = current - wanted
+
+    added_ids = {user_id for _, user_id in to_add}
+    await upsert_users(
+        session,
+        [user for users in admins.values() for user in users if user.id in added_ids],
+    )
+    if to_add:
+        await session.execute(
+            insert(Admin)
+            .values([{"channel_id": cid, "user_id": uid} for cid, uid in to_add])
+            .on_conflict_do_nothing(index_elements=[Admin.user_id, Admin.channel_id])
+        )
+    if to_remove:
+        await session.execute(
+            delete(Admin).where(
+                tuple_(Admin.channel_id, Admin.user_id).in_(list(to_remove))
+            )
+        )
+    return [uid for _, uid in to_add], [uid for _, uid in to_remove]
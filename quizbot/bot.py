@@ -1,24 +1,40 @@
 import os
-import random
+from collections.abc import Sequence
 
 import dotenv
 from aiogram import Bot
-from aiogram.enums import PollType
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.types import BotCommandScopeAllPrivateChats
+from constants import CHAT_SEND_RATE, SEND_RATE, SEND_WORKERS
 from db import AsyncSessionLocal
+from deck import draw_channel_quizzes
+from metrics import RequestMetricsMiddleware
 from models import Quiz
+from polls import record_poll_posts
+from sender import PollSender
 from sqlalchemy import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from type import CommandInfo
 
 dotenv.load_dotenv()
 
-bot = Bot(os.getenv("BOT_TOKEN", ""))
+api_url = os.getenv("TELEGRAM_API_URL")
+api_session = (
+    AiohttpSession(api=TelegramAPIServer.from_base(api_url)) if api_url else None
+)
+bot = Bot(os.getenv("BOT_TOKEN", ""), session=api_session)
+bot.session.middleware(RequestMetricsMiddleware())
+poll_sender = PollSender(bot, SEND_RATE, CHAT_SEND_RATE, SEND_WORKERS)
 
 commands: list[CommandInfo] = [
     CommandInfo(command="start", description="start command"),
     CommandInfo(command="addquiz", description="addquiz command"),
     CommandInfo(command="settings", description="settings command"),
+    CommandInfo(command="import", description="import command"),
+    CommandInfo(command="export", description="export command"),
+    CommandInfo(command="stats", description="stats command"),
 ]
 
 
@@ -26,27 +42,21 @@ async def set_command_menu() -> None:
     await bot.set_my_commands(commands, BotCommandScopeAllPrivateChats())
 
 
-async def get_rand_channel_quizzes(channel_id: int, n: int) -> list[Quiz]:
-    stmt = (
-        select(Quiz)
-        .where(Quiz.channel_id == channel_id)
-        .options(joinedload(Quiz.options))
-    )
+async def get_quizzes_by_ids(session: AsyncSession, ids: Sequence[int]) -> list[Quiz]:
+    if not ids:
+        return []
 
-    async with AsyncSessionLocal() as session:
-        quizzes = (await session.scalars(stmt)).unique().all()
-
-    return random.sample(quizzes, min(n, len(quizzes)))
+    stmt = select(Quiz).where(Quiz.id.in_(ids)).options(selectinload(Quiz.options))
+    quizzes = {quiz.id: quiz for quiz in await session.scalars(stmt)}
+    return [quizzes[quiz_id] for quiz_id in ids if quiz_id in quizzes]
 
 
 async def send_channel_quizzes(channel_id: int, n: int) -> None:
-    quizzes = await get_rand_channel_quizzes(channel_id, n)
-    for quiz in quizzes:
-        await bot.send_poll(
-            quiz.channel_id,
-            quiz.question,
-            [opt.option for opt in quiz.options],
-            correct_option_id=quiz.correct_order,
-            explanation=quiz.explanation,
-            type=PollType.QUIZ,
-        )
+    async with AsyncSessionLocal() as session:
+        ids = await draw_channel_quizzes(session, channel_id, n)
+        quizzes = await get_quizzes_by_ids(session, ids)
+
+    posts = await poll_sender.send(channel_id, quizzes)
+    async with AsyncSessionLocal() as session:
+        await record_poll_posts(session, channel_id, posts)
+        await session.commit()
@@ -0,0 +1,123 @@
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+
+from constants import (
+    USER_CHANNELS_CACHE_SIZE,
+    USER_CHANNELS_LOCAL_TTL,
+    USER_CHANNELS_TTL,
+)
+from db import redis
+from redis.asyncio import Redis
+from type import ChannelRef
+
+
+def channels_key(user_id: int) -> str:
+    return f"user_channels:{user_id}"
+
+
+def generation_key(user_id: int) -> str:
+    return f"user_channels_gen:{user_id}"
+
+
+@dataclass
+class CacheStats:
+    local_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.local_hits + self.redis_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+
+class UserChannelsCache:
+    def __init__(
+        self, redis: Redis, size: int, local_ttl: float, redis_ttl: int
+    ) -> None:
+        self.redis = redis
+        self.size = size
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.local: OrderedDict[int, tuple[float, list[ChannelRef]]] = OrderedDict()
+        self.epoch = 0
+        self.stats = CacheStats()
+
+    def get_local(self, user_id: int) -> list[ChannelRef] | None:
+        entry = self.local.get(user_id)
+        if entry is None:
+            return None
+        expires, channels = entry
+        if expires < time.monotonic():
+            del self.local[user_id]
+            return None
+        self.local.move_to_end(user_id)
+        return channels
+
+    def set_local(self, user_id: int, channels: list[ChannelRef]) -> None:
+        self.local[user_id] = (time.monotonic() + self.local_ttl, channels)
+        self.local.move_to_end(user_id)
+        while len(self.local) > self.size:
+            self.local.popitem(last=False)
+
+    async def get(
+        self, user_id: int, load: Callable[[], Awaitable[list[ChannelRef]]]
+    ) -> list[ChannelRef]:
+        channels = self.get_local(user_id)
+        if channels is not None:
+            self.stats.local_hits += 1
+            return channels
+
+        epoch = self.epoch
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(channels_key(user_id))
+            pipe.get(generation_key(user_id))
+            cached, generation = await pipe.execute()
+        generation = int(generation or 0)
+
+        # entries carry the generation they were loaded under, so a load that
+        # raced with an invalidation is never served
+        entry = json.loads(cached) if cached else None
+        if entry and entry["gen"] == generation:
+            self.stats.redis_hits += 1
+            channels = [ChannelRef(id=id, title=title) for id, title in entry["ch"]]
+        else:
+            self.stats.misses += 1
+            channels = await load()
+            entry = {
+                "gen": generation,
+                "ch": [[ch["id"], ch["title"]] for ch in channels],
+            }
+            await self.redis.set(
+                channels_key(user_id),
+                json.dumps(entry, separators=(",", ":"), ensure_ascii=False),
+                ex=self.redis_ttl,
+            )
+
+        if epoch == self.epoch:
+            self.set_local(user_id, channels)
+        return channels
+
+    async def invalidate(self, user_ids: Iterable[int]) -> None:
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+
+        self.epoch += 1
+        self.stats.invalidations += len(user_ids)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                self.local.pop(user_id, None)
+                pipe.incr(generation_key(user_id))
+                pipe.delete(channels_key(user_id))
+            await pipe.execute()
+
+
+user_channels = UserChannelsCache(
+    redis, USER_CHANNELS_CACHE_SIZE, USER_CHANNELS_LOCAL_TTL, USER_CHANNELS_TTL
+)
@@ -2,6 +2,96 @@ from aiogram.filters import ADMINISTRATOR, CREATOR, KICKED, LEFT, MEMBER
 
 PROMOTED = (MEMBER | LEFT | KICKED) >> (ADMINISTRATOR | CREATOR)
 
+QUESTION_MAX_LENGTH = 300
+OPTION_MAX_LENGTH = 100
+EXPLANATION_MAX_LENGTH = 200
+MIN_OPTIONS = 2
+MAX_OPTIONS = 10
+
 POST_TIME = "09:00"
 QUIZ_COUNT = 10
+MAX_SCHEDULE_SLOTS = 12
 TIMEZONE = "Asia/Tashkent"
+POST_SPREAD_MINUTES = 30
+MAX_CHANNEL_JOBS = 20
+SETTINGS_BATCH = 1000
+# schedule changes made on any replica are applied by the leader
+SCHEDULE_REQUESTS_KEY = "quizbot:schedule_requests"
+SCHEDULE_REQUESTS_INTERVAL = 1
+MISFIRE_GRACE_TIME = 6 * 60 * 60
+COALESCE_MISSED_POSTS = True
+FSM_TTL = 24 * 60 * 60
+# other replicas only see an invalidation through redis, so entries in the
+# in-process cache are kept briefly
+USER_CHANNELS_CACHE_SIZE = 10_000
+USER_CHANNELS_LOCAL_TTL = 30
+USER_CHANNELS_TTL = 60 * 60
+ADMINS_FETCH_RETRIES = 4
+ADMINS_FETCH_DELAY = 0.5
+# a page of channels every minute covers 144k channels a day
+RECONCILE_JOB_ID = "reconcile_admins"
+RECONCILE_CURSOR_KEY = "quizbot:reconcile_cursor"
+RECONCILE_INTERVAL = 60
+RECONCILE_PAGE = 100
+RECONCILE_RATE = 5
+RECONCILE_RETRIES = 1
+USER_WRITE_WINDOW = 0.005
+USER_WRITE_BATCH = 1000
+# poll updates carry running totals, so only the latest per poll is written
+ANSWER_FLUSH_INTERVAL = 5
+ANSWER_FLUSH_BATCH = 1000
+STATS_JOB_ID = "aggregate_stats"
+STATS_INTERVAL = 5 * 60
+STATS_BATCH = 1000
+STATS_MIN_VOTERS = 10
+STATS_HARDEST = 5
+STATS_DAYS = 7
+DB_LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+PROFILE_CHAT_KEY = "quizbot:profile_chat"
+PROFILE_CHAT_POLL = 5
+TRACE_NAME_LENGTH = 80
+LEADER_KEY = "quizbot:leader"
+LEADER_TTL = 15
+
+SEND_RATE = 30
+CHAT_SEND_RATE = 20
+SEND_WORKERS = 16
+
+WEBHOOK_PATH = "/webhook"
+WEBHOOK_MAX_CONNECTIONS = 40
+UPDATE_WORKERS = 64
+UPDATE_QUEUE_SIZE = 1000
+UPDATE_QUEUE_TIMEOUT = 5
+
+IMPORT_BATCH = 1000
+IMPORT_MAX_FILE_SIZE = 20 * 1024 * 1024
+IMPORT_MAX_ERRORS = 1000
+IMPORT_ERRORS_SHOWN = 20
+IMPORT_QUOTE_LENGTH = 60
+
+# near-duplicate questions: trigram MinHash signatures banded for LSH, the
+# candidates are then checked with the exact trigram Jaccard similarity
+DUPLICATE_SIMILARITY = 0.7
+DUPLICATE_BANDS = 8
+DUPLICATE_ROWS = 4
+DUPLICATE_CANDIDATES = 8
+# cached indexes are bounded by the quizzes they hold, about 1.5 KB each
+DUPLICATE_CACHE_QUIZZES = 100_000
+DUPLICATE_LOAD_BATCH = 500
+
+EXPORT_BATCH = 1000
+EXPORT_SPOOL_SIZE = 1024 * 1024
+EXPORT_MAX_FILE_SIZE = 50 * 1024 * 1024
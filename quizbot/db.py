@@ -1,12 +1,220 @@
 import os
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
 
 import dotenv
 import redis.asyncio as redis_py
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from constants import DB_LATENCY_BUCKETS
+from redis.asyncio.connection import AbstractConnection
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
 
 dotenv.load_dotenv()
 
-engine = create_async_engine(os.getenv("POSTGRES_URL", ""))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# asyncpg caches prepared statements per connection and SQLAlchemy caches the
+# asyncpg statements on top; behind pgbouncer in transaction mode both must
+# be 0
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...] = DB_LATENCY_BUCKETS
+    counts: list[int] = field(init=False)
+    total: float = 0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts, strict=False):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+@dataclass
+class DbStats:
+    checkout_wait: Histogram = field(default_factory=Histogram)
+    queries: defaultdict[str, Histogram] = field(
+        default_factory=lambda: defaultdict(Histogram)
+    )
+    redis_round_trips: Histogram = field(default_factory=Histogram)
+    checkout_timeouts: int = 0
+    errors: int = 0
+
+    def report(self) -> str:
+        wait = self.checkout_wait
+        queries = sum(h.count for h in self.queries.values())
+        return (
+            f"{wait.count} checkouts (p50 {wait.quantile(0.5) * 1000:g}ms, "
+            f"p99 {wait.quantile(0.99) * 1000:g}ms, "
+            f"{self.checkout_timeouts} timed out), "
+            f"{queries} queries, {self.errors} failed"
+        )
+
+
+db_stats = DbStats()
+# called with a kind ("pool", "sql" or "redis"), a name, the start time and the
+# elapsed time of every statement and redis round-trip
+io_listeners: list[Callable[[str, str, float, float], None]] = []
+
+
+def notify_io(kind: str, name: str, started: float, elapsed: float) -> None:
+    for listener in io_listeners:
+        listener(kind, name, started, elapsed)
+
+
+class TimedPool(AsyncAdaptedQueuePool):
+    def connect(self) -> PoolProxiedConnection:
+        # covers waiting for a free connection, opening a new one and the
+        # pre-ping, which is what a handler sees at the 09:00 peak
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            db_stats.checkout_timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            db_stats.checkout_wait.observe(elapsed)
+            notify_io("pool", "checkout", started, elapsed)
+
+
+class TimedCommands(AbstractConnection):
+    # a command or a whole pipeline is one send followed by its replies, so
+    # the first reply after a send closes the round-trip
+    sent: float | None = None
+    command: str | None = None
+    name = ""
+
+    async def send_command(self, *args: Any, **kwargs: Any) -> None:
+        command = args[0] if args else ""
+        self.command = command.decode() if isinstance(command, bytes) else command
+        await super().send_command(*args, **kwargs)
+
+    async def send_packed_command(self, *args: Any, **kwargs: Any) -> None:
+        self.name = self.command or "PIPELINE"
+        self.command = None
+        self.sent = time.perf_counter()
+        await super().send_packed_command(*args, **kwargs)
+
+    async def read_response(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await super().read_response(*args, **kwargs)
+        finally:
+            if self.sent is not None:
+                elapsed = time.perf_counter() - self.sent
+                db_stats.redis_round_trips.observe(elapsed)
+                notify_io("redis", self.name, self.sent, elapsed)
+                self.sent = None
+
+
+class TimedConnection(TimedCommands, redis_py.Connection):
+    pass
+
+
+class TimedSSLConnection(TimedCommands, redis_py.SSLConnection):
+    pass
+
+
+class TimedUnixConnection(TimedCommands, redis_py.UnixDomainSocketConnection):
+    pass
+
+
+TIMED_CONNECTIONS: dict[type[AbstractConnection], type[AbstractConnection]] = {
+    redis_py.Connection: TimedConnection,
+    redis_py.SSLConnection: TimedSSLConnection,
+    redis_py.UnixDomainSocketConnection: TimedUnixConnection,
+}
+
+
+def make_redis(url: str) -> redis_py.Redis:
+    # the URL scheme picks a plain, TLS or unix socket connection; swapping
+    # in the timed one afterwards keeps that choice, while connection_class
+    # passed to from_url would either replace it or be ignored
+    pool = redis_py.ConnectionPool.from_url(url, decode_responses=True)
+    pool.connection_class = TIMED_CONNECTIONS[pool.connection_class]
+    return redis_py.Redis.from_pool(pool)
+
+
+def pool_status(engine: AsyncEngine) -> dict[str, int]:
+    pool = engine.pool
+    assert isinstance(pool, AsyncAdaptedQueuePool)
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "idle": pool.checkedin(),
+    }
+
+
+def before_cursor_execute(conn: Any, *args: Any) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement else "OTHER"
+    db_stats.queries[verb].observe(elapsed)
+    notify_io("sql", statement, started, elapsed)
+
+
+def handle_error(context: Any) -> None:
+    db_stats.errors += 1
+    started = (
+        context.connection.info.get("query_started") if context.connection else None
+    )
+    if started:
+        started.pop()
+
+
+def make_engine(url: str, **pool: Any) -> AsyncEngine:
+    connect_args = {}
+    if make_url(url).get_driver_name() == "asyncpg":
+        connect_args = {
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        }
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        **pool,
+    }
+    engine = create_async_engine(
+        url, poolclass=TimedPool, connect_args=connect_args, **options
+    )
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", handle_error)
+    return engine
+
+
+engine = make_engine(os.getenv("POSTGRES_URL", ""))
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
-redis = redis_py.from_url(os.getenv("REDIS_URL", ""), decode_responses=True)
+redis = make_redis(os.getenv("REDIS_URL", ""))
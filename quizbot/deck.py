@@ -0,0 +1,51 @@
+import random
+from collections.abc import Sequence
+
+from db import redis
+from models import Quiz
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def deck_key(channel_id: int) -> str:
+    return f"deck:{channel_id}"
+
+
+async def build_channel_deck(
+    session: AsyncSession, channel_id: int, drawn: Sequence[int] = ()
+) -> list[int]:
+    stmt = select(Quiz.id).where(Quiz.channel_id == channel_id)
+    ids = list((await session.scalars(stmt)).all())
+    random.shuffle(ids)
+
+    # quizzes already posted from the old deck go last so they don't repeat
+    recent = set(drawn)
+    return [i for i in ids if i not in recent] + [i for i in ids if i in recent]
+
+
+async def draw_channel_quizzes(
+    session: AsyncSession, channel_id: int, n: int
+) -> list[int]:
+    key = deck_key(channel_id)
+    drawn = [int(i) for i in await redis.lpop(key, n) or []]
+    if len(drawn) == n:
+        return drawn
+
+    deck = await build_channel_deck(session, channel_id, drawn)
+    fresh = [i for i in deck if i not in drawn][: n - len(drawn)]
+    rest = deck[len(fresh) :]
+    if rest:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.rpush(key, *rest)
+            await pipe.execute()
+
+    return drawn + fresh
+
+
+async def add_to_channel_deck(channel_id: int, quiz_id: int) -> None:
+    await redis.rpushx(deck_key(channel_id), quiz_id)
+
+
+async def reset_channel_deck(channel_id: int) -> None:
+    await redis.delete(deck_key(channel_id))
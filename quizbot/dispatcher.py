@@ -1,9 +1,16 @@
+import json
+from functools import partial
+
 from aiogram import Dispatcher, Router
 from aiogram.enums import ChatType
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
+from constants import FSM_TTL
+from db import redis
 from handlers.channels import router as events_router
 from handlers.commands import router as commands_router
+from handlers.polls import router as polls_router
+from metrics import MeteredRedisStorage, instrument_dispatcher
 
 
 class ChatTypeFilter(BaseFilter):
@@ -22,6 +29,15 @@ channel_router = Router()
 channel_router.message.filter(ChatTypeFilter(ChatType.CHANNEL))
 channel_router.include_router(events_router)
 
-dp = Dispatcher()
+storage = MeteredRedisStorage(
+    redis,
+    state_ttl=FSM_TTL,
+    data_ttl=FSM_TTL,
+    json_dumps=partial(json.dumps, separators=(",", ":"), ensure_ascii=False),
+)
+
+dp = Dispatcher(storage=storage)
 dp.include_router(user_router)
 dp.include_router(channel_router)
+dp.include_router(polls_router)
+instrument_dispatcher(dp)
@@ -0,0 +1,190 @@
+import asyncio
+import operator
+import re
+from array import array
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+
+from constants import (
+    DUPLICATE_BANDS,
+    DUPLICATE_CACHE_QUIZZES,
+    DUPLICATE_CANDIDATES,
+    DUPLICATE_LOAD_BATCH,
+    DUPLICATE_ROWS,
+    DUPLICATE_SIMILARITY,
+)
+from models import Quiz
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+SLOTS = DUPLICATE_BANDS * DUPLICATE_ROWS
+SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize_question(question: str) -> str:
+    return SEPARATORS.sub(" ", question.casefold()).strip()
+
+
+@dataclass
+class QuestionKey:
+    normalized: str
+    trigrams: frozenset[str]
+    signature: "array[int]"
+    bands: list[int]
+
+
+def trigrams(normalized: str) -> frozenset[str]:
+    padded = f"  {normalized} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def signature(hashes: list[int]) -> "array[int]":
+    # one permutation hashing: each trigram hash lands in one slot and a slot
+    # keeps its smallest, so a signature costs one pass instead of one per
+    # slot; empty slots borrow from the next filled one to stay comparable
+    slots: list[int | None] = [None] * SLOTS
+    for h in hashes:
+        slot = h % SLOTS
+        current = slots[slot]
+        if current is None or h < current:
+            slots[slot] = h
+    filled = [i for i, value in enumerate(slots) if value is not None]
+    taken = filled[0]
+    result = array("q", bytes(8 * SLOTS))
+    for i in reversed(range(SLOTS)):
+        value = slots[i]
+        if value is None:
+            result[i] = hash((slots[taken], taken - i))
+        else:
+            result[i] = value
+            taken = i
+    return result
+
+
+def question_key(question: str) -> QuestionKey:
+    normalized = normalize_question(question)
+    grams = trigrams(normalized)
+    # str hashes are salted per process, which is fine for an in-process index
+    sig = signature([hash(gram) for gram in grams])
+    bands = [
+        hash(tuple(sig[i : i + DUPLICATE_ROWS]))
+        for i in range(0, SLOTS, DUPLICATE_ROWS)
+    ]
+    return QuestionKey(normalized, grams, sig, bands)
+
+
+def similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+@dataclass
+class Duplicate:
+    quiz_id: int
+    question: str
+    similarity: float
+
+
+class QuestionIndex:
+    def __init__(self) -> None:
+        self.last_id = 0
+        self.questions: dict[int, str] = {}
+        self.signatures: dict[int, array[int]] = {}
+        self.exact: dict[str, int] = {}
+        self.bands: list[defaultdict[int, list[int]]] = [
+            defaultdict(list) for _ in range(DUPLICATE_BANDS)
+        ]
+        self.lock = asyncio.Lock()
+
+    def add(self, quiz_id: int, question: str, key: QuestionKey | None = None) -> None:
+        if quiz_id in self.questions:
+            return
+
+        key = key or question_key(question)
+        self.questions[quiz_id] = question
+        self.signatures[quiz_id] = key.signature
+        self.exact.setdefault(key.normalized, quiz_id)
+        for band, bucket in zip(self.bands, key.bands, strict=True):
+            band[bucket].append(quiz_id)
+
+    def find(self, key: QuestionKey) -> Duplicate | None:
+        quiz_id = self.exact.get(key.normalized)
+        if quiz_id is not None:
+            return Duplicate(quiz_id, self.questions[quiz_id], 1.0)
+
+        # only questions sharing a whole band of the signature are compared,
+        # and only the latest few per band, so templated banks where every
+        # question looks alike don't make each check scan the whole channel
+        candidates = {
+            quiz_id
+            for band, bucket in zip(self.bands, key.bands, strict=True)
+            for quiz_id in band.get(bucket, [])[-DUPLICATE_CANDIDATES:]
+        }
+        if not candidates:
+            return None
+
+        # the share of matching slots estimates the similarity, only the
+        # closest candidate gets its trigrams rebuilt for the exact score
+        quiz_id = max(
+            candidates,
+            key=lambda c: sum(map(operator.eq, key.signature, self.signatures[c])),
+        )
+        question = self.questions[quiz_id]
+        score = similarity(key.trigrams, trigrams(normalize_question(question)))
+        if score < DUPLICATE_SIMILARITY:
+            return None
+        return Duplicate(quiz_id, question, score)
+
+    async def refresh(self, session: AsyncSession, channel_id: int) -> None:
+        # quizzes are never edited or deleted, so loading the ones added since
+        # the last refresh keeps the index in step with every bot instance
+        async with self.lock:
+            stmt = (
+                select(Quiz.id, Quiz.question)
+                .where(Quiz.channel_id == channel_id, Quiz.id > self.last_id)
+                .order_by(Quiz.id)
+                .execution_options(yield_per=DUPLICATE_LOAD_BATCH)
+            )
+            result = await session.stream(stmt)
+            async for rows in result.partitions():
+                for quiz_id, question in rows:
+                    self.add(quiz_id, question)
+                    self.last_id = quiz_id
+                # hashing a large channel's first load takes seconds, so
+                # other updates get a turn between batches
+                await asyncio.sleep(0)
+
+
+class QuestionIndexCache:
+    def __init__(self, quizzes: int) -> None:
+        self.quizzes = quizzes
+        self.indexes: OrderedDict[int, QuestionIndex] = OrderedDict()
+
+    async def get(self, session: AsyncSession, channel_id: int) -> QuestionIndex:
+        index = self.indexes.get(channel_id)
+        if index is None:
+            index = self.indexes[channel_id] = QuestionIndex()
+        self.indexes.move_to_end(channel_id)
+
+        await index.refresh(session, channel_id)
+        self.evict(channel_id)
+        return index
+
+    def evict(self, keep: int) -> None:
+        # one large channel outweighs many small ones, so the bound is on the
+        # quizzes held; the index just asked for stays even if it alone is over
+        total = sum(len(index.questions) for index in self.indexes.values())
+        for channel_id in list(self.indexes):
+            if total <= self.quizzes:
+                break
+            if channel_id != keep:
+                total -= len(self.indexes.pop(channel_id).questions)
+
+
+question_indexes = QuestionIndexCache(DUPLICATE_CACHE_QUIZZES)
+
+
+async def find_duplicate(
+    session: AsyncSession, channel_id: int, question: str
+) -> Duplicate | None:
+    index = await question_indexes.get(session, channel_id)
+    return index.find(question_key(question))
@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import csv
+import json
+import sys
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import ExitStack
+from typing import IO
+
+from aiogram import Bot
+from aiogram.types import InputFile
+from constants import EXPORT_BATCH, MAX_OPTIONS
+from db import AsyncSessionLocal, engine
+from importer import QuizRow
+from models import Option, Quiz
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+EXPORT_FORMATS = {"csv": ".csv", "jsonl": ".jsonl"}
+CSV_HEADER = [
+    "question",
+    *[f"option{i}" for i in range(1, MAX_OPTIONS + 1)],
+    "correct",
+    "explanation",
+]
+
+
+class StreamInputFile(InputFile):
+    def __init__(self, file: IO[bytes], filename: str) -> None:
+        super().__init__(filename=filename)
+        self.file = file
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes]:
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
+
+
+async def iter_channel_quizzes(
+    session: AsyncSession, channel_id: int
+) -> AsyncIterator[QuizRow]:
+    stmt = (
+        select(
+            Quiz.id,
+            Quiz.question,
+            Quiz.correct_order,
+            Quiz.explanation,
+            Option.option,
+        )
+        .join(Option, Option.quiz_id == Quiz.id)
+        .where(Quiz.channel_id == channel_id)
+        .order_by(Quiz.id, Option.order)
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+
+    # one row per option, so a quiz is complete once the next one starts
+    quiz_id = None
+    quiz: QuizRow | None = None
+    result = await session.stream(stmt)
+    async for rows in result.partitions():
+        for row in rows:
+            if row.id != quiz_id:
+                if quiz:
+                    yield quiz
+                quiz_id = row.id
+                quiz = QuizRow(row.question, [], row.correct_order, row.explanation)
+            assert quiz
+            quiz.options.append(row.option)
+    if quiz:
+        yield quiz
+
+
+async def export_quizzes(
+    session: AsyncSession, channel_id: int, fmt: str, out: IO[str]
+) -> int:
+    writer = csv.writer(out)
+    if fmt == "csv":
+        writer.writerow(CSV_HEADER)
+
+    count = 0
+    async for quiz in iter_channel_quizzes(session, channel_id):
+        if fmt == "csv":
+            padding = [""] * (MAX_OPTIONS - len(quiz.options))
+            writer.writerow(
+                [
+                    quiz.question,
+                    *quiz.options,
+                    *padding,
+                    quiz.correct_order + 1,
+                    quiz.explanation or "",
+                ]
+            )
+        else:
+            record = {
+                "question": quiz.question,
+                "options": quiz.options,
+                "correct": quiz.correct_order + 1,
+                "explanation": quiz.explanation,
+            }
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Export a channel's quizzes.")
+    parser.add_argument("--channel-id", type=int, required=True)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("-o", "--output", help="file to write, stdout by default")
+    args = parser.parse_args()
+
+    try:
+        with ExitStack() as stack:
+            out = sys.stdout
+            if args.output:
+                out = stack.enter_context(
+                    open(args.output, "w", encoding="utf-8", newline="")
+                )
+            async with AsyncSessionLocal() as session:
+                count = await export_quizzes(session, args.channel_id, args.format, out)
+    finally:
+        await engine.dispose()
+    print(f"exported {count} quizzes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
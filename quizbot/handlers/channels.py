@@ -1,16 +1,21 @@
-import asyncio
+import logging
 
+from admins import admin_insert, fetch_chat_admins, sync_channel_admins
 from aiogram import Router
 from aiogram.filters import ChatMemberUpdatedFilter
 from aiogram.types import Chat, ChatMemberUpdated
 from aiogram.types import User as TUser
 from bot import bot
+from cache import user_channels
 from constants import PROMOTED
 from db import AsyncSessionLocal
-from handlers.commands import upsert_user
 from models import Admin, Channel
+from scheduler import schedule_requests
 from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
+from users import upsert_users
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -33,21 +38,20 @@ async def upsert_channel(session: AsyncSession, chat: Chat, active: bool) -> Cha
 
 async def add_channel_admins(
     session: AsyncSession, channel_id: int, admin_users: list[TUser]
-) -> None:
-    admins_to_add = []
-    for admin_user in admin_users:
-        if not admin_user.is_bot:
-            user = await upsert_user(session, admin_user)
-            new_admin = Admin(user_id=user.id, channel_id=channel_id)
-            admins_to_add.append(new_admin)
-    session.add_all(admins_to_add)
+) -> list[int]:
+    users = [user for user in admin_users if not user.is_bot]
+    await upsert_users(session, users)
+    stmt = admin_insert(channel_id, [user.id for user in users])
+    if stmt is None:
+        return []
+    return list(await session.scalars(stmt.returning(Admin.user_id)))
 
 
 async def delete_channel_admins(
     session: AsyncSession, channel_id: int, admin_ids: list[int] | None = None
-) -> None:
+) -> list[int]:
     if admin_ids is not None and not admin_ids:
-        return
+        return []
 
     if admin_ids:
         stmt = delete(Admin).where(
@@ -56,24 +60,32 @@ async def delete_channel_admins(
     else:
         stmt = delete(Admin).where(Admin.channel_id == channel_id)
 
-    await session.execute(stmt)
+    return list((await session.scalars(stmt.returning(Admin.user_id))).all())
 
 
 async def handle_bot_join(event: ChatMemberUpdated) -> None:
+    admin_users = await fetch_chat_admins(bot, event.chat.id)
+    added: list[int] = []
+    removed: list[int] = []
     async with AsyncSessionLocal() as session:
         channel = await upsert_channel(session, event.chat, True)
-        await asyncio.sleep(1)
-        admins = await bot.get_chat_administrators(channel.id)
-        admin_users = [admin.user for admin in admins]
-        await add_channel_admins(session, channel.id, admin_users)
+        await session.flush()
+        if admin_users is not None:
+            added, removed = await sync_channel_admins(session, channel.id, admin_users)
         await session.commit()
+    if admin_users is None:
+        logger.warning("joined %s without its admin list", channel.id)
+    await user_channels.invalidate(added + removed)
+    await schedule_requests.push(channel.id)
 
 
 async def handle_bot_leave(event: ChatMemberUpdated) -> None:
     async with AsyncSessionLocal() as session:
         channel = await upsert_channel(session, event.chat, False)
-        await delete_channel_admins(session, channel.id)
+        admin_ids = await delete_channel_admins(session, channel.id)
         await session.commit()
+    await user_channels.invalidate(admin_ids)
+    await schedule_requests.push(channel.id)
 
 
 async def handle_user_promote(event: ChatMemberUpdated) -> None:
@@ -81,6 +93,7 @@ async def handle_user_promote(event: ChatMemberUpdated) -> None:
     async with AsyncSessionLocal() as session:
         await add_channel_admins(session, event.chat.id, [user])
         await session.commit()
+    await user_channels.invalidate([user.id])
 
 
 async def handle_user_demote(event: ChatMemberUpdated) -> None:
@@ -88,6 +101,7 @@ async def handle_user_demote(event: ChatMemberUpdated) -> None:
     async with AsyncSessionLocal() as session:
         await delete_channel_admins(session, event.chat.id, [user.id])
         await session.commit()
+    await user_channels.invalidate([user.id])
 
 
 router.my_chat_member.register(handle_bot_join, ChatMemberUpdatedFilter(PROMOTED))
@@ -1,47 +1,91 @@
 from aiogram import Router
 from aiogram.enums import ParseMode
-from aiogram.filters import CommandStart
-from aiogram.types import Message
-from aiogram.types import User as TUser
+from aiogram.filters import Command, CommandObject, CommandStart
+from aiogram.types import Message, ReplyKeyboardRemove
+from constants import STATS_DAYS
 from db import AsyncSessionLocal
+from handlers.export_fsm import router as export_cmd_router
+from handlers.import_fsm import router as import_cmd_router
 from handlers.quizzes_fsm import router as addquiz_cmd_router
 from handlers.settings_fsm import router as settings_cmd_router
+from helpers import create_keyboard, escape_markdown, get_user_channels
 from messages import Msg
-from models import User
-from sqlalchemy.ext.asyncio import AsyncSession
+from rollups import hardest_quizzes, posting_history
+from users import user_writer
 
 router = Router()
 router.include_router(addquiz_cmd_router)
 router.include_router(settings_cmd_router)
+router.include_router(import_cmd_router)
+router.include_router(export_cmd_router)
 
 
-async def upsert_user(session: AsyncSession, user: TUser) -> User:
-    old_user = await session.get(User, user.id)
-    if old_user:
-        old_user.first_name = user.first_name
-        old_user.last_name = user.last_name
-        old_user.username = user.username
-        return old_user
-
-    new_user = User(
-        id=user.id,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        username=user.username,
-    )
+async def handle_start_command(message: Message) -> None:
+    if not message.from_user:
+        return
 
-    session.add(new_user)
-    return new_user
+    await user_writer.write(message.from_user)
+    await message.answer(Msg.START, parse_mode=ParseMode.MARKDOWN_V2)
 
 
-async def handle_start_command(message: Message) -> None:
+async def handle_stats_command(message: Message, command: CommandObject) -> None:
     if not message.from_user:
         return
 
     async with AsyncSessionLocal() as session:
-        await upsert_user(session, message.from_user)
-        await session.commit()
-    await message.answer(Msg.START, parse_mode=ParseMode.MARKDOWN_V2)
+        channels = await get_user_channels(session, message.from_user)
+        if not channels:
+            await message.answer(Msg.NO_CHANNELS, parse_mode=ParseMode.MARKDOWN_V2)
+            return
+
+        titles = [ch["title"] for ch in channels]
+        if command.args in titles:
+            channel = channels[titles.index(command.args)]
+        elif len(channels) == 1 and not command.args:
+            channel = channels[0]
+        else:
+            keyboard = create_keyboard(([f"/stats {title}" for title in titles], 1))
+            await message.answer(
+                Msg.PROMPT_STATS_CHANNEL,
+                reply_markup=keyboard,
+                parse_mode=ParseMode.MARKDOWN_V2,
+            )
+            return
+
+        # both read a handful of rows from the rollups, however big the channel
+        hardest = await hardest_quizzes(session, channel["id"])
+        history = await posting_history(session, channel["id"])
+
+    hardest_lines = [
+        escape_markdown(
+            Msg.STATS_HARDEST.format(
+                rate=f"{row.correct_rate:.0%}", voters=row.voters, question=row.question
+            )
+        )
+        for row in hardest
+    ]
+    history_lines = [
+        escape_markdown(
+            Msg.STATS_DAY.format(
+                day=day.day.isoformat(),
+                posts=day.posts,
+                voters=day.voters,
+                rate=f"{day.correct / day.voters:.0%}" if day.voters else "-",
+            )
+        )
+        for day in history
+    ]
+    await message.answer(
+        Msg.STATS.format(
+            channel=escape_markdown(channel["title"]),
+            hardest="\n".join(hardest_lines) or Msg.STATS_NO_ANSWERS,
+            days=STATS_DAYS,
+            history="\n".join(history_lines) or Msg.STATS_NO_POSTS,
+        ),
+        reply_markup=ReplyKeyboardRemove(),
+        parse_mode=ParseMode.MARKDOWN_V2,
+    )
 
 
 router.message.register(handle_start_command, CommandStart())
+router.message.register(handle_stats_command, Command("stats"))
@@ -0,0 +1,121 @@
+import io
+import tempfile
+
+from aiogram import F, Router
+from aiogram.enums import ParseMode
+from aiogram.filters import Command, StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message, ReplyKeyboardRemove
+from constants import EXPORT_MAX_FILE_SIZE, EXPORT_SPOOL_SIZE
+from db import AsyncSessionLocal
+from exporter import EXPORT_FORMATS, StreamInputFile, export_quizzes
+from helpers import create_keyboard, escape_markdown, get_user_channels
+from messages import Btn, Msg
+from type import ExportData, ExportForm
+
+router = Router()
+
+FORMAT_BUTTONS = {Btn.CSV: "csv", Btn.JSONL: "jsonl"}
+
+
+async def start_export(message: Message, state: FSMContext) -> None:
+    if not message.from_user:
+        return
+
+    async with AsyncSessionLocal() as session:
+        channels = await get_user_channels(session, message.from_user)
+
+    if not channels:
+        await message.answer(Msg.NO_CHANNELS, parse_mode=ParseMode.MARKDOWN_V2)
+        return
+
+    titles = [ch["title"] for ch in channels]
+    await state.set_data(ExportData(channels=channels, channel=None))
+    await state.set_state(ExportForm.select_channel)
+    keyboard = create_keyboard((titles, 2), ([Btn.CANCEL], 1))
+    await message.answer(
+        Msg.PROMPT_CHANNEL, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN_V2
+    )
+
+
+async def select_export_channel(message: Message, state: FSMContext) -> None:
+    data: ExportData = await state.get_data()
+    titles = [ch["title"] for ch in data["channels"]]
+    if message.text not in titles:
+        await message.answer(Msg.INVALID_RESPONSE, parse_mode=ParseMode.MARKDOWN_V2)
+        return
+
+    channel = data["channels"][titles.index(message.text)]
+    await state.update_data(channel=channel)
+    await state.set_state(ExportForm.select_format)
+    keyboard = create_keyboard((list(FORMAT_BUTTONS), 2), ([Btn.BACK, Btn.CANCEL], 2))
+    await message.answer(
+        Msg.PROMPT_EXPORT_FORMAT,
+        reply_markup=keyboard,
+        parse_mode=ParseMode.MARKDOWN_V2,
+    )
+
+
+async def select_export_format(message: Message, state: FSMContext) -> None:
+    data: ExportData = await state.get_data()
+    if message.text == Btn.BACK:
+        titles = [ch["title"] for ch in data["channels"]]
+        await state.set_state(ExportForm.select_channel)
+        keyboard = create_keyboard((titles, 2), ([Btn.CANCEL], 1))
+        await message.answer(
+            Msg.PROMPT_CHANNEL, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN_V2
+        )
+        return
+
+    fmt = FORMAT_BUTTONS.get(message.text or "")
+    if not fmt or not data["channel"]:
+        await message.answer(Msg.INVALID_RESPONSE, parse_mode=ParseMode.MARKDOWN_V2)
+        return
+
+    channel = data["channel"]
+    await state.clear()
+    # small banks stay in memory, large ones spill to disk
+    with tempfile.SpooledTemporaryFile(EXPORT_SPOOL_SIZE) as file:
+        stream = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        async with AsyncSessionLocal() as session:
+            count = await export_quizzes(session, channel["id"], fmt, stream)
+        stream.flush()
+        size = file.tell()
+        stream.detach()
+
+        if not count:
+            text = Msg.EXPORT_EMPTY
+        elif size > EXPORT_MAX_FILE_SIZE:
+            text = Msg.EXPORT_TOO_LARGE
+        else:
+            filename = f"quizzes_{channel['id']}{EXPORT_FORMATS[fmt]}"
+            await message.answer_document(
+                StreamInputFile(file, filename),
+                caption=Msg.EXPORT_DONE.format(
+                    count=count, channel=escape_markdown(channel["title"])
+                ),
+                reply_markup=ReplyKeyboardRemove(),
+                parse_mode=ParseMode.MARKDOWN_V2,
+            )
+            return
+
+    await message.answer(
+        text, reply_markup=ReplyKeyboardRemove(), parse_mode=ParseMode.MARKDOWN_V2
+    )
+
+
+async def cancel_export(message: Message, state: FSMContext) -> None:
+    await state.clear()
+    await message.answer(
+        Msg.EXPORT_CANCELED,
+        reply_markup=ReplyKeyboardRemove(),
+        parse_mode=ParseMode.MARKDOWN_V2,
+    )
+
+
+export_state_filter = StateFilter(*ExportForm.__all_states__)
+
+router.message.register(start_export, Command("export"))
+router.message.register(cancel_export, export_state_filter, F.text == Btn.CANCEL)
+router.message.register(select_export_channel, ExportForm.select_channel)
+router.message.register(select_export_format, ExportForm.select_format)
@@ -0,0 +1,141 @@
+import io
+import tempfile
+
+from aiogram import F, Router
+from aiogram.enums import ParseMode
+from aiogram.filters import Command, StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message, ReplyKeyboardRemove
+from bot import bot
+from constants import IMPORT_ERRORS_SHOWN, IMPORT_MAX_FILE_SIZE
+from db import AsyncSessionLocal
+from deck import reset_channel_deck
+from helpers import create_keyboard, escape_markdown, get_user_channels
+from importer import ImportFileError, ImportResult, detect_format, import_quizzes
+from messages import Btn, Msg
+from type import ImportData, ImportForm
+
+router = Router()
+
+
+def format_result(result: ImportResult) -> str:
+    text: str = Msg.IMPORT_DONE.format(imported=result.imported)
+    if result.failed:
+        errors = "\n".join(
+            escape_markdown(f"row {error.row}: {error.message}")
+            for error in result.errors[:IMPORT_ERRORS_SHOWN]
+        )
+        if result.failed > IMPORT_ERRORS_SHOWN:
+            errors += "\n" + escape_markdown("...")
+        text += Msg.IMPORT_REJECTED.format(failed=result.failed, errors=errors)
+    if result.similar:
+        rows = "\n".join(
+            escape_markdown(f"row {duplicate.row}: {duplicate.message}")
+            for duplicate in result.duplicates[:IMPORT_ERRORS_SHOWN]
+        )
+        if result.similar > IMPORT_ERRORS_SHOWN:
+            rows += "\n" + escape_markdown("...")
+        text += Msg.IMPORT_SIMILAR.format(similar=result.similar, rows=rows)
+    return text
+
+
+async def start_import(message: Message, state: FSMContext) -> None:
+    if not message.from_user:
+        return
+
+    async with AsyncSessionLocal() as session:
+        channels = await get_user_channels(session, message.from_user)
+
+    if not channels:
+        await message.answer(Msg.NO_CHANNELS, parse_mode=ParseMode.MARKDOWN_V2)
+        return
+
+    titles = [ch["title"] for ch in channels]
+    await state.set_data(ImportData(channels=channels, channel=None))
+    await state.set_state(ImportForm.select_channel)
+    keyboard = create_keyboard((titles, 2), ([Btn.CANCEL], 1))
+    await message.answer(
+        Msg.PROMPT_CHANNEL, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN_V2
+    )
+
+
+async def select_import_channel(message: Message, state: FSMContext) -> None:
+    data: ImportData = await state.get_data()
+    titles = [ch["title"] for ch in data["channels"]]
+    if message.text not in titles:
+        await message.answer(Msg.INVALID_RESPONSE, parse_mode=ParseMode.MARKDOWN_V2)
+        return
+
+    channel = data["channels"][titles.index(message.text)]
+    await state.update_data(channel=channel)
+    await state.set_state(ImportForm.upload)
+    keyboard = create_keyboard(([Btn.BACK, Btn.CANCEL], 2))
+    await message.answer(
+        Msg.PROMPT_IMPORT_FILE, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN_V2
+    )
+
+
+async def handle_import_file(message: Message, state: FSMContext) -> None:
+    data: ImportData = await state.get_data()
+    if message.text == Btn.BACK:
+        titles = [ch["title"] for ch in data["channels"]]
+        await state.set_state(ImportForm.select_channel)
+        keyboard = create_keyboard((titles, 2), ([Btn.CANCEL], 1))
+        await message.answer(
+            Msg.PROMPT_CHANNEL, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN_V2
+        )
+        return
+
+    document = message.document
+    if not document or not message.from_user or not data["channel"]:
+        await message.answer(Msg.IMPORT_NOT_A_FILE, parse_mode=ParseMode.MARKDOWN_V2)
+        return
+
+    if (document.file_size or 0) > IMPORT_MAX_FILE_SIZE:
+        await message.answer(Msg.IMPORT_TOO_LARGE, parse_mode=ParseMode.MARKDOWN_V2)
+        return
+
+    channel_id = data["channel"]["id"]
+    await message.answer(Msg.IMPORT_STARTED, parse_mode=ParseMode.MARKDOWN_V2)
+    try:
+        fmt = detect_format(document.file_name or "")
+        with tempfile.TemporaryFile() as file:
+            await bot.download(document, destination=file)
+            stream = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+            async with AsyncSessionLocal() as session:
+                result = await import_quizzes(
+                    session, stream, fmt, channel_id, message.from_user.id
+                )
+                await session.commit()
+    except ImportFileError as e:
+        await message.answer(
+            Msg.IMPORT_FAILED.format(error=escape_markdown(str(e))),
+            parse_mode=ParseMode.MARKDOWN_V2,
+        )
+        return
+
+    if result.imported:
+        await reset_channel_deck(channel_id)
+    await state.clear()
+    await message.answer(
+        format_result(result),
+        reply_markup=ReplyKeyboardRemove(),
+        parse_mode=ParseMode.MARKDOWN_V2,
+    )
+
+
+async def cancel_import(message: Message, state: FSMContext) -> None:
+    await state.clear()
+    await message.answer(
+        Msg.IMPORT_CANCELED,
+        reply_markup=ReplyKeyboardRemove(),
+        parse_mode=ParseMode.MARKDOWN_V2,
+    )
+
+
+import_state_filter = StateFilter(*ImportForm.__all_states__)
+
+router.message.register(start_import, Command("import"))
+router.message.register(cancel_import, import_state_filter, F.text == Btn.CANCEL)
+router.message.register(select_import_channel, ImportForm.select_channel)
+router.message.register(handle_import_file, ImportForm.upload)
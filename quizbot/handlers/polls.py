@@ -0,0 +1,12 @@
+from aiogram import Router
+from aiogram.types import Poll
+from polls import answer_buffer
+
+router = Router()
+
+
+async def handle_poll(poll: Poll) -> None:
+    answer_buffer.add(poll)
+
+
+router.poll.register(handle_poll)
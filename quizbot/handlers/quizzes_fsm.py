@@ -3,7 +3,16 @@ from aiogram.enums import ParseMode
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, ReplyKeyboardRemove
+from constants import (
+    EXPLANATION_MAX_LENGTH,
+    MAX_OPTIONS,
+    MIN_OPTIONS,
+    OPTION_MAX_LENGTH,
+    QUESTION_MAX_LENGTH,
+)
 from db import AsyncSessionLocal
+from deck import add_to_channel_deck
+from duplicates import find_duplicate
 from helpers import create_keyboard, escape_markdown, get_user_channels
 from messages import Btn, Msg
 from models import Option, Quiz
@@ -19,7 +28,7 @@ async def save_quiz_to_db(session: AsyncSession, data: QuizData) -> Quiz:
         correct_order=data["correct_order"],
         explanation=data["explanation"],
         user_id=data["user_id"],
-        channel_id=data["channel"].id,
+        channel_id=data["channel"]["id"],
     )
     session.add(quiz)
     await session.flush()
@@ -44,7 +53,7 @@ async def start_quiz_creation(message: Message, state: FSMContext) -> None:
             await message.answer(Msg.NO_CHANNELS, parse_mode=ParseMode.MARKDOWN_V2)
             return
 
-        titles = [ch.title for ch in channels]
+        titles = [ch["title"] for ch in channels]
         data: QuizData = QuizData(
             channels=channels,
             user_id=message.from_user.id,
@@ -64,7 +73,7 @@ async def start_quiz_creation(message: Message, state: FSMContext) -> None:
 
 async def select_channel(message: Message, state: FSMContext) -> None:
     data: QuizData = await state.get_data()
-    titles = [ch.title for ch in data["channels"]]
+    titles = [ch["title"] for ch in data["channels"]]
     if message.text not in titles:
         await message.answer(Msg.INVALID_RESPONSE, parse_mode=ParseMode.MARKDOWN_V2)
         return
@@ -85,14 +94,14 @@ async def handle_question_input(message: Message, state: FSMContext) -> None:
     if message.text == Btn.BACK:
         await state.set_state(QuizForm.select_channel)
         data: QuizData = await state.get_data()
-        titles = [ch.title for ch in data["channels"]]
+        titles = [ch["title"] for ch in data["channels"]]
         keyboard = create_keyboard((titles, 2), ([Btn.CANCEL], 1))
         await message.answer(
             Msg.PROMPT_CHANNEL, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN_V2
         )
         return
 
-    if len(message.text) > 300:
+    if len(message.text) > QUESTION_MAX_LENGTH:
         await message.answer(Msg.QUESTION_TOO_LONG, parse_mode=ParseMode.MARKDOWN_V2)
         return
 
@@ -116,13 +125,13 @@ async def handle_option_input(message: Message, state: FSMContext) -> None:
         )
         return
 
-    if len(message.text) > 100:
+    if len(message.text) > OPTION_MAX_LENGTH:
         await message.answer(Msg.OPTION_TOO_LONG, parse_mode=ParseMode.MARKDOWN_V2)
         return
 
     data: QuizData = await state.get_data()
     if message.text == Btn.FINISH:
-        if len(data["options"]) < 2:
+        if len(data["options"]) < MIN_OPTIONS:
             await message.answer(Msg.NEED_TWO_OPTIONS, parse_mode=ParseMode.MARKDOWN_V2)
             return
 
@@ -135,14 +144,14 @@ async def handle_option_input(message: Message, state: FSMContext) -> None:
         )
         return
 
-    if len(data["options"]) >= 10:
+    if len(data["options"]) >= MAX_OPTIONS:
         await message.answer(Msg.MAX_OPTIONS_REACHED, parse_mode=ParseMode.MARKDOWN_V2)
         return
 
     data["options"].append(message.text)
     await state.update_data(options=data["options"])
     keyboard = create_keyboard(
-        ([Btn.FINISH] if len(data["options"]) >= 2 else [], 1),
+        ([Btn.FINISH] if len(data["options"]) >= MIN_OPTIONS else [], 1),
         ([Btn.BACK, Btn.CANCEL], 2),
     )
     await message.answer(
@@ -181,7 +190,7 @@ async def handle_explanation(message: Message, state: FSMContext) -> None:
     if not message.text:
         return
 
-    if len(message.text) > 200:
+    if len(message.text) > EXPLANATION_MAX_LENGTH:
         await message.answer(Msg.EXPLANATION_TOO_LONG, parse_mode=ParseMode.MARKDOWN_V2)
         return
 
@@ -200,18 +209,30 @@ async def handle_explanation(message: Message, state: FSMContext) -> None:
     await state.update_data(explanation=explanation)
     await state.set_state(QuizForm.confirmation)
 
+    async with AsyncSessionLocal() as session:
+        duplicate = await find_duplicate(
+            session, data["channel"]["id"], data["question"]
+        )
+    warning = ""
+    if duplicate:
+        warning = Msg.DUPLICATE.format(
+            similarity=escape_markdown(f"{duplicate.similarity:.0%}"),
+            question=escape_markdown(duplicate.question),
+        )
+
     keyboard = create_keyboard(
         ([Btn.APPROVE, Btn.REJECT], 2), ([Btn.BACK, Btn.CANCEL], 2)
     )
     await message.answer(
         Msg.PREVIEW.format(
-            channel=escape_markdown(data["channel"].title),
+            channel=escape_markdown(data["channel"]["title"]),
             question=escape_markdown(data["question"]),
             options="\n".join(
                 [escape_markdown(f"\t\t- {opt}") for opt in data["options"]]
             ),
             correct=escape_markdown(data["options"][data["correct_order"]]),
             explanation=escape_markdown(explanation) if explanation else "",
+            duplicate=warning,
         ),
         reply_markup=keyboard,
         parse_mode=ParseMode.MARKDOWN_V2,
@@ -244,8 +265,10 @@ async def confirm_quiz(message: Message, state: FSMContext) -> None:
 
     if message.text == Btn.APPROVE:
         async with AsyncSessionLocal() as session:
-            await save_quiz_to_db(session, data)
+            quiz = await save_quiz_to_db(session, data)
             await session.commit()
+        # only a committed quiz can be drawn from the deck
+        await add_to_channel_deck(quiz.channel_id, quiz.id)
         await state.clear()
         await message.answer(
             Msg.SAVED,
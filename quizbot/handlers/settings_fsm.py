@@ -5,14 +5,40 @@ from aiogram.enums import ParseMode
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, ReplyKeyboardRemove
+from constants import QUIZ_COUNT, TIMEZONE
 from db import AsyncSessionLocal, redis
-from helpers import create_keyboard, get_user_channels
+from helpers import create_keyboard, escape_markdown, get_user_channels
 from messages import Btn, Msg
-from scheduler import schedule_channel
+from scheduler import schedule_requests
+from schedules import (
+    ScheduleError,
+    dump_schedule,
+    find_timezone,
+    format_days,
+    load_schedule,
+    parse_schedule_input,
+)
 from type import ChannelSettings, SettingsConfirmType, SettingsData, SettingsForm
 
 router = Router()
 
+ACTION_BUTTONS = (
+    ([Btn.TIME, Btn.QUIZZES], 2),
+    ([Btn.SCHEDULE, Btn.TIMEZONE], 2),
+    ([Btn.BACK, Btn.CANCEL], 2),
+)
+
+
+def format_schedule(schedule: str) -> str:
+    return "\n".join(
+        escape_markdown(
+            Msg.SCHEDULE_SLOT.format(
+                time=slot.time, count=slot.quiz_count, days=format_days(slot.days)
+            )
+        )
+        for slot in load_schedule(schedule)
+    )
+
 
 async def start_settings(message: Message, state: FSMContext) -> None:
     if not message.from_user:
@@ -25,13 +51,15 @@ async def start_settings(message: Message, state: FSMContext) -> None:
         await message.answer(Msg.NO_CHANNELS, parse_mode=ParseMode.MARKDOWN_V2)
         return
 
-    titles = [ch.title for ch in channels]
+    titles = [ch["title"] for ch in channels]
     await state.set_state(SettingsForm.select_channel)
     data = SettingsData(
         channels=channels,
         channel=None,
         pending_time=None,
         pending_quiz_count=None,
+        pending_schedule=None,
+        pending_timezone=None,
         confirm_type=None,
     )
     await state.set_data(data)
@@ -43,7 +71,7 @@ async def start_settings(message: Message, state: FSMContext) -> None:
 
 async def handle_select_channel(message: Message, state: FSMContext) -> None:
     data: SettingsData = await state.get_data()
-    titles = [ch.title for ch in data["channels"]]
+    titles = [ch["title"] for ch in data["channels"]]
 
     if message.text not in titles:
         await message.answer(Msg.INVALID_RESPONSE, parse_mode=ParseMode.MARKDOWN_V2)
@@ -52,9 +80,7 @@ async def handle_select_channel(message: Message, state: FSMContext) -> None:
     channel = data["channels"][titles.index(message.text)]
     await state.update_data(channel=channel)
     await state.set_state(SettingsForm.sleect_action)
-    keyboard = create_keyboard(
-        ([Btn.TIME, Btn.QUIZZES], 2), ([Btn.BACK, Btn.CANCEL], 2)
-    )
+    keyboard = create_keyboard(*ACTION_BUTTONS)
     await message.answer(
         Msg.PROMPT_SETTINGS_ACTION,
         reply_markup=keyboard,
@@ -63,9 +89,9 @@ async def handle_select_channel(message: Message, state: FSMContext) -> None:
 
 
 async def handle_select_action(message: Message, state: FSMContext) -> None:
+    data: SettingsData = await state.get_data()
     if message.text == Btn.BACK:
-        data: SettingsData = await state.get_data()
-        titles = [ch.title for ch in data["channels"]]
+        titles = [ch["title"] for ch in data["channels"]]
         keyboard = create_keyboard((titles, 2), ([Btn.CANCEL], 1))
         await state.set_state(SettingsForm.select_channel)
         await message.answer(
@@ -82,6 +108,14 @@ async def handle_select_action(message: Message, state: FSMContext) -> None:
         return
 
     if message.text == Btn.QUIZZES:
+        # a schedule keeps a count per time, the channel's count is only read
+        # when a schedule is entered
+        if await redis.hexists(data["channel"]["id"], "schedule"):
+            await message.answer(
+                Msg.QUIZ_COUNT_IN_SCHEDULE, parse_mode=ParseMode.MARKDOWN_V2
+            )
+            return
+
         await state.set_state(SettingsForm.enter_quiz_count)
         keyboard = create_keyboard(([Btn.BACK, Btn.CANCEL], 2))
         await message.answer(
@@ -91,18 +125,48 @@ async def handle_select_action(message: Message, state: FSMContext) -> None:
         )
         return
 
+    if message.text == Btn.SCHEDULE:
+        await prompt_schedule(message, state, Msg.ENTER_SCHEDULE)
+        return
+
+    if message.text == Btn.TIMEZONE:
+        await prompt_timezone(message, state, Msg.ENTER_TIMEZONE)
+        return
+
     await message.answer(Msg.INVALID_RESPONSE, parse_mode=ParseMode.MARKDOWN_V2)
 
 
+async def prompt_schedule(message: Message, state: FSMContext, text: str) -> None:
+    data: SettingsData = await state.get_data()
+    quiz_count = await redis.hget(data["channel"]["id"], "quiz_count")
+    await state.set_state(SettingsForm.enter_schedule)
+    keyboard = create_keyboard(([Btn.BACK, Btn.CANCEL], 2))
+    await message.answer(
+        text.format(count=quiz_count or QUIZ_COUNT),
+        reply_markup=keyboard,
+        parse_mode=ParseMode.MARKDOWN_V2,
+    )
+
+
+async def prompt_timezone(message: Message, state: FSMContext, text: str) -> None:
+    data: SettingsData = await state.get_data()
+    timezone = await redis.hget(data["channel"]["id"], "timezone")
+    await state.set_state(SettingsForm.enter_timezone)
+    keyboard = create_keyboard(([Btn.BACK, Btn.CANCEL], 2))
+    await message.answer(
+        text.format(timezone=escape_markdown(timezone or TIMEZONE)),
+        reply_markup=keyboard,
+        parse_mode=ParseMode.MARKDOWN_V2,
+    )
+
+
 async def handle_enter_time(message: Message, state: FSMContext) -> None:
     if not message.text:
         return
 
     if message.text == Btn.BACK:
         await state.set_state(SettingsForm.sleect_action)
-        keyboard = create_keyboard(
-            ([Btn.TIME, Btn.QUIZZES], 2), ([Btn.BACK, Btn.CANCEL], 2)
-        )
+        keyboard = create_keyboard(*ACTION_BUTTONS)
         await message.answer(
             Msg.PROMPT_SETTINGS_ACTION,
             reply_markup=keyboard,
@@ -135,9 +199,7 @@ async def handle_enter_quiz_count(message: Message, state: FSMContext) -> None:
 
     if message.text == Btn.BACK:
         await state.set_state(SettingsForm.sleect_action)
-        keyboard = create_keyboard(
-            ([Btn.TIME, Btn.QUIZZES], 2), ([Btn.BACK, Btn.CANCEL], 2)
-        )
+        keyboard = create_keyboard(*ACTION_BUTTONS)
         await message.answer(
             Msg.PROMPT_SETTINGS_ACTION,
             reply_markup=keyboard,
@@ -164,6 +226,79 @@ async def handle_enter_quiz_count(message: Message, state: FSMContext) -> None:
     await message.answer(Msg.INVALID_QUIZ_COUNT, parse_mode=ParseMode.MARKDOWN_V2)
 
 
+async def handle_enter_schedule(message: Message, state: FSMContext) -> None:
+    if not message.text:
+        return
+
+    if message.text == Btn.BACK:
+        await state.set_state(SettingsForm.sleect_action)
+        keyboard = create_keyboard(*ACTION_BUTTONS)
+        await message.answer(
+            Msg.PROMPT_SETTINGS_ACTION,
+            reply_markup=keyboard,
+            parse_mode=ParseMode.MARKDOWN_V2,
+        )
+        return
+
+    data: SettingsData = await state.get_data()
+    quiz_count = await redis.hget(data["channel"]["id"], "quiz_count")
+    try:
+        slots = parse_schedule_input(message.text, int(quiz_count or QUIZ_COUNT))
+    except ScheduleError as e:
+        await message.answer(
+            Msg.INVALID_SCHEDULE.format(error=escape_markdown(str(e))),
+            parse_mode=ParseMode.MARKDOWN_V2,
+        )
+        return
+
+    schedule = dump_schedule(slots)
+    await state.update_data(
+        pending_schedule=schedule, confirm_type=SettingsConfirmType.SCHEDULE
+    )
+    await state.set_state(SettingsForm.confirm)
+    keyboard = create_keyboard(
+        ([Btn.APPROVE, Btn.REJECT], 2), ([Btn.BACK, Btn.CANCEL], 2)
+    )
+    await message.answer(
+        Msg.CONFIRM_SCHEDULE.format(slots=format_schedule(schedule)),
+        reply_markup=keyboard,
+        parse_mode=ParseMode.MARKDOWN_V2,
+    )
+
+
+async def handle_enter_timezone(message: Message, state: FSMContext) -> None:
+    if not message.text:
+        return
+
+    if message.text == Btn.BACK:
+        await state.set_state(SettingsForm.sleect_action)
+        keyboard = create_keyboard(*ACTION_BUTTONS)
+        await message.answer(
+            Msg.PROMPT_SETTINGS_ACTION,
+            reply_markup=keyboard,
+            parse_mode=ParseMode.MARKDOWN_V2,
+        )
+        return
+
+    timezone = find_timezone(message.text)
+    if timezone is None:
+        await message.answer(Msg.INVALID_TIMEZONE, parse_mode=ParseMode.MARKDOWN_V2)
+        return
+
+    await state.update_data(
+        pending_timezone=timezone, confirm_type=SettingsConfirmType.TIMEZONE
+    )
+    await state.set_state(SettingsForm.confirm)
+    keyboard = create_keyboard(
+        ([Btn.APPROVE, Btn.REJECT], 2), ([Btn.BACK, Btn.CANCEL], 2)
+    )
+    await message.answer(
+        Msg.CONFIRM_TIMEZONE.format(timezone=escape_markdown(timezone)),
+        reply_markup=keyboard,
+        parse_mode=ParseMode.MARKDOWN_V2,
+    )
+
+
 async def handle_confirm(message: Message, state: FSMContext) -> None:
     data: SettingsData = await state.get_data()
 
@@ -178,6 +313,14 @@ async def handle_confirm(message: Message, state: FSMContext) -> None:
             )
             return
 
+        if data["confirm_type"] == SettingsConfirmType.SCHEDULE:
+            await prompt_schedule(message, state, Msg.REENTER_SCHEDULE)
+            return
+
+        if data["confirm_type"] == SettingsConfirmType.TIMEZONE:
+            await prompt_timezone(message, state, Msg.REENTER_TIMEZONE)
+            return
+
         await state.set_state(SettingsForm.enter_quiz_count)
         await message.answer(
             Msg.REENTER_QUIZ_COUNT,
@@ -196,14 +339,25 @@ async def handle_confirm(message: Message, state: FSMContext) -> None:
         return
 
     if message.text == Btn.APPROVE:
+        # only the confirmed value is saved; one entered before the admin went
+        # back and picked another action stays pending and is dropped
         settings: ChannelSettings = {}
-        if data["pending_time"]:
+        confirm_type = data["confirm_type"]
+        if confirm_type == SettingsConfirmType.TIME and data["pending_time"]:
             settings["time"] = data["pending_time"]
-        if data["pending_quiz_count"]:
+        if confirm_type == SettingsConfirmType.QUIZZES and data["pending_quiz_count"]:
             settings["quiz_count"] = str(data["pending_quiz_count"])
-
-        await redis.hset(data["channel"].id, mapping=settings)
-        await schedule_channel(data["channel"].id)
+        if confirm_type == SettingsConfirmType.SCHEDULE and data["pending_schedule"]:
+            settings["schedule"] = data["pending_schedule"]
+        if confirm_type == SettingsConfirmType.TIMEZONE and data["pending_timezone"]:
+            settings["timezone"] = data["pending_timezone"]
+
+        channel_id = data["channel"]["id"]
+        await redis.hset(channel_id, mapping=settings)
+        if confirm_type == SettingsConfirmType.TIME:
+            # a single time replaces the schedule
+            await redis.hdel(channel_id, "schedule")
+        await schedule_requests.push(channel_id)
         await state.clear()
         await message.answer(
             Msg.SAVED_SETTINGS,
@@ -232,4 +386,6 @@ router.message.register(handle_select_channel, SettingsForm.select_channel)
 router.message.register(handle_select_action, SettingsForm.sleect_action)
 router.message.register(handle_enter_time, SettingsForm.enter_time)
 router.message.register(handle_enter_quiz_count, SettingsForm.enter_quiz_count)
+router.message.register(handle_enter_schedule, SettingsForm.enter_schedule)
+router.message.register(handle_enter_timezone, SettingsForm.enter_timezone)
 router.message.register(handle_confirm, SettingsForm.confirm)
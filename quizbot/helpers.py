@@ -2,23 +2,33 @@ import re
 
 from aiogram.types import KeyboardButton, ReplyKeyboardMarkup
 from aiogram.types import User as TUser
+from cache import user_channels
 from models import Admin, Channel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from type import ChannelRef
 
 
-async def get_user_channels(session: AsyncSession, user: TUser) -> list[Channel]:
+async def load_user_channels(session: AsyncSession, user_id: int) -> list[ChannelRef]:
     stmt = (
-        select(Admin).where(Admin.user_id == user.id).options(joinedload(Admin.channel))
+        select(Channel.id, Channel.title)
+        .join(Admin, Admin.channel_id == Channel.id)
+        .where(Admin.user_id == user_id)
     )
 
-    admins = (await session.scalars(stmt)).all()
-    channels = [admin.channel for admin in admins]
+    rows = (await session.execute(stmt)).all()
+    channels = [ChannelRef(id=row.id, title=row.title) for row in rows]
 
     return channels
 
 
+async def get_user_channels(session: AsyncSession, user: TUser) -> list[ChannelRef]:
+    channels: list[ChannelRef] = await user_channels.get(
+        user.id, lambda: load_user_channels(session, user.id)
+    )
+    return channels
+
+
 def create_keyboard(*button_groups: tuple[list[str], int]) -> ReplyKeyboardMarkup:
     keyboard = []
     for buttons, columns in button_groups:
@@ -0,0 +1,353 @@
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any
+
+from constants import (
+    EXPLANATION_MAX_LENGTH,
+    IMPORT_BATCH,
+    IMPORT_MAX_ERRORS,
+    IMPORT_QUOTE_LENGTH,
+    MAX_OPTIONS,
+    MIN_OPTIONS,
+    OPTION_MAX_LENGTH,
+    QUESTION_MAX_LENGTH,
+)
+from db import AsyncSessionLocal, engine
+from deck import reset_channel_deck
+from duplicates import question_indexes, question_key
+from models import Option, Quiz
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+FORMATS = {".csv": "csv", ".json": "json", ".jsonl": "json", ".ndjson": "json"}
+CHUNK_SIZE = 64 * 1024
+
+
+class ImportFileError(Exception):
+    pass
+
+
+@dataclass
+class QuizRow:
+    question: str
+    options: list[str]
+    correct_order: int
+    explanation: str | None
+
+
+@dataclass
+class RowError:
+    row: int
+    message: str
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    failed: int = 0
+    errors: list[RowError] = field(default_factory=list)
+    similar: int = 0
+    duplicates: list[RowError] = field(default_factory=list)
+
+    def reject(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(RowError(row, message))
+
+    def flag(self, row: int, message: str) -> None:
+        self.similar += 1
+        if len(self.duplicates) < IMPORT_MAX_ERRORS:
+            self.duplicates.append(RowError(row, message))
+
+
+def detect_format(filename: str) -> str:
+    fmt = FORMATS.get(Path(filename).suffix.lower())
+    if fmt is None:
+        raise ImportFileError(f"unsupported file type, use one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def iter_csv(stream: IO[str]) -> Iterator[tuple[int, Any]]:
+    reader = csv.DictReader(stream)
+    if not {"question", "correct"} <= set(reader.fieldnames or ()):
+        raise ImportFileError("the CSV header must have question and correct columns")
+
+    option_columns = [
+        name for name in reader.fieldnames or () if name.lower().startswith("option")
+    ]
+    for record in reader:
+        options = [record[name] for name in option_columns]
+        yield (
+            reader.line_num,
+            {
+                "question": record["question"],
+                "options": options,
+                "correct": record.get("correct"),
+                "explanation": record.get("explanation"),
+            },
+        )
+
+
+def iter_lines(chunks: Iterator[str]) -> Iterator[str]:
+    pending = ""
+    for chunk in chunks:
+        *lines, pending = (pending + chunk).split("\n")
+        yield from lines
+    if pending:
+        yield pending
+
+
+def iter_json(stream: IO[str]) -> Iterator[tuple[int, Any]]:
+    chunks = iter(lambda: stream.read(CHUNK_SIZE), "")
+    buffer = next(chunks, "")
+    if not buffer.lstrip().startswith("["):
+        # JSON lines, one quiz object per line, decoded by parse_quiz so a
+        # broken line only rejects that row
+        lines = iter_lines(itertools.chain([buffer], chunks))
+        for row, line in enumerate(lines, 1):
+            if line.strip():
+                yield row, line
+        return
+
+    # a top-level array, decoded one element at a time
+    decoder = json.JSONDecoder()
+    buffer = buffer.lstrip()[1:]
+    row = 0
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if buffer.startswith("]"):
+            return
+        try:
+            record, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as e:
+            chunk = next(chunks, "")
+            if not chunk:
+                message = f"item {row + 1}: invalid JSON ({e.msg})"
+                raise ImportFileError(message) from None
+            buffer += chunk
+            continue
+        row += 1
+        buffer = buffer[end:]
+        yield row, record
+
+
+def iter_records(stream: IO[str], fmt: str) -> Iterator[tuple[int, Any]]:
+    return iter_csv(stream) if fmt == "csv" else iter_json(stream)
+
+
+def parse_quiz(record: Any) -> QuizRow:
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON ({e.msg})") from None
+    if not isinstance(record, dict):
+        raise ValueError("expected an object")
+
+    question = str(record.get("question") or "").strip()
+    if not question:
+        raise ValueError("question is empty")
+    if len(question) > QUESTION_MAX_LENGTH:
+        raise ValueError(f"question is longer than {QUESTION_MAX_LENGTH} characters")
+
+    options = record.get("options")
+    if not isinstance(options, list):
+        raise ValueError("options must be a list")
+    options = ["" if opt is None else str(opt).strip() for opt in options]
+    # blank trailing options are unused columns, but a gap before a filled
+    # one would shift the numbers correct refers to
+    while options and not options[-1]:
+        options.pop()
+    if "" in options:
+        raise ValueError(f"option {options.index('') + 1} is empty")
+    if not MIN_OPTIONS <= len(options) <= MAX_OPTIONS:
+        raise ValueError(f"expected {MIN_OPTIONS} to {MAX_OPTIONS} options")
+    for i, opt in enumerate(options, 1):
+        if len(opt) > OPTION_MAX_LENGTH:
+            raise ValueError(
+                f"option {i} is longer than {OPTION_MAX_LENGTH} characters"
+            )
+
+    if "correct" not in record:
+        raise ValueError("correct is missing")
+    value = record["correct"]
+    # bool is a subclass of int and int() would truncate a float, so both are
+    # rejected rather than read as an option number
+    if isinstance(value, bool | float) or not isinstance(value, int | str):
+        raise ValueError("correct must be the number of the right option")
+    try:
+        correct = int(value)
+    except ValueError:
+        raise ValueError("correct must be the number of the right option") from None
+    if not 1 <= correct <= len(options):
+        raise ValueError(f"correct must be between 1 and {len(options)}")
+
+    explanation = str(record.get("explanation") or "").strip() or None
+    if explanation and len(explanation) > EXPLANATION_MAX_LENGTH:
+        raise ValueError(
+            f"explanation is longer than {EXPLANATION_MAX_LENGTH} characters"
+        )
+
+    return QuizRow(question, options, correct - 1, explanation)
+
+
+async def insert_batch(
+    session: AsyncSession, channel_id: int, user_id: int, quizzes: list[QuizRow]
+) -> None:
+    stmt = insert(Quiz).returning(Quiz.id, sort_by_parameter_order=True)
+    quiz_ids = await session.scalars(
+        stmt,
+        [
+            {
+                "question": quiz.question,
+                "correct_order": quiz.correct_order,
+                "explanation": quiz.explanation,
+                "user_id": user_id,
+                "channel_id": channel_id,
+            }
+            for quiz in quizzes
+        ],
+    )
+    await session.execute(
+        insert(Option),
+        [
+            {"option": opt, "order": order, "quiz_id": quiz_id}
+            for quiz_id, quiz in zip(quiz_ids, quizzes, strict=True)
+            for order, opt in enumerate(quiz.options)
+        ],
+    )
+
+
+async def copy_batch(
+    session: AsyncSession, channel_id: int, user_id: int, quizzes: list[QuizRow]
+) -> None:
+    # COPY can't return generated keys, so reserve the ids up front
+    sequence = func.pg_get_serial_sequence(Quiz.__tablename__, "id")
+    stmt = select(func.nextval(sequence)).select_from(
+        func.generate_series(1, len(quizzes))
+    )
+    quiz_ids = list(await session.scalars(stmt))
+
+    connection = await session.connection()
+    raw = (await connection.get_raw_connection()).driver_connection
+    assert raw is not None
+    await raw.copy_records_to_table(
+        Quiz.__tablename__,
+        columns=[
+            "id",
+            "question",
+            "correct_order",
+            "explanation",
+            "user_id",
+            "channel_id",
+        ],
+        records=[
+            (quiz_id, q.question, q.correct_order, q.explanation, user_id, channel_id)
+            for quiz_id, q in zip(quiz_ids, quizzes, strict=True)
+        ],
+    )
+    await raw.copy_records_to_table(
+        Option.__tablename__,
+        columns=["option", "order", "quiz_id"],
+        records=[
+            (opt, order, quiz_id)
+            for quiz_id, quiz in zip(quiz_ids, quizzes, strict=True)
+            for order, opt in enumerate(quiz.options)
+        ],
+    )
+
+
+async def write_batch(
+    session: AsyncSession, channel_id: int, user_id: int, quizzes: list[QuizRow]
+) -> None:
+    if session.get_bind().dialect.driver == "asyncpg":
+        await copy_batch(session, channel_id, user_id, quizzes)
+    else:
+        await insert_batch(session, channel_id, user_id, quizzes)
+
+
+async def import_quizzes(
+    session: AsyncSession,
+    stream: IO[str],
+    fmt: str,
+    channel_id: int,
+    user_id: int,
+    batch: int = IMPORT_BATCH,
+) -> ImportResult:
+    result = ImportResult()
+    pending: list[QuizRow] = []
+    # lookalikes are still imported, the admin only gets told about them;
+    # repeats within the file are caught by a hash of the normalized text,
+    # which keeps memory small however long the file is
+    existing = await question_indexes.get(session, channel_id)
+    earlier: dict[int, int] = {}
+    try:
+        for row, record in iter_records(stream, fmt):
+            try:
+                quiz = parse_quiz(record)
+            except ValueError as e:
+                result.reject(row, str(e))
+                continue
+
+            key = question_key(quiz.question)
+            if duplicate := existing.find(key):
+                quote = duplicate.question[:IMPORT_QUOTE_LENGTH]
+                result.flag(row, f'looks like "{quote}"')
+            elif (first := earlier.setdefault(hash(key.normalized), row)) != row:
+                result.flag(row, f"repeats row {first}")
+            pending.append(quiz)
+
+            if len(pending) >= batch:
+                await write_batch(session, channel_id, user_id, pending)
+                result.imported += len(pending)
+                pending = []
+    except UnicodeDecodeError:
+        raise ImportFileError("the file is not UTF-8 encoded") from None
+    except csv.Error as e:
+        raise ImportFileError(f"malformed CSV: {e}") from None
+
+    if pending:
+        await write_batch(session, channel_id, user_id, pending)
+        result.imported += len(pending)
+    return result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Import quizzes into a channel.")
+    parser.add_argument("file", type=Path, help="CSV, JSON or JSON lines file")
+    parser.add_argument("--channel-id", type=int, required=True)
+    parser.add_argument("--user-id", type=int, required=True, help="quiz author")
+    args = parser.parse_args()
+
+    try:
+        fmt = detect_format(args.file.name)
+        with open(args.file, encoding="utf-8-sig", newline="") as stream:
+            async with AsyncSessionLocal() as session:
+                result = await import_quizzes(
+                    session, stream, fmt, args.channel_id, args.user_id
+                )
+                await session.commit()
+        await reset_channel_deck(args.channel_id)
+    except ImportFileError as e:
+        raise SystemExit(str(e)) from None
+    finally:
+        await engine.dispose()
+
+    for error in result.errors:
+        print(f"row {error.row}: {error.message}")
+    for duplicate in result.duplicates:
+        print(f"row {duplicate.row}: {duplicate.message}")
+    print(
+        f"imported {result.imported} quizzes, rejected {result.failed} rows, "
+        f"{result.similar} look like other quizzes"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
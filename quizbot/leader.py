@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import uuid
+from collections.abc import Callable
+from typing import cast
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError, WatchError
+
+logger = logging.getLogger(__name__)
+
+
+def start_transaction(pipe: Pipeline) -> None:
+    # redis-py leaves Pipeline.multi unannotated
+    cast(Callable[[], None], pipe.multi)()
+
+
+class LeaderElection:
+    def __init__(self, redis: Redis, key: str, ttl: float) -> None:
+        self.redis = redis
+        self.key = key
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+        self.is_leader = False
+        self.elected = asyncio.Event()
+        self.lost = asyncio.Event()
+
+    async def acquire(self) -> bool:
+        return bool(
+            await self.redis.set(self.key, self.token, nx=True, px=int(self.ttl * 1000))
+        )
+
+    async def renew(self) -> bool:
+        async with self.redis.pipeline() as pipe:
+            try:
+                await pipe.watch(self.key)
+                if await pipe.get(self.key) != self.token:
+                    return False
+                start_transaction(pipe)
+                pipe.pexpire(self.key, int(self.ttl * 1000))
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    async def resign(self) -> None:
+        async with self.redis.pipeline() as pipe:
+            try:
+                await pipe.watch(self.key)
+                if await pipe.get(self.key) == self.token:
+                    start_transaction(pipe)
+                    pipe.delete(self.key)
+                    await pipe.execute()
+            except (WatchError, RedisError):
+                pass
+        self.set_leader(False)
+
+    def set_leader(self, leader: bool) -> None:
+        if leader == self.is_leader:
+            return
+
+        self.is_leader = leader
+        if leader:
+            self.lost.clear()
+            self.elected.set()
+            logger.info("replica %s became the leader", self.token)
+        else:
+            self.elected.clear()
+            self.lost.set()
+            logger.info("replica %s is no longer the leader", self.token)
+
+    async def campaign(self) -> None:
+        while True:
+            try:
+                leader = await (self.renew() if self.is_leader else self.acquire())
+            except RedisError as e:
+                # without redis we can't prove the lock is still ours
+                logger.warning("leader election failed: %s", e)
+                leader = False
+            self.set_leader(leader)
+            await asyncio.sleep(self.ttl / 3)
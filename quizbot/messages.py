@@ -38,13 +38,44 @@ class Msg:
         "🔢 *Options*: \n{options}\n"
         "✅ *Correct*: {correct}\n"
         "ℹ️ *Explanation*: {explanation}\n\n"
+        "{duplicate}"
         "Do you want to approve this quiz\\?"
     )
+    DUPLICATE = (
+        "⚠️ *This looks like a quiz already in the channel* \\({similarity} alike\\):"
+        "\n{question}\n\n"
+    )
 
     SAVED = "🎉 Quiz saved\\!"
     REJECTED = "🗑️ Quiz creation rejected\\."
     CANCELED = "🚫 Quiz creation canceled\\."
     INVALID_RESPONSE = "❗Invalid response\\. Please use one of the provided buttons\\."
+    PROMPT_IMPORT_FILE = (
+        "📄 Send a *CSV*, *JSON* or *JSON lines* file with your quizzes\\.\n\n"
+        "CSV columns: `question`, `option1` … `option10`, `correct` "
+        "\\(number of the right option\\), `explanation`\\.\n"
+        "JSON objects: `question`, `options` \\(a list\\), `correct`, "
+        "`explanation`\\."
+    )
+    IMPORT_NOT_A_FILE = "❗ Please send the quizzes as a *file*\\."
+    IMPORT_TOO_LARGE = "❗ The file is too large\\. The limit is *20 MB*\\."
+    IMPORT_STARTED = "⏳ Importing\\.\\.\\."
+    IMPORT_FAILED = "❗ Couldn\\'t import the file: {error}"
+    IMPORT_DONE = "🎉 Imported *{imported}* quizzes\\."
+    IMPORT_REJECTED = "\n\n⚠️ Skipped *{failed}* rows:\n{errors}"
+    IMPORT_SIMILAR = (
+        "\n\n🔁 *{similar}* rows look like quizzes already in the channel or "
+        "earlier in the file:\n{rows}"
+    )
+    IMPORT_CANCELED = "🚫 Import canceled\\."
+    PROMPT_EXPORT_FORMAT = "📦 Choose the export format:"
+    EXPORT_EMPTY = "📭 This channel has no quizzes yet\\."
+    EXPORT_TOO_LARGE = (
+        "❗ The export is larger than Telegram allows \\(50 MB\\)\\. "
+        "Please use the command line exporter\\."
+    )
+    EXPORT_DONE = "📦 {count} quizzes from {channel}"
+    EXPORT_CANCELED = "🚫 Export canceled\\."
     PROMPT_SETTINGS_ACTION = "⚙️ Choose what to configure:"
     ENTER_TIME = "⏰ Enter time in *HH:MM* format:"
     ENTER_QUIZ_COUNT = "🔢 Enter number of quizzes to send:"
@@ -52,11 +83,43 @@ class Msg:
     CONFIRM_QUIZ_COUNT = "❓ Set quiz count to *{count}*?"
     INVALID_TIME_FORMAT = "❗ Invalid format\\. Use *HH:MM*"
     INVALID_QUIZ_COUNT = "❗ Please enter a *positive number*"
+    QUIZ_COUNT_IN_SCHEDULE = (
+        "🗓️ This channel posts on a schedule, which sets the number of quizzes "
+        "for each time\\. Change them with *Schedule*\\."
+    )
+    ENTER_SCHEDULE = (
+        "🗓️ Send one posting time per line, optionally followed by the number "
+        "of quizzes and the days:\n"
+        "`09:00 3 mon-fri`\n`13:00 3 weekdays`\n`20:00 5 sat,sun`\n\n"
+        "Days can be `daily`, `weekdays`, `weekends`, days like `mon` or ranges "
+        "like `mon-fri`\\. Without a number, *{count}* quizzes are sent\\."
+    )
+    CONFIRM_SCHEDULE = "❓ Post on this schedule?\n{slots}"
+    SCHEDULE_SLOT = "{time}: {count} quizzes, {days}"
+    INVALID_SCHEDULE = "❗ {error}"
+    REENTER_SCHEDULE = "🔁 Re\\-enter the schedule:"
+    ENTER_TIMEZONE = (
+        "🌍 Enter the channel's timezone, like `Europe/Berlin` or `UTC`\\. "
+        "Posting times are read in it\\. Now: *{timezone}*"
+    )
+    CONFIRM_TIMEZONE = "❓ Set timezone to *{timezone}*?"
+    INVALID_TIMEZONE = "❗ Unknown timezone\\. Use a name like `Europe/Berlin`"
+    REENTER_TIMEZONE = "🔁 Re\\-enter timezone:"
     REENTER_TIME = "🔁 Re\\-enter time:"
     REENTER_QUIZ_COUNT = "🔁 Re\\-enter quiz count:"
     REJECTED_SETTINGS = "🗑️ Settings rejected\\. Choose again:"
     SAVED_SETTINGS = "✅ Settings saved\\! Choose next action:"
     SETTINGS_CANCELED = "🚫 Changing settings canceled\\."
+    PROMPT_STATS_CHANNEL = "📊 Pick a channel to see its stats:"
+    STATS = (
+        "📊 *{channel}*\n\n"
+        "🧠 *Hardest quizzes*\n{hardest}\n\n"
+        "🗓️ *Last {days} days*\n{history}"
+    )
+    STATS_HARDEST = "{rate} of {voters} right: {question}"
+    STATS_DAY = "{day}: {posts} quizzes, {voters} answers, {rate} right"
+    STATS_NO_ANSWERS = "_Not enough answers yet_"
+    STATS_NO_POSTS = "_Nothing posted yet_"
 
 
 class Btn:
@@ -68,3 +131,7 @@ class Btn:
     REJECT = "🗑️ Rejected"
     TIME = "🕒 Time"
     QUIZZES = "📚 Quizzes"
+    SCHEDULE = "🗓️ Schedule"
+    TIMEZONE = "🌍 Timezone"
+    CSV = "📄 CSV"
+    JSONL = "🧾 JSON lines"
@@ -0,0 +1,224 @@
+import os
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextvars import ContextVar
+from typing import Any
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramConflictError,
+    TelegramEntityTooLarge,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+    TelegramServerError,
+    TelegramUnauthorizedError,
+)
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+from aiohttp import web
+from db import Histogram as DbHistogram
+from db import db_stats, engine, pool_status
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import (
+    CounterMetricFamily,
+    GaugeMetricFamily,
+    HistogramMetricFamily,
+)
+from prometheus_client.registry import Collector
+
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9090"))
+
+JOB_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 15, 30, 60, 300, 900, 1800, 3600)
+
+handler_seconds = Histogram(
+    "quizbot_handler_seconds", "Time spent in an update handler", ["handler"]
+)
+handler_errors = Counter(
+    "quizbot_handler_errors_total", "Handlers that raised", ["handler"]
+)
+fsm_transitions = Counter(
+    "quizbot_fsm_transitions_total", "FSM state changes", ["from_state", "to_state"]
+)
+job_lag_seconds = Histogram(
+    "quizbot_job_lag_seconds",
+    "Delay between a job's scheduled time and its submission",
+    ["job"],
+    buckets=JOB_BUCKETS,
+)
+job_wait_seconds = Histogram(
+    "quizbot_job_wait_seconds",
+    "Time a channel job waited for a free slot",
+    buckets=JOB_BUCKETS,
+)
+job_seconds = Histogram(
+    "quizbot_job_seconds",
+    "Time spent sending a channel's quizzes",
+    buckets=JOB_BUCKETS,
+)
+api_seconds = Histogram(
+    "quizbot_api_seconds", "Telegram Bot API call latency", ["method"]
+)
+api_errors = Counter(
+    "quizbot_api_errors_total", "Failed Telegram Bot API calls", ["method", "code"]
+)
+
+API_ERROR_CODES: list[tuple[type[Exception], str]] = [
+    (TelegramRetryAfter, "429"),
+    (TelegramBadRequest, "400"),
+    (TelegramUnauthorizedError, "401"),
+    (TelegramForbiddenError, "403"),
+    (TelegramNotFound, "404"),
+    (TelegramConflictError, "409"),
+    (TelegramEntityTooLarge, "413"),
+    (TelegramServerError, "5xx"),
+    (TelegramNetworkError, "network"),
+]
+
+# the state an update started in, so a transition needs no extra redis read
+current_state: ContextVar[str | None] = ContextVar("current_state", default=None)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        name = data["handler"].callback.__name__
+        current_state.set(data.get("raw_state"))
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            handler_errors.labels(name).inc()
+            raise
+        finally:
+            handler_seconds.labels(name).observe(time.perf_counter() - started)
+
+
+class MeteredRedisStorage(RedisStorage):
+    async def set_state(
+        self, key: StorageKey, state: str | State | None = None
+    ) -> None:
+        await super().set_state(key, state)
+        new_state = state.state if isinstance(state, State) else state
+        old_state = current_state.get()
+        if new_state != old_state:
+            fsm_transitions.labels(old_state or "none", new_state or "none").inc()
+            current_state.set(new_state)
+
+
+class RequestMetricsMiddleware(BaseRequestMiddleware):
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            code = next(
+                (code for error, code in API_ERROR_CODES if isinstance(e, error)),
+                "other",
+            )
+            api_errors.labels(name, code).inc()
+            raise
+        finally:
+            api_seconds.labels(name).observe(time.perf_counter() - started)
+
+
+def histogram_buckets(histogram: DbHistogram) -> list[tuple[str, float]]:
+    buckets = []
+    seen = 0
+    for bound, count in zip(histogram.buckets, histogram.counts, strict=False):
+        seen += count
+        buckets.append((str(bound), seen))
+    buckets.append(("+Inf", histogram.count))
+    return buckets
+
+
+class DbCollector(Collector):
+    def collect(self) -> Iterator[Any]:
+        wait = db_stats.checkout_wait
+        checkout = HistogramMetricFamily(
+            "quizbot_db_checkout_seconds", "Time to get a pooled connection"
+        )
+        checkout.add_metric([], histogram_buckets(wait), wait.total)
+        yield checkout
+
+        queries = HistogramMetricFamily(
+            "quizbot_db_query_seconds", "SQL statement latency", labels=["verb"]
+        )
+        for verb, histogram in db_stats.queries.items():
+            queries.add_metric([verb], histogram_buckets(histogram), histogram.total)
+        yield queries
+
+        redis = db_stats.redis_round_trips
+        round_trips = HistogramMetricFamily(
+            "quizbot_redis_round_trip_seconds", "Redis command or pipeline latency"
+        )
+        round_trips.add_metric([], histogram_buckets(redis), redis.total)
+        yield round_trips
+
+        yield CounterMetricFamily(
+            "quizbot_db_checkout_timeouts",
+            "Checkouts that timed out",
+            db_stats.checkout_timeouts,
+        )
+        yield CounterMetricFamily(
+            "quizbot_db_errors", "SQL statements that failed", db_stats.errors
+        )
+        connections = GaugeMetricFamily(
+            "quizbot_db_connections", "Pooled connections", labels=["state"]
+        )
+        for state, count in pool_status(engine).items():
+            connections.add_metric([state], count)
+        yield connections
+
+
+REGISTRY.register(DbCollector())
+
+
+def instrument_dispatcher(dispatcher: Dispatcher) -> None:
+    # inner middlewares on the dispatcher apply to every nested router
+    middleware = HandlerMetricsMiddleware()
+    for name, observer in dispatcher.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(middleware)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        body=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST}
+    )
+
+
+async def start_metrics_server() -> web.AppRunner:
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+    return runner
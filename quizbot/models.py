@@ -1,14 +1,18 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from sqlalchemy import (
     BigInteger,
+    Date,
     DateTime,
+    Float,
     ForeignKey,
+    Index,
     Integer,
     SmallInteger,
     String,
     UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -48,6 +52,9 @@ class User(Base, TimeStamped):
 
 class Channel(Base, TimeStamped):
     __tablename__ = "channels"
+    __table_args__ = (
+        Index("ix_channels_active", "id", postgresql_where=text("active")),
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
     title: Mapped[str] = mapped_column(String(255))
@@ -66,9 +73,12 @@ class Channel(Base, TimeStamped):
 
 class Admin(Base, TimeStamped):
     __tablename__ = "admins"
-    __table_args__ = (UniqueConstraint("user_id", "channel_id"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "channel_id"),
+        Index("ix_admins_channel_id", "channel_id"),
+    )
 
-    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     channel_id: Mapped[int] = mapped_column(
         ForeignKey("channels.id", ondelete="CASCADE")
@@ -83,6 +93,7 @@ class Admin(Base, TimeStamped):
 
 class Quiz(Base, TimeStamped):
     __tablename__ = "quizzes"
+    __table_args__ = (Index("ix_quizzes_channel_id_id", "channel_id", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     question: Mapped[str] = mapped_column(String(300))
@@ -94,7 +105,7 @@ class Quiz(Base, TimeStamped):
     user: Mapped["User"] = relationship(back_populates="quizzes")
     channel: Mapped["Channel"] = relationship(back_populates="quizzes")
     options: Mapped[list["Option"]] = relationship(
-        back_populates="quiz", cascade="all, delete-orphan"
+        back_populates="quiz", cascade="all, delete-orphan", order_by="Option.order"
     )
 
     def __repr__(self) -> str:
@@ -120,3 +131,79 @@ class Option(Base, TimeStamped):
             f"Option(id={self.id!r}, option={self.option!r}, "
             f"order={self.order!r}, quiz_id={self.quiz_id!r})"
         )
+
+
+class PollPost(Base, TimeStamped):
+    __tablename__ = "poll_posts"
+    __table_args__ = (
+        Index("ix_poll_posts_quiz_id", "quiz_id"),
+        Index("ix_poll_posts_channel_id", "channel_id"),
+        Index(
+            "ix_poll_posts_unrolled",
+            "poll_id",
+            postgresql_where=text("rolled_voters IS DISTINCT FROM total_voters"),
+        ),
+    )
+
+    poll_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    message_id: Mapped[int] = mapped_column(BigInteger)
+    channel_id: Mapped[int] = mapped_column(
+        ForeignKey("channels.id", ondelete="CASCADE")
+    )
+    quiz_id: Mapped[int] = mapped_column(ForeignKey("quizzes.id", ondelete="CASCADE"))
+    total_voters: Mapped[int] = mapped_column(Integer, server_default="0")
+    correct_voters: Mapped[int] = mapped_column(Integer, server_default="0")
+    # the counts already added to the rollups, null until the post is counted
+    rolled_voters: Mapped[int | None] = mapped_column(Integer)
+    rolled_correct: Mapped[int | None] = mapped_column(Integer)
+
+    def __repr__(self) -> str:
+        return (
+            f"PollPost(poll_id={self.poll_id!r}, quiz_id={self.quiz_id!r}, "
+            f"total_voters={self.total_voters!r}, "
+            f"correct_voters={self.correct_voters!r})"
+        )
+
+
+class QuizStat(Base, TimeStamped):
+    __tablename__ = "quiz_stats"
+    __table_args__ = (
+        Index("ix_quiz_stats_channel_id_correct_rate", "channel_id", "correct_rate"),
+    )
+
+    quiz_id: Mapped[int] = mapped_column(
+        ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True
+    )
+    channel_id: Mapped[int] = mapped_column(
+        ForeignKey("channels.id", ondelete="CASCADE")
+    )
+    posts: Mapped[int] = mapped_column(Integer)
+    voters: Mapped[int] = mapped_column(Integer)
+    correct: Mapped[int] = mapped_column(Integer)
+    # null until enough people answered for the rate to mean anything
+    correct_rate: Mapped[float | None] = mapped_column(Float)
+    last_posted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+    def __repr__(self) -> str:
+        return (
+            f"QuizStat(quiz_id={self.quiz_id!r}, posts={self.posts!r}, "
+            f"voters={self.voters!r}, correct={self.correct!r})"
+        )
+
+
+class ChannelDayStat(Base, TimeStamped):
+    __tablename__ = "channel_day_stats"
+
+    channel_id: Mapped[int] = mapped_column(
+        ForeignKey("channels.id", ondelete="CASCADE"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    posts: Mapped[int] = mapped_column(Integer)
+    voters: Mapped[int] = mapped_column(Integer)
+    correct: Mapped[int] = mapped_column(Integer)
+
+    def __repr__(self) -> str:
+        return (
+            f"ChannelDayStat(channel_id={self.channel_id!r}, day={self.day!r}, "
+            f"posts={self.posts!r}, voters={self.voters!r})"
+        )
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from sqlalchemy.orm import DeclarativeBase
 
@@ -76,3 +76,57 @@ class Option(Base, TimeStamped):
 
     def __init__(self, id: int, option: str, order: int, quiz_id: int) -> None: ...
     def __repr__(self) -> str: ...
+
+class PollPost(Base, TimeStamped):
+    poll_id: str
+    message_id: int
+    channel_id: int
+    quiz_id: int
+    total_voters: int
+    correct_voters: int
+    rolled_voters: int | None
+    rolled_correct: int | None
+
+    def __init__(
+        self,
+        poll_id: str,
+        message_id: int,
+        channel_id: int,
+        quiz_id: int,
+        total_voters: int = ...,
+        correct_voters: int = ...,
+    ) -> None: ...
+    def __repr__(self) -> str: ...
+
+class QuizStat(Base, TimeStamped):
+    quiz_id: int
+    channel_id: int
+    posts: int
+    voters: int
+    correct: int
+    correct_rate: float | None
+    last_posted_at: datetime
+
+    def __init__(
+        self,
+        quiz_id: int,
+        channel_id: int,
+        posts: int,
+        voters: int,
+        correct: int,
+        correct_rate: float | None,
+        last_posted_at: datetime,
+    ) -> None: ...
+    def __repr__(self) -> str: ...
+
+class ChannelDayStat(Base, TimeStamped):
+    channel_id: int
+    day: date
+    posts: int
+    voters: int
+    correct: int
+
+    def __init__(
+        self, channel_id: int, day: date, posts: int, voters: int, correct: int
+    ) -> None: ...
+    def __repr__(self) -> str: ...
@@ -0,0 +1,136 @@
+import asyncio
+import contextlib
+import logging
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from aiogram.types import Message, Poll
+from constants import ANSWER_FLUSH_BATCH, ANSWER_FLUSH_INTERVAL
+from db import AsyncSessionLocal
+from models import PollPost, Quiz
+from sqlalchemy import Integer, String, column, func, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+async def record_poll_posts(
+    session: AsyncSession, channel_id: int, posts: Sequence[tuple[Quiz, Message]]
+) -> None:
+    rows = [
+        {
+            "poll_id": message.poll.id,
+            "message_id": message.message_id,
+            "channel_id": channel_id,
+            "quiz_id": quiz.id,
+        }
+        for quiz, message in posts
+        if message.poll
+    ]
+    if rows:
+        await session.execute(insert(PollPost).on_conflict_do_nothing(), rows)
+
+
+async def write_poll_tallies(
+    session: AsyncSession, tallies: dict[str, tuple[int, int]]
+) -> None:
+    # a poll update carries running totals, so an older one arriving late
+    # must not overwrite a newer count
+    tally = values(
+        column("poll_id", String),
+        column("total", Integer),
+        column("correct", Integer),
+        name="tally",
+    ).data([(poll_id, *counts) for poll_id, counts in tallies.items()])
+    await session.execute(
+        update(PollPost)
+        .where(PollPost.poll_id == tally.c.poll_id)
+        .where(PollPost.total_voters < tally.c.total)
+        .values(
+            total_voters=tally.c.total,
+            correct_voters=tally.c.correct,
+            updated_at=func.now(),
+        )
+    )
+
+
+@dataclass
+class AnswerStats:
+    updates: int = 0
+    flushes: int = 0
+    rows: int = 0
+    failed: int = 0
+
+
+class AnswerBuffer:
+    def __init__(
+        self, interval: float = ANSWER_FLUSH_INTERVAL, batch: int = ANSWER_FLUSH_BATCH
+    ) -> None:
+        self.interval = interval
+        self.batch = batch
+        self.pending: dict[str, tuple[int, int]] = {}
+        self.full = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task: asyncio.Task[None] | None = None
+        self.stats = AnswerStats()
+
+    def add(self, poll: Poll) -> None:
+        if poll.correct_option_id is None:
+            return
+
+        counts = (
+            poll.total_voter_count,
+            poll.options[poll.correct_option_id].voter_count,
+        )
+        self.merge({poll.id: counts})
+        self.stats.updates += 1
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        if len(self.pending) >= self.batch:
+            self.full.set()
+
+    def merge(self, tallies: dict[str, tuple[int, int]]) -> None:
+        for poll_id, counts in tallies.items():
+            old = self.pending.get(poll_id)
+            if old is None or counts[0] >= old[0]:
+                self.pending[poll_id] = counts
+
+    async def run(self) -> None:
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self.full.wait(), self.interval)
+            self.full.clear()
+            # stop() cancels this loop; a write already under way finishes
+            # on its own and stop's last flush waits for it on the lock
+            await asyncio.shield(self.flush())
+
+    async def flush(self) -> None:
+        async with self.lock:
+            tallies, self.pending = self.pending, {}
+            if not tallies:
+                return
+
+            try:
+                async with AsyncSessionLocal() as session:
+                    await write_poll_tallies(session, tallies)
+                    await session.commit()
+            except Exception:
+                # keep the counts for the next flush unless newer ones came in
+                logger.exception("failed to write %s poll tallies", len(tallies))
+                self.stats.failed += 1
+                self.merge(tallies)
+                return
+            self.stats.flushes += 1
+            self.stats.rows += len(tallies)
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+        await self.flush()
+
+
+answer_buffer = AnswerBuffer()
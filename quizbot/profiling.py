@@ -0,0 +1,241 @@
+import cProfile
+import logging
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+from constants import PROFILE_CHAT_KEY, PROFILE_CHAT_POLL, TRACE_NAME_LENGTH
+from db import io_listeners, redis
+
+try:
+    from pyinstrument import Profiler
+
+    HAS_PYINSTRUMENT = True
+except ImportError:
+    HAS_PYINSTRUMENT = False
+
+logger = logging.getLogger(__name__)
+
+PROFILING = os.getenv("PROFILING", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.01"))
+SLOW_UPDATE_SECONDS = float(os.getenv("SLOW_UPDATE_SECONDS", "1"))
+PROFILE_DIR = Path(
+    os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "quizbot-profiles"))
+)
+
+
+@dataclass
+class Span:
+    kind: str
+    name: str
+    started: float
+    elapsed: float = 0
+    children: list["Span"] = field(default_factory=list)
+
+    def lines(self, origin: float, depth: int = 0) -> list[str]:
+        offset = (self.started - origin) * 1000
+        name = " ".join(self.name.split())[:TRACE_NAME_LENGTH]
+        elapsed = self.elapsed * 1000
+        line = f"{'  ' * depth}+{offset:.1f}ms {self.kind} {name} {elapsed:.1f}ms"
+        return [
+            line,
+            *(
+                line
+                for child in self.children
+                for line in child.lines(origin, depth + 1)
+            ),
+        ]
+
+
+class Trace:
+    def __init__(self, update_id: int, sampled: bool) -> None:
+        self.sampled = sampled
+        self.handler = ""
+        self.root = Span("update", str(update_id), time.perf_counter())
+        self.stack = [self.root]
+        self.totals: defaultdict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+
+    def push(self, kind: str, name: str) -> Span:
+        span = Span(kind, name, time.perf_counter())
+        self.stack[-1].children.append(span)
+        self.stack.append(span)
+        return span
+
+    def pop(self, span: Span) -> None:
+        span.elapsed = time.perf_counter() - span.started
+        if span in self.stack:
+            self.stack.remove(span)
+
+    def record(self, kind: str, name: str, started: float, elapsed: float) -> None:
+        # every update keeps per-kind totals, only sampled ones keep each call
+        total = self.totals[kind]
+        total[0] += 1
+        total[1] += elapsed
+        if self.sampled:
+            self.stack[-1].children.append(Span(kind, name, started, elapsed))
+
+    def finish(self) -> None:
+        self.root.elapsed = time.perf_counter() - self.root.started
+
+    def report(self) -> str:
+        elapsed = self.root.elapsed
+        parts = [
+            f"{kind} {count}x {seconds * 1000:.1f}ms"
+            for kind, (count, seconds) in sorted(self.totals.items())
+        ]
+        io = sum(seconds for _, seconds in self.totals.values())
+        parts.append(f"other {(elapsed - io) * 1000:.1f}ms")
+        text = (
+            f"update {self.root.name} ({self.handler or 'unhandled'}) "
+            f"{elapsed * 1000:.1f}ms: {', '.join(parts)}"
+        )
+        if self.sampled:
+            text += "\n" + "\n".join(self.root.lines(self.root.started))
+        return text
+
+
+current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+
+def record_io(kind: str, name: str, started: float, elapsed: float) -> None:
+    trace = current_trace.get()
+    if trace:
+        trace.record(kind, name, started, elapsed)
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    def __init__(self, sample_rate: float, slow: float) -> None:
+        self.sample_rate = sample_rate
+        self.slow = slow
+        self.chat_id: int | None = None
+        self.chat_checked = 0.0
+
+    async def profiled_chat(self) -> int | None:
+        # set on demand with: SET quizbot:profile_chat <chat id> EX 600
+        now = time.monotonic()
+        if now - self.chat_checked >= PROFILE_CHAT_POLL:
+            self.chat_checked = now
+            value = await redis.get(PROFILE_CHAT_KEY)
+            self.chat_id = int(value) if value else None
+        return self.chat_id
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        assert isinstance(event, Update)
+        chat = data.get("event_chat")
+        profiled = chat is not None and chat.id == await self.profiled_chat()
+        trace = Trace(event.update_id, profiled or random.random() < self.sample_rate)
+        token = current_trace.set(trace)
+        try:
+            if profiled:
+                return await self.profile(handler, event, data)
+            return await handler(event, data)
+        finally:
+            current_trace.reset(token)
+            trace.finish()
+            if trace.root.elapsed >= self.slow:
+                logger.warning("slow %s", trace.report())
+            elif trace.sampled:
+                logger.info("trace %s", trace.report())
+
+    async def profile(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILE_DIR / f"{data['event_chat'].id}_{event.update_id}"
+        if HAS_PYINSTRUMENT:
+            # pyinstrument follows the update's task only
+            profiler = Profiler(async_mode="strict")
+            profiler.start()
+            try:
+                return await handler(event, data)
+            finally:
+                profiler.stop()
+                path = path.with_suffix(".html")
+                path.write_text(profiler.output_html())
+                logger.info("profile of update %s in %s", event.update_id, path)
+
+        # cProfile sees every task running meanwhile, not just this update
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return await handler(event, data)
+        finally:
+            profile.disable()
+            path = path.with_suffix(".prof")
+            profile.dump_stats(path)
+            logger.info("profile of update %s in %s", event.update_id, path)
+
+
+class HandlerSpanMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        trace = current_trace.get()
+        if not trace:
+            return await handler(event, data)
+
+        trace.handler = data["handler"].callback.__name__
+        span = trace.push("handler", trace.handler)
+        try:
+            return await handler(event, data)
+        finally:
+            trace.pop(span)
+
+
+class ApiSpanMiddleware(BaseRequestMiddleware):
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            record_io(
+                "api", method.__api_method__, started, time.perf_counter() - started
+            )
+
+
+def setup_profiling(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    sample_rate: float = PROFILE_SAMPLE_RATE,
+    slow: float = SLOW_UPDATE_SECONDS,
+) -> None:
+    # the FSM context is resolved by an earlier outer middleware, so its
+    # redis reads happen before the trace starts
+    dispatcher.update.outer_middleware(ProfilingMiddleware(sample_rate, slow))
+    middleware = HandlerSpanMiddleware()
+    for name, observer in dispatcher.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(middleware)
+    bot.session.middleware(ApiSpanMiddleware())
+    io_listeners.append(record_io)
@@ -0,0 +1,85 @@
+import logging
+from dataclasses import dataclass
+
+from admins import fetch_chat_admins, reconcile_admins
+from aiogram.types import User as TUser
+from bot import bot
+from cache import user_channels
+from constants import (
+    RECONCILE_CURSOR_KEY,
+    RECONCILE_PAGE,
+    RECONCILE_RATE,
+    RECONCILE_RETRIES,
+)
+from db import AsyncSessionLocal, redis
+from models import Channel
+from sender import TokenBucket
+from sqlalchemy import select
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReconcileStats:
+    pages: int = 0
+    passes: int = 0
+    channels: int = 0
+    unavailable: int = 0
+    added: int = 0
+    removed: int = 0
+
+
+stats = ReconcileStats()
+
+
+async def next_channel_page(after: int | None, size: int) -> list[int]:
+    stmt = select(Channel.id).where(Channel.active).order_by(Channel.id).limit(size)
+    if after is not None:
+        stmt = stmt.where(Channel.id > after)
+    async with AsyncSessionLocal() as session:
+        return list((await session.scalars(stmt)).all())
+
+
+async def reconcile_page(
+    size: int = RECONCILE_PAGE, rate: float = RECONCILE_RATE
+) -> bool:
+    # admins only change through chat_member updates, which are lost while
+    # the bot is down, so a slow pass re-reads every channel's admin list and
+    # keeps its place in redis between pages and restarts
+    cursor = await redis.get(RECONCILE_CURSOR_KEY)
+    channel_ids = await next_channel_page(int(cursor) if cursor else None, size)
+
+    bucket = TokenBucket(rate, 1)
+    admins: dict[int, list[TUser]] = {}
+    for channel_id in channel_ids:
+        await bucket.acquire()
+        users = await fetch_chat_admins(bot, channel_id, retries=RECONCILE_RETRIES)
+        if users is None:
+            stats.unavailable += 1
+            continue
+        admins[channel_id] = users
+
+    async with AsyncSessionLocal() as session:
+        added, removed = await reconcile_admins(session, admins)
+        await session.commit()
+    await user_channels.invalidate(added + removed)
+
+    stats.pages += 1
+    stats.channels += len(channel_ids)
+    stats.added += len(added)
+    stats.removed += len(removed)
+    if added or removed:
+        logger.info(
+            "reconciler: %s admins added, %s removed in %s channels",
+            len(added),
+            len(removed),
+            len(channel_ids),
+        )
+
+    if len(channel_ids) < size:
+        await redis.delete(RECONCILE_CURSOR_KEY)
+        stats.passes += 1
+        logger.info("reconciler: pass finished, %s", stats)
+        return True
+    await redis.set(RECONCILE_CURSOR_KEY, channel_ids[-1])
+    return False
@@ -0,0 +1,216 @@
+import logging
+from collections import defaultdict
+from collections.abc import Collection, Sequence
+from dataclasses import dataclass
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from constants import (
+    STATS_BATCH,
+    STATS_DAYS,
+    STATS_HARDEST,
+    STATS_MIN_VOTERS,
+    TIMEZONE,
+)
+from db import AsyncSessionLocal, redis
+from models import ChannelDayStat, PollPost, Quiz, QuizStat
+from sqlalchemy import Float, Row, case, cast, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Tally:
+    posts: int = 0
+    voters: int = 0
+    correct: int = 0
+
+
+def correct_rate(voters: int, correct: int) -> float | None:
+    return correct / voters if voters >= STATS_MIN_VOTERS else None
+
+
+async def upsert_quiz_stats(
+    session: AsyncSession,
+    tallies: dict[int, Tally],
+    channels: dict[int, int],
+    posted: dict[int, datetime],
+) -> None:
+    # a Core insert on the table runs as one executemany, the ORM bulk path
+    # compiled the upsert again for every row
+    stmt = insert(QuizStat.__table__)
+    voters = QuizStat.voters + stmt.excluded.voters
+    correct = QuizStat.correct + stmt.excluded.correct
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[QuizStat.quiz_id],
+            set_={
+                "posts": QuizStat.posts + stmt.excluded.posts,
+                "voters": voters,
+                "correct": correct,
+                "correct_rate": case(
+                    (voters >= STATS_MIN_VOTERS, cast(correct, Float) / voters)
+                ),
+                "last_posted_at": func.greatest(
+                    QuizStat.last_posted_at, stmt.excluded.last_posted_at
+                ),
+                "updated_at": func.now(),
+            },
+        ),
+        [
+            {
+                "quiz_id": quiz_id,
+                "channel_id": channels[quiz_id],
+                "posts": tally.posts,
+                "voters": tally.voters,
+                "correct": tally.correct,
+                "correct_rate": correct_rate(tally.voters, tally.correct),
+                "last_posted_at": posted[quiz_id],
+            }
+            for quiz_id, tally in tallies.items()
+        ],
+    )
+
+
+async def upsert_day_stats(
+    session: AsyncSession, tallies: dict[tuple[int, date], Tally]
+) -> None:
+    stmt = insert(ChannelDayStat.__table__)
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ChannelDayStat.channel_id, ChannelDayStat.day],
+            set_={
+                "posts": ChannelDayStat.posts + stmt.excluded.posts,
+                "voters": ChannelDayStat.voters + stmt.excluded.voters,
+                "correct": ChannelDayStat.correct + stmt.excluded.correct,
+                "updated_at": func.now(),
+            },
+        ),
+        [
+            {
+                "channel_id": channel_id,
+                "day": day,
+                "posts": tally.posts,
+                "voters": tally.voters,
+                "correct": tally.correct,
+            }
+            for (channel_id, day), tally in tallies.items()
+        ],
+    )
+
+
+async def channel_zones(channel_ids: Collection[int]) -> dict[int, ZoneInfo]:
+    # a channel's days follow the timezone its posts are scheduled in
+    async with redis.pipeline(transaction=False) as pipe:
+        for channel_id in channel_ids:
+            pipe.hget(channel_id, "timezone")
+        names = await pipe.execute()
+    return {
+        channel_id: ZoneInfo(name or TIMEZONE)
+        for channel_id, name in zip(channel_ids, names, strict=True)
+    }
+
+
+async def roll_up_batch(session: AsyncSession, size: int, after: str = "") -> list[str]:
+    # the rows stay locked until commit, so answer flushes wait instead of
+    # changing counts between reading and marking them; walking the partial
+    # index in poll_id order keeps each batch from rescanning counted posts
+    stmt = (
+        select(
+            PollPost.poll_id,
+            PollPost.quiz_id,
+            PollPost.channel_id,
+            PollPost.created_at,
+            PollPost.total_voters,
+            PollPost.correct_voters,
+            PollPost.rolled_voters,
+            PollPost.rolled_correct,
+        )
+        .where(
+            PollPost.rolled_voters.is_distinct_from(PollPost.total_voters),
+            PollPost.poll_id > after,
+        )
+        .order_by(PollPost.poll_id)
+        .limit(size)
+        .with_for_update(skip_locked=True)
+    )
+    posts = (await session.execute(stmt)).all()
+    if not posts:
+        return []
+
+    zones = await channel_zones(list({post.channel_id for post in posts}))
+    quizzes: defaultdict[int, Tally] = defaultdict(Tally)
+    days: defaultdict[tuple[int, date], Tally] = defaultdict(Tally)
+    channels: dict[int, int] = {}
+    posted: dict[int, datetime] = {}
+    for post in posts:
+        # only what changed since the post was last counted is added
+        new = post.rolled_voters is None
+        voters = post.total_voters - (post.rolled_voters or 0)
+        correct = post.correct_voters - (post.rolled_correct or 0)
+        day = post.created_at.astimezone(zones[post.channel_id]).date()
+        for tally in (quizzes[post.quiz_id], days[post.channel_id, day]):
+            tally.posts += new
+            tally.voters += voters
+            tally.correct += correct
+        channels[post.quiz_id] = post.channel_id
+        posted[post.quiz_id] = max(
+            posted.get(post.quiz_id, post.created_at), post.created_at
+        )
+
+    await upsert_quiz_stats(session, quizzes, channels, posted)
+    await upsert_day_stats(session, days)
+    poll_ids = [post.poll_id for post in posts]
+    await session.execute(
+        update(PollPost)
+        .where(PollPost.poll_id.in_(poll_ids))
+        .values(
+            rolled_voters=PollPost.total_voters,
+            rolled_correct=PollPost.correct_voters,
+        )
+    )
+    return poll_ids
+
+
+async def aggregate_stats(size: int = STATS_BATCH) -> int:
+    rolled = 0
+    after = ""
+    while True:
+        async with AsyncSessionLocal() as session:
+            poll_ids = await roll_up_batch(session, size, after)
+            await session.commit()
+        rolled += len(poll_ids)
+        if len(poll_ids) < size:
+            break
+        after = poll_ids[-1]
+
+    if rolled:
+        logger.info("stats: rolled up %s poll posts", rolled)
+    return rolled
+
+
+async def hardest_quizzes(
+    session: AsyncSession, channel_id: int, n: int = STATS_HARDEST
+) -> Sequence[Row[tuple[str, float, int]]]:
+    stmt = (
+        select(Quiz.question, QuizStat.correct_rate, QuizStat.voters)
+        .join(Quiz, Quiz.id == QuizStat.quiz_id)
+        .where(QuizStat.channel_id == channel_id, QuizStat.correct_rate.is_not(None))
+        .order_by(QuizStat.correct_rate)
+        .limit(n)
+    )
+    return (await session.execute(stmt)).all()
+
+
+async def posting_history(
+    session: AsyncSession, channel_id: int, n: int = STATS_DAYS
+) -> Sequence[ChannelDayStat]:
+    stmt = (
+        select(ChannelDayStat)
+        .where(ChannelDayStat.channel_id == channel_id)
+        .order_by(ChannelDayStat.day.desc())
+        .limit(n)
+    )
+    return (await session.scalars(stmt)).all()
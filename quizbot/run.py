@@ -1,20 +1,103 @@
 import asyncio
+import contextlib
+import logging
+import signal
 
-from bot import bot, set_command_menu
+from aiohttp import web
+from bot import bot, poll_sender, set_command_menu
+from constants import LEADER_KEY, LEADER_TTL
+from db import redis
 from dispatcher import dp
-from scheduler import scheduler, setup_scheduler
+from leader import LeaderElection
+from metrics import start_metrics_server
+from polls import answer_buffer
+from profiling import PROFILING, setup_profiling
+from scheduler import setup_scheduler, stop_scheduler
+from webhook import WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_URL, create_app, set_webhook
+
+election = LeaderElection(redis, LEADER_KEY, LEADER_TTL)
+if PROFILING:
+    setup_profiling(dp, bot)
 
 
 async def on_start() -> None:
     await set_command_menu()
     await setup_scheduler()
-    scheduler.start()
     print("bot has been started....")
 
 
-async def main() -> None:
+async def on_shutdown() -> None:
+    stop_scheduler()
+    await poll_sender.stop()
+    await answer_buffer.stop()
+
+
+async def until(*events: asyncio.Event) -> None:
+    waiters = [asyncio.create_task(event.wait()) for event in events]
+    await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+    for waiter in waiters:
+        waiter.cancel()
+
+
+async def run_polling(stopping: asyncio.Event) -> None:
     dp.startup.register(on_start)
-    await dp.start_polling(bot)
+
+    # getUpdates allows a single consumer, so only the leader polls and runs the
+    # scheduler; other replicas stay on standby until the leader lock expires
+    while True:
+        await until(election.elected, stopping)
+        if stopping.is_set():
+            break
+
+        polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+        watcher = asyncio.create_task(until(election.lost, stopping))
+        await asyncio.wait({polling, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        watcher.cancel()
+        polling.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await polling
+
+
+async def run_webhook(stopping: asyncio.Event) -> None:
+    runner = web.AppRunner(create_app(dp, bot))
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    print(f"bot is serving webhooks on {WEBHOOK_HOST}:{WEBHOOK_PORT}....")
+
+    # every replica takes webhook updates, only the leader runs the scheduler
+    while True:
+        await until(election.elected, stopping)
+        if stopping.is_set():
+            break
+
+        await set_command_menu()
+        await set_webhook(dp, bot)
+        await setup_scheduler()
+        await until(election.lost, stopping)
+        stop_scheduler()
+
+    await runner.cleanup()
+
+
+async def main() -> None:
+    dp.shutdown.register(on_shutdown)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    metrics = await start_metrics_server()
+    campaign = asyncio.create_task(election.campaign())
+
+    if WEBHOOK_URL:
+        await run_webhook(stopping)
+    else:
+        await run_polling(stopping)
+
+    campaign.cancel()
+    await election.resign()
+    await metrics.cleanup()
 
 
+logging.basicConfig(level=logging.INFO)
 asyncio.run(main())
@@ -1,45 +1,472 @@
-from collections.abc import Sequence
+import asyncio
+import logging
+import os
+import time
+import zlib
+from collections import defaultdict
+from collections.abc import AsyncIterator, Callable, Collection, Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, cast
+from zoneinfo import ZoneInfo
 
+from apscheduler.events import EVENT_JOB_SUBMITTED, JobSubmissionEvent
+from apscheduler.jobstores.redis import RedisJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from bot import send_channel_quizzes
-from constants import POST_TIME, QUIZ_COUNT, TIMEZONE
+from constants import (
+    COALESCE_MISSED_POSTS,
+    MAX_CHANNEL_JOBS,
+    MISFIRE_GRACE_TIME,
+    POST_SPREAD_MINUTES,
+    POST_TIME,
+    QUIZ_COUNT,
+    RECONCILE_INTERVAL,
+    RECONCILE_JOB_ID,
+    RECONCILE_PAGE,
+    SCHEDULE_REQUESTS_INTERVAL,
+    SCHEDULE_REQUESTS_KEY,
+    SETTINGS_BATCH,
+    STATS_INTERVAL,
+    STATS_JOB_ID,
+    TIMEZONE,
+)
 from db import AsyncSessionLocal, redis
+from leader import start_transaction
+from metrics import job_lag_seconds, job_seconds, job_wait_seconds
 from models import Channel
+from reconciler import reconcile_page
+from redis.connection import parse_url
+from redis.exceptions import WatchError
+from rollups import aggregate_stats
+from schedules import (
+    Slot,
+    counts_days,
+    cron_days,
+    dump_counts,
+    load_counts,
+    load_schedule,
+    parse_group_key,
+    parse_time,
+    plan_groups,
+)
 from sqlalchemy import select
 from type import ChannelSettings
 
-scheduler = AsyncIOScheduler()
+logger = logging.getLogger(__name__)
 
+# redis-py ships parse_url without annotations
+parse_redis_url = cast(Callable[[str], dict[str, Any]], parse_url)
 
-async def get_all_active_channels() -> Sequence[Channel]:
-    async with AsyncSessionLocal() as session:
-        stmt = select(Channel).where(Channel.active)
-        channels: Sequence[Channel] = (await session.scalars(stmt)).all()
-    return channels
+JOBS_KEY = "apscheduler.jobs"
+RUN_TIMES_KEY = "apscheduler.run_times"
+# channel id -> the groups it posts in, per group a hash of channel id ->
+# quiz count for each weekday, and "<group>/<weekday>" -> members posting
+# that day; each group is one job that fans out
+GROUPS_KEY = "post_groups"
+GROUP_KEY_PREFIX = "post_group:"
+GROUP_DAYS_KEY = "post_group_days"
+GROUP_JOB_PREFIX = "post:"
 
+jobstore = RedisJobStore(
+    jobs_key=JOBS_KEY,
+    run_times_key=RUN_TIMES_KEY,
+    **parse_redis_url(os.getenv("REDIS_URL", "")),
+)
+scheduler = AsyncIOScheduler(
+    jobstores={"default": jobstore},
+    job_defaults={
+        "misfire_grace_time": MISFIRE_GRACE_TIME,
+        "coalesce": COALESCE_MISSED_POSTS,
+    },
+)
+channel_jobs = asyncio.Semaphore(MAX_CHANNEL_JOBS)
+# group changes read a channel's counts before moving the per-day member
+# counters, so they run one at a time. Only the leader makes them (see
+# ScheduleRequests), so a lock within the process is enough
+group_updates = asyncio.Lock()
 
-async def schedule_channel(channel_id: int) -> None:
-    settings: ChannelSettings = await redis.hgetall(channel_id)
-    post_time = settings.get("time") if settings.get("time") else POST_TIME
-    quiz_count = (
-        int(settings.get("quiz_count")) if settings.get("quiz_count") else QUIZ_COUNT
+
+@dataclass
+class SmoothingStats:
+    spread_channels: set[int] = field(default_factory=set)
+    running: int = 0
+    waiting: int = 0
+    admitted: int = 0
+    total_wait: float = 0
+    max_wait: float = 0
+
+    def report(self) -> str:
+        avg_wait = self.total_wait / self.admitted if self.admitted else 0
+        spread = len(self.spread_channels)
+        return (
+            f"{spread} scheduled channels spread over {POST_SPREAD_MINUTES} min "
+            f"after {POST_TIME}, at most {MAX_CHANNEL_JOBS} jobs at once "
+            f"({self.running} running, {self.waiting} waiting, "
+            f"avg wait {avg_wait:.1f}s, max wait {self.max_wait:.1f}s)"
+        )
+
+
+smoothing = SmoothingStats()
+
+
+def post_offset(channel_id: int) -> int:
+    spread: int = POST_SPREAD_MINUTES
+    if not spread:
+        return 0
+    # whole minutes, so spread channels in a zone share a post group per minute
+    # instead of one each; the channel job semaphore smooths posts within it
+    return zlib.crc32(str(channel_id).encode()) % spread * 60
+
+
+def channel_slots(channel_id: int, settings: ChannelSettings) -> list[Slot]:
+    if schedule := settings.get("schedule"):
+        slots: list[Slot] = load_schedule(schedule)
+        return slots
+
+    # a single daily slot from the time and quiz count set before schedules
+    count = settings.get("quiz_count")
+    quiz_count = int(count) if count else QUIZ_COUNT
+    post_time = settings.get("time")
+    if post_time:
+        return [Slot(parse_time(post_time), quiz_count)]
+    return [Slot(parse_time(POST_TIME) + post_offset(channel_id), quiz_count)]
+
+
+async def run_channel_job(channel_id: int, quiz_count: int) -> None:
+    queued = time.monotonic()
+    smoothing.waiting += 1
+    async with channel_jobs:
+        wait = time.monotonic() - queued
+        smoothing.waiting -= 1
+        smoothing.running += 1
+        smoothing.admitted += 1
+        smoothing.total_wait += wait
+        smoothing.max_wait = max(smoothing.max_wait, wait)
+        job_wait_seconds.observe(wait)
+        started = time.monotonic()
+        try:
+            await send_channel_quizzes(channel_id, quiz_count)
+        finally:
+            smoothing.running -= 1
+            job_seconds.observe(time.monotonic() - started)
+
+
+async def run_post_group(key: str) -> None:
+    zone, at = parse_group_key(key)
+    # a late run still posts for the day it was scheduled on
+    day = (datetime.now(ZoneInfo(zone)) - timedelta(seconds=at)).weekday()
+    members = await redis.hgetall(GROUP_KEY_PREFIX + key)
+    posts = {int(cid): load_counts(counts)[day] for cid, counts in members.items()}
+    channel_ids = [channel_id for channel_id, count in posts.items() if count]
+    results = await asyncio.gather(
+        *(run_channel_job(channel_id, posts[channel_id]) for channel_id in channel_ids),
+        return_exceptions=True,
     )
+    for channel_id, result in zip(channel_ids, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.error("posting to %s failed", channel_id, exc_info=result)
+
+
+def observe_job_lag(event: JobSubmissionEvent) -> None:
+    scheduled = max(event.scheduled_run_times)
+    lag = datetime.now(scheduled.tzinfo) - scheduled
+    job = "post" if event.job_id.startswith(GROUP_JOB_PREFIX) else event.job_id
+    job_lag_seconds.labels(job).observe(lag.total_seconds())
+
+
+scheduler.add_listener(observe_job_lag, EVENT_JOB_SUBMITTED)
 
+
+async def iter_active_channel_ids(batch: int) -> AsyncIterator[Sequence[int]]:
+    stmt = select(Channel.id).where(Channel.active).execution_options(yield_per=batch)
+    async with AsyncSessionLocal() as session:
+        result = await session.stream_scalars(stmt)
+        async for channel_ids in result.partitions():
+            yield channel_ids
+
+
+async def get_channels_settings(
+    channel_ids: Sequence[int],
+) -> list[ChannelSettings]:
+    async with redis.pipeline(transaction=False) as pipe:
+        for channel_id in channel_ids:
+            pipe.hgetall(channel_id)
+        settings: list[ChannelSettings] = await pipe.execute()
+    return settings
+
+
+def remove_jobs(job_ids: Iterable[str]) -> None:
+    for job_id in job_ids:
+        if scheduler.get_job(job_id):
+            scheduler.remove_job(job_id)
+
+
+def plan_channel(channel_id: int, settings: ChannelSettings) -> dict[str, str]:
+    if not settings.get("schedule") and not settings.get("time"):
+        if post_offset(channel_id):
+            smoothing.spread_channels.add(channel_id)
+    else:
+        smoothing.spread_channels.discard(channel_id)
+
+    zone = settings.get("timezone") or TIMEZONE
+    groups = plan_groups(channel_slots(channel_id, settings), zone)
+    return {key: dump_counts(counts) for key, counts in groups.items()}
+
+
+async def group_days(keys: Collection[str]) -> dict[str, int]:
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.hmget(GROUP_DAYS_KEY, [f"{key}/{day}" for day in range(7)])
+        members: list[list[str | None]] = await pipe.execute()
+    return {
+        key: counts_days([int(count or 0) for count in counts])
+        for key, counts in zip(keys, members, strict=True)
+    }
+
+
+def update_group_job(key: str, days: int) -> None:
+    job_id = GROUP_JOB_PREFIX + key
+    if not days:
+        remove_jobs([job_id])
+        return
+
+    zone, at = parse_group_key(key)
+    hour, rest = divmod(at, 3600)
+    minute, second = divmod(rest, 60)
     scheduler.add_job(
-        send_channel_quizzes,
+        run_post_group,
         CronTrigger(
-            hour=post_time[0:2],
-            minute=post_time[3:5],
-            timezone=TIMEZONE,
+            day_of_week=cron_days(days),
+            hour=hour,
+            minute=minute,
+            second=second,
+            timezone=zone,
         ),
-        args=[channel_id, quiz_count],
-        id=str(channel_id),
+        args=[key],
+        id=job_id,
         replace_existing=True,
     )
 
 
+def update_group_jobs(days: dict[str, int]) -> None:
+    for key, mask in days.items():
+        update_group_job(key, mask)
+
+
+async def drop_empty_days(fields: list[str]) -> None:
+    # a leader that has not yet noticed it lost the lease may still be
+    # counting, so a field is only dropped if it is still empty under WATCH
+    async with redis.pipeline() as pipe:
+        while True:
+            try:
+                await pipe.watch(GROUP_DAYS_KEY)
+                counts = await pipe.hmget(GROUP_DAYS_KEY, fields)
+                empty = [
+                    field_name
+                    for field_name, count in zip(fields, counts, strict=True)
+                    if count is not None and int(count) <= 0
+                ]
+                if empty:
+                    start_transaction(pipe)
+                    pipe.hdel(GROUP_DAYS_KEY, *empty)
+                    await pipe.execute()
+                return
+            except WatchError:
+                continue
+
+
+async def update_groups(changes: dict[int, tuple[list[str], dict[str, str]]]) -> None:
+    # changes maps a channel to the groups it is in and the ones it should be
+    # in. A group's job runs on the weekdays any member posts on, kept as a
+    # member count per weekday so a change never reads the whole group; the
+    # job is only rewritten when a day gains its first member or loses its
+    # last, so moving a channel between busy groups writes no jobs at all
+    async with group_updates:
+        async with redis.pipeline(transaction=False) as pipe:
+            for channel_id, (current, _) in changes.items():
+                for key in current:
+                    pipe.hget(GROUP_KEY_PREFIX + key, channel_id)
+            previous = iter(await pipe.execute())
+
+        deltas: defaultdict[str, list[int]] = defaultdict(lambda: [0] * 7)
+        async with redis.pipeline(transaction=False) as pipe:
+            for channel_id, (current, planned) in changes.items():
+                for key in current:
+                    if counts := next(previous):
+                        for day, count in enumerate(load_counts(counts)):
+                            deltas[key][day] -= count > 0
+                for key in set(current) - planned.keys():
+                    pipe.hdel(GROUP_KEY_PREFIX + key, channel_id)
+                for key, counts in planned.items():
+                    pipe.hset(GROUP_KEY_PREFIX + key, channel_id, counts)
+                    for day, count in enumerate(load_counts(counts)):
+                        deltas[key][day] += count > 0
+                if planned:
+                    pipe.hset(GROUPS_KEY, channel_id, ",".join(planned))
+                else:
+                    pipe.hdel(GROUPS_KEY, channel_id)
+            await pipe.execute()
+
+        changed = [
+            (f"{key}/{day}", key, delta)
+            for key, days in deltas.items()
+            for day, delta in enumerate(days)
+            if delta
+        ]
+        if not changed:
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            for field_name, _, delta in changed:
+                pipe.hincrby(GROUP_DAYS_KEY, field_name, delta)
+            members = await pipe.execute()
+
+        flipped = set()
+        empty = []
+        for (field_name, key, delta), count in zip(changed, members, strict=True):
+            if count == delta or count <= 0:
+                flipped.add(key)
+            if count <= 0:
+                empty.append(field_name)
+        if empty:
+            await drop_empty_days(empty)
+        # the job store is a synchronous redis client, so its writes run in
+        # a thread rather than blocking the loop and the leader lease renewal
+        await asyncio.to_thread(update_group_jobs, await group_days(flipped))
+
+
+def channel_groups(value: str | None) -> list[str]:
+    return value.split(",") if value else []
+
+
+async def schedule_channel(channel_id: int) -> None:
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hgetall(channel_id)
+        pipe.hget(GROUPS_KEY, channel_id)
+        settings, current = await pipe.execute()
+    planned = plan_channel(channel_id, settings)
+    await update_groups({channel_id: (channel_groups(current), planned)})
+
+
+async def unschedule_channel(channel_id: int) -> None:
+    current = await redis.hget(GROUPS_KEY, channel_id)
+    await update_groups({channel_id: (channel_groups(current), {})})
+    smoothing.spread_channels.discard(channel_id)
+
+
+async def reschedule_channels(channel_ids: list[int]) -> None:
+    # the active flag decides, so repeated or reordered requests settle on
+    # the channel's latest state
+    async with AsyncSessionLocal() as session:
+        stmt = select(Channel.id).where(Channel.id.in_(channel_ids), Channel.active)
+        active = set(await session.scalars(stmt))
+    async with redis.pipeline(transaction=False) as pipe:
+        for channel_id in channel_ids:
+            pipe.hgetall(channel_id)
+            pipe.hget(GROUPS_KEY, channel_id)
+        results = await pipe.execute()
+
+    changes = {}
+    for channel_id, settings, current in zip(
+        channel_ids, results[::2], results[1::2], strict=True
+    ):
+        planned = {}
+        if channel_id in active:
+            planned = plan_channel(channel_id, settings)
+        else:
+            smoothing.spread_channels.discard(channel_id)
+        changes[channel_id] = (channel_groups(current), planned)
+    await update_groups(changes)
+
+
+class ScheduleRequests:
+    # any replica can take the update that changes a channel's schedule, but
+    # only the leader's scheduler runs and writes the job store; a stopped
+    # one only keeps jobs in memory. Changes queue up in redis instead and
+    # the leader applies them for as long as its scheduler runs
+    def __init__(self, key: str, interval: float) -> None:
+        self.key = key
+        self.interval = interval
+        self.task: asyncio.Task[None] | None = None
+
+    async def push(self, channel_id: int) -> None:
+        await redis.rpush(self.key, channel_id)
+
+    def start(self) -> None:
+        # the consumer of an earlier term keeps going if the scheduler was
+        # started again before it noticed the stop
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        while scheduler.running:
+            try:
+                while values := await redis.lpop(self.key, SETTINGS_BATCH):
+                    channel_ids = list(dict.fromkeys(map(int, values)))
+                    await reschedule_channels(channel_ids)
+            except Exception:
+                logger.exception("failed to apply schedule changes")
+            await asyncio.sleep(self.interval)
+
+
+schedule_requests = ScheduleRequests(SCHEDULE_REQUESTS_KEY, SCHEDULE_REQUESTS_INTERVAL)
+
+
+def stop_scheduler() -> None:
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+
+
 async def setup_scheduler() -> None:
-    channels = await get_all_active_channels()
-    for channel in channels:
-        await schedule_channel(channel.id)
+    # groups and their jobs persist in redis, so only channels activated or
+    # deactivated while the bot was down need their groups updated
+    scheduler.start(paused=True)
+    stale = {
+        int(channel_id): channel_groups(keys)
+        for channel_id, keys in (await redis.hgetall(GROUPS_KEY)).items()
+    }
+    added = 0
+
+    async for channel_ids in iter_active_channel_ids(SETTINGS_BATCH):
+        new_ids = [cid for cid in channel_ids if cid not in stale]
+        for channel_id in channel_ids:
+            stale.pop(channel_id, None)
+        if not new_ids:
+            continue
+
+        settings = await get_channels_settings(new_ids)
+        await update_groups(
+            {
+                channel_id: ([], plan_channel(channel_id, channel_settings))
+                for channel_id, channel_settings in zip(new_ids, settings, strict=True)
+            }
+        )
+        added += len(new_ids)
+
+    if stale:
+        await update_groups({cid: (keys, {}) for cid, keys in stale.items()})
+        smoothing.spread_channels.difference_update(stale)
+
+    scheduler.add_job(
+        reconcile_page,
+        IntervalTrigger(seconds=RECONCILE_INTERVAL),
+        id=RECONCILE_JOB_ID,
+        replace_existing=True,
+        max_instances=1,
+    )
+    scheduler.add_job(
+        aggregate_stats,
+        IntervalTrigger(seconds=STATS_INTERVAL),
+        id=STATS_JOB_ID,
+        replace_existing=True,
+        max_instances=1,
+    )
+    scheduler.resume()
+    schedule_requests.start()
+    logger.info("scheduler: %s channels scheduled, %s unscheduled", added, len(stale))
+    logger.info("post smoothing: %s", smoothing.report())
+    logger.info(
+        "admin reconciler: %s channels every %ss", RECONCILE_PAGE, RECONCILE_INTERVAL
+    )
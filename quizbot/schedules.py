@@ -0,0 +1,180 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from functools import cache
+from zoneinfo import ZoneInfo, available_timezones
+
+from constants import MAX_SCHEDULE_SLOTS
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+EVERY_DAY = 0b1111111
+DAY_GROUPS = {"daily": EVERY_DAY, "weekdays": 0b0011111, "weekends": 0b1100000}
+
+
+class ScheduleError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Slot:
+    # seconds after midnight, so the spread default slot keeps its offset
+    at: int
+    quiz_count: int
+    days: int = EVERY_DAY
+
+    @property
+    def time(self) -> str:
+        hours, rest = divmod(self.at, 3600)
+        return f"{hours:02}:{rest // 60:02}"
+
+
+def parse_time(value: str) -> int:
+    hours, _, minutes = value.partition(":")
+    if not (hours.isdigit() and minutes.isdigit() and len(minutes) == 2):
+        raise ScheduleError(f"{value} is not a HH:MM time")
+    if int(hours) > 23 or int(minutes) > 59:
+        raise ScheduleError(f"{value} is not a HH:MM time")
+    return int(hours) * 3600 + int(minutes) * 60
+
+
+def parse_days(value: str) -> int:
+    if value in DAY_GROUPS:
+        return DAY_GROUPS[value]
+
+    days = 0
+    for part in value.split(","):
+        first, _, last = part.partition("-")
+        if first not in WEEKDAYS or (last and last not in WEEKDAYS):
+            raise ScheduleError(f"{part} is not a day like mon or a range like mon-fri")
+        start = WEEKDAYS.index(first)
+        end = WEEKDAYS.index(last) if last else start
+        for day in range(start, end + 1 if end >= start else end + 8):
+            days |= 1 << (day % 7)
+    return days
+
+
+def format_days(days: int) -> str:
+    for name, mask in DAY_GROUPS.items():
+        if days == mask:
+            return name
+    return ",".join(day for i, day in enumerate(WEEKDAYS) if days >> i & 1)
+
+
+def check_slots(slots: list[Slot]) -> list[Slot]:
+    if not slots:
+        raise ScheduleError("add at least one time")
+    if len(slots) > MAX_SCHEDULE_SLOTS:
+        raise ScheduleError(f"at most {MAX_SCHEDULE_SLOTS} times are allowed")
+
+    taken: defaultdict[int, int] = defaultdict(int)
+    for slot in slots:
+        if taken[slot.at] & slot.days:
+            raise ScheduleError(f"{slot.time} is set twice on the same day")
+        taken[slot.at] |= slot.days
+    return sorted(slots, key=lambda slot: (slot.at, slot.days))
+
+
+def parse_slot_line(line: str, quiz_count: int) -> Slot:
+    # "09:00", "13:00 3" or "20:00 5 mon-fri", in any order after the time
+    time, *rest = line.lower().split()
+    at = parse_time(time)
+    days = EVERY_DAY
+    for token in rest:
+        if token.isdigit() and int(token) > 0:
+            quiz_count = int(token)
+        else:
+            days = parse_days(token)
+    return Slot(at, quiz_count, days)
+
+
+def parse_schedule_input(text: str, quiz_count: int) -> list[Slot]:
+    lines = [line for line in text.splitlines() if line.strip()]
+    return check_slots([parse_slot_line(line, quiz_count) for line in lines])
+
+
+def dump_schedule(slots: list[Slot]) -> str:
+    return ",".join(f"{slot.at}/{slot.quiz_count}/{slot.days}" for slot in slots)
+
+
+def load_schedule(value: str) -> list[Slot]:
+    slots = []
+    for item in value.split(","):
+        at, quiz_count, days = item.split("/")
+        slots.append(Slot(int(at), int(quiz_count), int(days)))
+    return slots
+
+
+def find_timezone(name: str) -> str | None:
+    return timezone_names().get(name.strip().casefold())
+
+
+@cache
+def timezone_names() -> dict[str, str]:
+    return {name.casefold(): name for name in available_timezones()}
+
+
+@cache
+def fixed_offset(zone: str) -> int | None:
+    # a zone that never moves its clocks posts at the same UTC instants as
+    # every other zone with its offset; two dates a month catch DST periods
+    tz = ZoneInfo(zone)
+    year = datetime.now(UTC).year
+    offsets = {
+        datetime(year, month, day, tzinfo=tz).utcoffset()
+        for month in range(1, 13)
+        for day in (1, 15)
+    }
+    if len(offsets) > 1:
+        return None
+    offset = offsets.pop()
+    return int(offset.total_seconds()) if offset is not None else None
+
+
+def group_key(zone: str, at: int) -> str:
+    hours, rest = divmod(at, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{zone}@{hours:02}:{minutes:02}:{seconds:02}"
+
+
+def parse_group_key(key: str) -> tuple[str, int]:
+    zone, _, time = key.rpartition("@")
+    hours, minutes, seconds = map(int, time.split(":"))
+    return zone, hours * 3600 + minutes * 60 + seconds
+
+
+def plan_groups(slots: list[Slot], zone: str) -> dict[str, list[int]]:
+    # channels posting at the same instant share one group, keyed by the time
+    # of day in the zone the trigger runs in; zones with a fixed offset are
+    # moved to UTC so they share groups across zones, the rest keep their own
+    # zone so DST moves the whole group. A member's quiz count is kept per
+    # weekday of the group's zone, 0 on days it doesn't post
+    offset = fixed_offset(zone)
+    groups: dict[str, list[int]] = {}
+    for slot in slots:
+        at, shift, group_zone = slot.at, 0, zone
+        if offset is not None:
+            shift, at = divmod(slot.at - offset, 24 * 3600)
+            group_zone = "UTC"
+        counts = groups.setdefault(group_key(group_zone, at), [0] * 7)
+        for day in range(7):
+            if slot.days >> day & 1:
+                counts[(day + shift) % 7] = slot.quiz_count
+    return groups
+
+
+def dump_counts(counts: list[int]) -> str:
+    return ",".join(map(str, counts))
+
+
+def load_counts(value: str) -> list[int]:
+    return [int(count) for count in value.split(",")]
+
+
+def counts_days(counts: list[int]) -> int:
+    return sum(1 << day for day, count in enumerate(counts) if count)
+
+
+def cron_days(days: int) -> str:
+    if days == EVERY_DAY:
+        return "*"
+    return ",".join(str(day) for day in range(7) if days >> day & 1)
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.enums import PollType
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.types import Message
+from models import Quiz
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def full(self) -> bool:
+        self.refill()
+        return self.tokens >= self.capacity
+
+    def pause(self, seconds: float) -> None:
+        # owing tokens makes every acquire wait until the debt is refilled;
+        # overlapping pauses keep the longest rather than adding up
+        self.refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            self.refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= 1
+
+
+@dataclass
+class SenderStats:
+    started: float = field(default_factory=time.monotonic)
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    retry_after_seconds: float = 0
+
+    @property
+    def throughput(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.sent / elapsed if elapsed else 0.0
+
+
+@dataclass
+class PollBatch:
+    chat_id: int
+    quizzes: Sequence[Quiz]
+    done: asyncio.Future[list[tuple[Quiz, Message]]]
+
+
+class PollSender:
+    def __init__(
+        self,
+        bot: Bot,
+        rate: float,
+        chat_rate: float,
+        workers: int,
+        max_retries: int = 3,
+    ) -> None:
+        self.bot = bot
+        self.global_bucket = TokenBucket(rate, 1)
+        self.chat_rate = chat_rate
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self.workers = workers
+        self.max_retries = max_retries
+        self.queue: asyncio.Queue[PollBatch] = asyncio.Queue()
+        self.tasks: list[asyncio.Task[None]] = []
+        self.stats = SenderStats()
+
+    def chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) > 10 * self.workers:
+                self.chat_buckets = {
+                    k: v for k, v in self.chat_buckets.items() if not v.full
+                }
+            bucket = TokenBucket(self.chat_rate / 60, self.chat_rate)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def start(self) -> None:
+        if self.tasks:
+            return
+        self.stats = SenderStats()
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def send(
+        self, chat_id: int, quizzes: Sequence[Quiz]
+    ) -> list[tuple[Quiz, Message]]:
+        self.start()
+        done: asyncio.Future[list[tuple[Quiz, Message]]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        await self.queue.put(PollBatch(chat_id, quizzes, done))
+        return await done
+
+    async def worker(self) -> None:
+        while True:
+            batch = await self.queue.get()
+            # the caller may have given up on the batch, e.g. a timed out job
+            # cancelled it, and a worker must outlive that
+            try:
+                posts = await self.send_batch(batch)
+            except Exception as e:
+                if not batch.done.done():
+                    batch.done.set_exception(e)
+            else:
+                if not batch.done.done():
+                    batch.done.set_result(posts)
+            finally:
+                self.queue.task_done()
+
+    async def send_batch(self, batch: PollBatch) -> list[tuple[Quiz, Message]]:
+        posts = []
+        for quiz in batch.quizzes:
+            message = await self.send_quiz(batch.chat_id, quiz)
+            if message:
+                posts.append((quiz, message))
+        return posts
+
+    async def send_quiz(self, chat_id: int, quiz: Quiz) -> Message | None:
+        bucket = self.chat_bucket(chat_id)
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                message = await self.bot.send_poll(
+                    chat_id,
+                    quiz.question,
+                    [opt.option for opt in quiz.options],
+                    correct_option_id=quiz.correct_order,
+                    explanation=quiz.explanation,
+                    type=PollType.QUIZ,
+                )
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    break
+                logger.warning(
+                    "flood limit in %s, retry in %ss", chat_id, e.retry_after
+                )
+                self.stats.retried += 1
+                self.stats.retry_after_seconds += e.retry_after
+                # the flood limit is on the bot, so hold back every worker
+                # instead of only this one; the retry waits in acquire
+                self.global_bucket.pause(e.retry_after)
+                continue
+            except TelegramAPIError as e:
+                logger.warning("failed to send quiz %s to %s: %s", quiz.id, chat_id, e)
+                break
+
+            self.stats.sent += 1
+            return message
+
+        self.stats.failed += 1
+        return None
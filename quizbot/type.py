@@ -2,7 +2,11 @@ from enum import Enum
 from typing import TypedDict
 
 from aiogram.fsm.state import State, StatesGroup
-from models import Channel
+
+
+class ChannelRef(TypedDict):
+    id: int
+    title: str
 
 
 class QuizForm(StatesGroup):
@@ -15,39 +19,67 @@ class QuizForm(StatesGroup):
 
 
 class QuizData(TypedDict):
-    channels: list[Channel]
+    channels: list[ChannelRef]
     user_id: int
-    channel: Channel | None
+    channel: ChannelRef | None
     question: str | None
     options: list[str] | None
     correct_order: int | None
     explanation: str | None
 
 
+class ImportForm(StatesGroup):
+    select_channel = State()
+    upload = State()
+
+
+class ImportData(TypedDict):
+    channels: list[ChannelRef]
+    channel: ChannelRef | None
+
+
+class ExportForm(StatesGroup):
+    select_channel = State()
+    select_format = State()
+
+
+class ExportData(TypedDict):
+    channels: list[ChannelRef]
+    channel: ChannelRef | None
+
+
 class SettingsForm(StatesGroup):
     select_channel = State()
     sleect_action = State()
     enter_time = State()
     enter_quiz_count = State()
+    enter_schedule = State()
+    enter_timezone = State()
     confirm = State()
 
 
 class SettingsConfirmType(str, Enum):
     TIME = "time"
     QUIZZES = "quizzes"
+    SCHEDULE = "schedule"
+    TIMEZONE = "timezone"
 
 
 class SettingsData(TypedDict):
-    channels: list[Channel]
-    channel: Channel | None
+    channels: list[ChannelRef]
+    channel: ChannelRef | None
     pending_time: str | None
     pending_quiz_count: int | None
+    pending_schedule: str | None
+    pending_timezone: str | None
     confirm_type: SettingsConfirmType | None
 
 
-class ChannelSettings(TypedDict):
+class ChannelSettings(TypedDict, total=False):
     time: str | None
     quiz_count: str | None
+    schedule: str | None
+    timezone: str | None
 
 
 class CommandInfo(TypedDict):
@@ -0,0 +1,105 @@
+import asyncio
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+from aiogram.types import User as TUser
+from constants import USER_WRITE_BATCH, USER_WRITE_WINDOW
+from db import AsyncSessionLocal
+from models import User
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def user_upsert(users: Sequence[TUser]) -> Insert | None:
+    # a row can only be touched once per statement, so keep the last copy
+    rows = {
+        user.id: {
+            "id": user.id,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "username": user.username,
+        }
+        for user in users
+    }
+    if not rows:
+        return None
+
+    stmt = insert(User).values(list(rows.values()))
+    names = (User.first_name, User.last_name, User.username)
+    return stmt.on_conflict_do_update(
+        index_elements=[User.id],
+        set_={
+            "first_name": stmt.excluded.first_name,
+            "last_name": stmt.excluded.last_name,
+            "username": stmt.excluded.username,
+            "updated_at": func.now(),
+        },
+        where=func.row(*names).is_distinct_from(
+            func.row(*(stmt.excluded[col.key] for col in names))
+        ),
+    )
+
+
+async def upsert_users(session: AsyncSession, users: Sequence[TUser]) -> None:
+    if (stmt := user_upsert(users)) is not None:
+        await session.execute(stmt)
+
+
+@dataclass
+class UserBatch:
+    users: dict[int, TUser] = field(default_factory=dict)
+    done: asyncio.Future[None] = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+
+
+@dataclass
+class WriterStats:
+    writes: int = 0
+    flushes: int = 0
+    rows: int = 0
+
+
+class UserWriter:
+    def __init__(
+        self, window: float = USER_WRITE_WINDOW, batch: int = USER_WRITE_BATCH
+    ) -> None:
+        self.window = window
+        self.batch = batch
+        self.open: UserBatch | None = None
+        self.lock = asyncio.Lock()
+        self.tasks: set[asyncio.Task[None]] = set()
+        self.stats = WriterStats()
+
+    async def write(self, user: TUser) -> None:
+        # users seen while the previous batch is being written join the next
+        # one, so a flood of /start costs a multi-row upsert per round-trip
+        batch = self.open
+        if batch is None or len(batch.users) >= self.batch:
+            batch = self.open = UserBatch()
+            task = asyncio.create_task(self.flush(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        batch.users[user.id] = user
+        self.stats.writes += 1
+        await asyncio.shield(batch.done)
+
+    async def flush(self, batch: UserBatch) -> None:
+        await asyncio.sleep(self.window)
+        async with self.lock:
+            if self.open is batch:
+                self.open = None
+            try:
+                async with AsyncSessionLocal() as session:
+                    await upsert_users(session, list(batch.users.values()))
+                    await session.commit()
+            except Exception as e:
+                batch.done.set_exception(e)
+                return
+            self.stats.flushes += 1
+            self.stats.rows += len(batch.users)
+            batch.done.set_result(None)
+
+
+user_writer = UserWriter()
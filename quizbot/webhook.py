@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any
+
+import dotenv
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from constants import (
+    UPDATE_QUEUE_SIZE,
+    UPDATE_QUEUE_TIMEOUT,
+    UPDATE_WORKERS,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_PATH,
+)
+
+dotenv.load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+# every replica has to agree on the secret, so fall back to one derived from
+# the bot token instead of a random value
+WEBHOOK_SECRET = (
+    os.getenv("WEBHOOK_SECRET")
+    or hashlib.sha256(os.getenv("BOT_TOKEN", "").encode()).hexdigest()
+)
+
+
+@dataclass
+class PoolStats:
+    accepted: int = 0
+    rejected: int = 0
+    handled: int = 0
+    failed: int = 0
+
+
+class UpdatePool:
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        workers: int,
+        size: int,
+        timeout: float,
+        **data: Any,
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.workers = workers
+        self.timeout = timeout
+        self.data = data
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(size)
+        self.tasks: list[asyncio.Task[None]] = []
+        self.stats = PoolStats()
+
+    def start(self) -> None:
+        if self.tasks:
+            return
+        self.stats = PoolStats()
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float) -> None:
+        # updates in the queue were already acknowledged, finish them first
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except TimeoutError:
+            logger.warning("dropping %s queued updates", self.queue.qsize())
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def submit(self, update: dict[str, Any]) -> bool:
+        self.start()
+        try:
+            await asyncio.wait_for(self.queue.put(update), self.timeout)
+        except TimeoutError:
+            self.stats.rejected += 1
+            return False
+        self.stats.accepted += 1
+        return True
+
+    async def worker(self) -> None:
+        while True:
+            update = await self.queue.get()
+            try:
+                result = await self.dispatcher.feed_raw_update(
+                    self.bot, update, **self.data
+                )
+                if isinstance(result, TelegramMethod):
+                    await self.dispatcher.silent_call_request(self.bot, result)
+                self.stats.handled += 1
+            except Exception:
+                self.stats.failed += 1
+                logger.exception("failed to handle update %s", update.get("update_id"))
+            finally:
+                self.queue.task_done()
+
+
+class PooledRequestHandler(SimpleRequestHandler):
+    def __init__(
+        self, dispatcher: Dispatcher, bot: Bot, pool: UpdatePool, secret_token: str
+    ) -> None:
+        super().__init__(dispatcher, bot, secret_token=secret_token)
+        self.pool = pool
+
+    async def handle(self, request: web.Request) -> web.Response:
+        secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not self.verify_secret(secret, self.bot):
+            return web.Response(body="Unauthorized", status=401)
+
+        update = await request.json(loads=self.bot.session.json_loads)
+        # a full queue means handlers are behind; an error response makes
+        # Telegram hold the update and redeliver it later instead of us
+        # buffering without bound
+        if not await self.pool.submit(update):
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        return web.json_response({})
+
+    async def close(self) -> None:
+        await self.pool.stop(UPDATE_QUEUE_TIMEOUT)
+        await super().close()
+
+
+POOL_KEY = web.AppKey("pool", UpdatePool)
+
+
+def create_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    workers: int = UPDATE_WORKERS,
+    queue_size: int = UPDATE_QUEUE_SIZE,
+    **data: Any,
+) -> web.Application:
+    pool = UpdatePool(
+        dispatcher, bot, workers, queue_size, UPDATE_QUEUE_TIMEOUT, **data
+    )
+    app = web.Application()
+    app[POOL_KEY] = pool
+    PooledRequestHandler(dispatcher, bot, pool, WEBHOOK_SECRET).register(
+        app, path=WEBHOOK_PATH
+    )
+    setup_application(app, dispatcher, bot=bot, **data)
+    return app
+
+
+async def set_webhook(dispatcher: Dispatcher, bot: Bot) -> None:
+    await bot.set_webhook(
+        WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+    )
@@ -0,0 +1,44 @@
+from duplicates import QuestionIndex, question_key
+
+QUESTIONS = {
+    1: "Which planet in our solar system is known as the Red Planet?",
+    2: "What is the chemical symbol for gold?",
+    3: "Who wrote the novel War and Peace?",
+}
+
+
+def make_index() -> QuestionIndex:
+    index = QuestionIndex()
+    for quiz_id, question in QUESTIONS.items():
+        index.add(quiz_id, question)
+    return index
+
+
+def test_exact_match_ignores_case_and_punctuation() -> None:
+    duplicate = make_index().find(question_key("what is the CHEMICAL symbol for gold"))
+    assert duplicate is not None
+    assert (duplicate.quiz_id, duplicate.similarity) == (2, 1.0)
+
+
+def test_near_duplicate_is_found() -> None:
+    key = question_key("Which planet in the solar system is known as the Red Planet?")
+    duplicate = make_index().find(key)
+    assert duplicate is not None
+    assert duplicate.quiz_id == 1
+    assert 0.7 <= duplicate.similarity < 1.0
+    assert duplicate.question == QUESTIONS[1]
+
+
+def test_unrelated_question_is_not_a_duplicate() -> None:
+    key = question_key("How many bones are in the adult human body?")
+    assert make_index().find(key) is None
+
+
+def test_empty_index_finds_nothing() -> None:
+    assert QuestionIndex().find(question_key(QUESTIONS[3])) is None
+
+
+def test_a_quiz_is_only_indexed_once() -> None:
+    index = make_index()
+    index.add(3, "something else entirely")
+    assert index.questions[3] == QUESTIONS[3]
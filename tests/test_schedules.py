@@ -0,0 +1,114 @@
+import pytest
+from schedules import (
+    EVERY_DAY,
+    ScheduleError,
+    Slot,
+    counts_days,
+    cron_days,
+    dump_schedule,
+    fixed_offset,
+    format_days,
+    group_key,
+    load_schedule,
+    parse_days,
+    parse_group_key,
+    parse_schedule_input,
+    plan_groups,
+)
+
+MON, TUE, SUN = 1, 1 << 1, 1 << 6
+WEEKDAYS = 0b0011111
+
+
+def test_slot_lines_take_count_and_days_in_any_order() -> None:
+    slots = parse_schedule_input("09:00\n13:00 3\n20:00 sat,sun 5", 2)
+    assert slots == [
+        Slot(9 * 3600, 2),
+        Slot(13 * 3600, 3),
+        Slot(20 * 3600, 5, 0b1100000),
+    ]
+
+
+def test_slots_are_sorted_and_blank_lines_skipped() -> None:
+    slots = parse_schedule_input("\n20:00 weekends\n\n08:30 weekdays\n", 1)
+    assert [slot.time for slot in slots] == ["08:30", "20:00"]
+
+
+def test_same_time_on_other_days_is_kept() -> None:
+    slots = parse_schedule_input("09:00 3 weekdays\n09:00 5 weekends", 1)
+    assert [(slot.quiz_count, slot.days) for slot in slots] == [
+        (3, WEEKDAYS),
+        (5, EVERY_DAY & ~WEEKDAYS),
+    ]
+
+
+def test_same_time_on_the_same_day_is_rejected() -> None:
+    with pytest.raises(ScheduleError, match="09:00 is set twice"):
+        parse_schedule_input("09:00 mon-wed\n09:00 wed", 1)
+
+
+@pytest.mark.parametrize("text", ["", "24:00", "9:5", "09:00 someday"])
+def test_invalid_schedules_are_rejected(text: str) -> None:
+    with pytest.raises(ScheduleError):
+        parse_schedule_input(text, 1)
+
+
+def test_day_ranges_wrap_around_the_week() -> None:
+    assert parse_days("fri-mon") == 0b1110001
+    assert parse_days("sun-sun") == SUN
+    assert format_days(parse_days("sat-sun")) == "weekends"
+    assert format_days(parse_days("sun-tue")) == "mon,tue,sun"
+
+
+def test_schedules_survive_a_round_trip() -> None:
+    slots = parse_schedule_input("07:15 2 tue\n21:45 4 daily", 1)
+    assert load_schedule(dump_schedule(slots)) == slots
+
+
+def test_cron_days() -> None:
+    assert cron_days(EVERY_DAY) == "*"
+    assert cron_days(WEEKDAYS) == "0,1,2,3,4"
+    assert cron_days(counts_days([0, 3, 0, 0, 0, 0, 2])) == "1,6"
+
+
+def test_group_keys_round_trip() -> None:
+    key = group_key("America/New_York", 9 * 3600 + 7 * 60 + 30)
+    assert key == "America/New_York@09:07:30"
+    assert parse_group_key(key) == ("America/New_York", 9 * 3600 + 7 * 60 + 30)
+
+
+def test_fixed_offsets() -> None:
+    assert fixed_offset("UTC") == 0
+    assert fixed_offset("Asia/Tashkent") == 5 * 3600
+    assert fixed_offset("Etc/GMT+5") == -5 * 3600
+    # observes daylight saving time
+    assert fixed_offset("Europe/Berlin") is None
+
+
+def test_zones_with_dst_keep_their_own_groups() -> None:
+    groups = plan_groups([Slot(9 * 3600, 3, WEEKDAYS)], "Europe/Berlin")
+    assert groups == {"Europe/Berlin@09:00:00": [3, 3, 3, 3, 3, 0, 0]}
+
+
+def test_fixed_offset_zones_fold_into_utc() -> None:
+    tashkent = plan_groups([Slot(9 * 3600, 3, WEEKDAYS)], "Asia/Tashkent")
+    karachi = plan_groups([Slot(9 * 3600, 3, WEEKDAYS)], "Asia/Karachi")
+    assert tashkent == karachi == {"UTC@04:00:00": [3, 3, 3, 3, 3, 0, 0]}
+
+
+def test_slots_at_the_same_instant_share_a_group() -> None:
+    slots = parse_schedule_input("09:00 3 weekdays\n09:00 5 weekends", 1)
+    groups = plan_groups(slots, "Asia/Tashkent")
+    assert groups == {"UTC@04:00:00": [3, 3, 3, 3, 3, 5, 5]}
+
+
+def test_folding_back_past_midnight_moves_to_the_day_before() -> None:
+    # 03:00 on Monday and Tuesday in Tashkent is 22:00 on Sunday and Monday UTC
+    groups = plan_groups([Slot(3 * 3600, 2, MON | TUE)], "Asia/Tashkent")
+    assert groups == {"UTC@22:00:00": [2, 0, 0, 0, 0, 0, 2]}
+
+
+def test_folding_forward_past_midnight_moves_to_the_day_after() -> None:
+    # 22:00 on Sunday at UTC-5 is 03:00 on Monday UTC
+    groups = plan_groups([Slot(22 * 3600, 4, SUN)], "Etc/GMT+5")
+    assert groups == {"UTC@03:00:00": [4, 0, 0, 0, 0, 0, 0]}